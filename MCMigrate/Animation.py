@@ -2,11 +2,201 @@
 为了不重复手搓动画而弄的简单动画库
 注意！该动画库的动画暂不可与 同动画库里的其他动画一起使用！
 以及不能使用在 已经有应用到QGraphicEffect的widget上！
+\n频繁触发的动画（悬停、点击、弹出）请用ColorTransition和Fade：每个控件创建一次，之后每次都从当前值过渡到新的目标，
+不会每次都新建动画对象；它们都通过driver启动，同时运行的动画数量有上限
 '''
+from collections import OrderedDict
 from PySide6 import QtCore, QtWidgets, QtGui, QtSvg
 from core import ClientLibs
 from typing import Callable
 
+class AnimationDriver:
+    '''
+    统一启动可复用动画的地方，限制同时运行的动画数量
+    \n超过MAX_RUNNING时，最早开始的动画直接跳到结束值（比如鼠标快速划过长列表时，早就离开的项不必再慢慢褪色）
+    \n不往动画上连接任何回调，已经停下的动画在下次start()时才清理：正在运行的动画在所属控件析构时也会发出stateChanged，那时不能再回到Python里
+    '''
+    MAX_RUNNING = 24
+
+    def __init__(self):
+        self._running: OrderedDict[int, QtCore.QAbstractAnimation] = OrderedDict()
+        self._closed = False
+
+    def start(self, anim: QtCore.QAbstractAnimation):
+        if self._closed: # 程序正在退出
+            return
+        self._prune()
+        self._running.pop(id(anim), None)
+        while len(self._running) >= self.MAX_RUNNING:
+            _, oldest = self._running.popitem(last=False)
+            try:
+                oldest.setCurrentTime(oldest.totalDuration()) # 跳到结束，会正常发出finished
+            except RuntimeError:
+                pass # 所属控件已经被删除
+        anim.start()
+        if anim.state() == QtCore.QAbstractAnimation.Running:
+            self._running[id(anim)] = anim
+
+    def running_count(self) -> int:
+        self._prune()
+        return len(self._running)
+
+    def shutdown(self):
+        '''程序退出前调用（app.aboutToQuit），在控件销毁之前停下所有动画并放掉引用，之后的start()不再生效'''
+        self._closed = True
+        running, self._running = self._running, OrderedDict()
+        for anim in running.values():
+            try:
+                anim.stop()
+            except RuntimeError:
+                pass
+
+    def _prune(self):
+        for key, anim in tuple(self._running.items()):
+            try:
+                stopped = anim.state() != QtCore.QAbstractAnimation.Running
+            except RuntimeError: # 所属控件已经被删除
+                stopped = True
+            if stopped:
+                del self._running[key]
+
+driver = AnimationDriver()
+
+class ColorTransition(QtCore.QObject):
+    '''
+    可复用的颜色过渡，每个控件（的每种颜色）创建一个，to()和flash()总是从当前颜色开始
+    Args:
+        parent: 所属对象，一般是控件本身
+        color: 当前颜色
+        apply: 每帧调用，参数为当前颜色
+    '''
+    def __init__(self, parent: QtCore.QObject, color: QtGui.QColor, apply: Callable[[QtGui.QColor], None]):
+        super().__init__(parent)
+        self.color = QtGui.QColor(color)
+        self._apply = apply
+        self.anim = QtCore.QVariantAnimation(self)
+        self.anim.valueChanged.connect(self._on_value_changed)
+
+    @classmethod
+    def for_palette(cls, widget: QtWidgets.QWidget, color_role: QtGui.QPalette.ColorRole = None) -> 'ColorTransition':
+        '''改变widget调色板中color_role（默认为背景）的颜色'''
+        role = color_role if color_role is not None else widget.backgroundRole()
+        def apply(color: QtGui.QColor):
+            palette = widget.palette()
+            palette.setColor(role, color)
+            widget.setPalette(palette)
+        return cls(widget, widget.palette().color(role), apply)
+
+    def _on_value_changed(self, color: QtGui.QColor):
+        self.color = color
+        self._apply(color)
+
+    def to(self, color: QtGui.QColor, duration: int = 300):
+        '''从当前颜色过渡到color，正在进行的过渡会被取代'''
+        self.anim.stop()
+        if self.color == color:
+            return
+        self.anim.setEasingCurve(QtCore.QEasingCurve.InOutQuad)
+        self.anim.setDuration(duration)
+        self.anim.setKeyValues([(0.0, QtGui.QColor(self.color)), (1.0, QtGui.QColor(color))])
+        driver.start(self.anim)
+
+    def flash(self, color: QtGui.QColor, back_color: QtGui.QColor, duration_in: int = 100, pause: int = 120, duration_out: int = 60):
+        '''点击反馈：过渡到color，停留pause毫秒后再过渡到back_color'''
+        self.anim.stop()
+        total = duration_in + pause + duration_out
+        self.anim.setEasingCurve(QtCore.QEasingCurve.Linear)
+        self.anim.setDuration(total)
+        self.anim.setKeyValues([
+            (0.0, QtGui.QColor(self.color)),
+            (duration_in / total, QtGui.QColor(color)),
+            ((duration_in + pause) / total, QtGui.QColor(color)),
+            (1.0, QtGui.QColor(back_color))
+        ])
+        driver.start(self.anim)
+
+class Fade(QtCore.QObject):
+    '''
+    可复用的淡入淡出，每个控件创建一次
+    \n只在过渡期间给控件加QGraphicsOpacityEffect，完全显示后马上移除，平时的绘制不用再经过离屏缓冲
+    \n淡出过程中淡入（或反过来）会从当前透明度接着过渡
+    Args:
+        widget: 不能已经有其他QGraphicsEffect
+        duration_in: 淡入时长（毫秒）
+        duration_out: 淡出时长（毫秒）
+    '''
+    faded_out = QtCore.Signal() # 淡出完成（已经隐藏）
+
+    def __init__(self, widget: QtWidgets.QWidget, duration_in: int = 300, duration_out: int = 100):
+        super().__init__(widget)
+        self.widget = widget
+        self.duration_in = duration_in
+        self.duration_out = duration_out
+        self.opacity = 1.0 if widget.isVisible() else 0.0 # 当前透明度，见_sync()
+        self._hide_when_done = False
+        self.anim = QtCore.QVariantAnimation(self)
+        self.anim.setEasingCurve(QtCore.QEasingCurve.InOutQuad)
+        self.anim.valueChanged.connect(self._on_value_changed)
+        self.anim.finished.connect(self._on_finished)
+
+    def _effect(self) -> QtWidgets.QGraphicsOpacityEffect:
+        effect = self.widget.graphicsEffect()
+        if not isinstance(effect, QtWidgets.QGraphicsOpacityEffect):
+            effect = QtWidgets.QGraphicsOpacityEffect(self.widget)
+            effect.setOpacity(self.opacity)
+            self.widget.setGraphicsEffect(effect)
+        return effect
+
+    def _on_value_changed(self, opacity: float):
+        self.opacity = opacity
+        self._effect().setOpacity(opacity)
+
+    def _on_finished(self):
+        if self._hide_when_done:
+            self._hide_when_done = False
+            self.widget.hide()
+            self.widget.setGraphicsEffect(None)
+            self.faded_out.emit()
+        elif self.opacity >= 1.0:
+            self.widget.setGraphicsEffect(None)
+
+    def _sync(self):
+        # 控件可能被别处直接show()/hide()过，没有在过渡时以控件的实际状态为准
+        if self.anim.state() != QtCore.QAbstractAnimation.Running and not isinstance(self.widget.graphicsEffect(), QtWidgets.QGraphicsOpacityEffect):
+            self.opacity = 1.0 if self.widget.isVisible() else 0.0
+
+    def _run(self, end: float, duration: int):
+        self.anim.stop()
+        if self.opacity == end:
+            self._on_finished()
+            return
+        self._effect().setOpacity(self.opacity)
+        self.anim.setDuration(duration)
+        self.anim.setStartValue(float(self.opacity))
+        self.anim.setEndValue(float(end))
+        driver.start(self.anim)
+
+    def fade_in(self, duration: int = None):
+        '''显示并淡入'''
+        self._sync()
+        self._hide_when_done = False
+        if not self.widget.isVisible():
+            self.opacity = 0.0
+            self._effect().setOpacity(0.0) # 先设为透明再show，避免闪一下
+        self.widget.show()
+        self._run(1.0, self.duration_in if duration is None else duration)
+
+    def fade_out(self, duration: int = None):
+        '''淡出，结束后隐藏控件并发出faded_out'''
+        self._sync()
+        if not self.widget.isVisible():
+            self.opacity = 0.0
+            self.anim.stop()
+            self.faded_out.emit()
+            return
+        self._hide_when_done = True
+        self._run(0.0, self.duration_out if duration is None else duration)
+
 class FadeIn(QtCore.QPropertyAnimation):
     '''淡入动画，使用前请先show()'''
     def __init__(self, widget: QtWidgets.QWidget, duration: int=300):
@@ -74,7 +264,7 @@ class ChangeColor(QtCore.QPropertyAnimation):
         self.widget.setPalette(palette)
 
 class ChangeButtonIconColorTransiting(QtCore.QPropertyAnimation):
-    '''适配纯色图形的，由原颜色变化至指定颜色的动画'''
+    '''适配纯色图形的，由原颜色变化至指定颜色的动画（改色不会重新解析svg，见ColorIconGenerator）'''
     def __init__(self, button: QtWidgets.QPushButton, icon_gen: ClientLibs.ColorIconGenerator, end_color: QtGui.QColor, duration: int=300):
         self.icon_gen = icon_gen
         self.btn = button
@@ -87,7 +277,7 @@ class ChangeButtonIconColorTransiting(QtCore.QPropertyAnimation):
         self.valueChanged.connect(self.on_value_changed)
 
     def on_value_changed(self, color: QtGui.QColor):
-        self.btn.setIcon(self.icon_gen.icon(QtCore.QSize(self.btn_min_width, self.btn_min_width), color))
+        self.btn.setIcon(self.icon_gen.icon(QtCore.QSize(self.btn_min_width, self.btn_min_width), color, self.btn.devicePixelRatioF())) # 每帧只是取缓存或填一次色
 
 class Rotate(QtCore.QPropertyAnimation):
     '''旋转QGraphicsView中的物件'''
@@ -1,4 +1,6 @@
-from message import Message
+from typing import TYPE_CHECKING
+if TYPE_CHECKING: # message会导入PySide6，命令行下不能在这里导入
+    from message import Message
 
 class MCException(Exception):
     def __init__(self, *args):
@@ -17,7 +19,7 @@ class VersionsFolderNotFound(MCException):
         super().__init__("未发现versions文件夹，还没下游戏吗...?")
 
 class VersionVerifyFailed(MCException):
-    def __init__(self, msg: str, level: Message.Level):
+    def __init__(self, msg: str, level: 'Message.Level'):
         super().__init__(msg)
         self.level = level
 
@@ -0,0 +1,299 @@
+'''
+MCMigrate的命令行入口，不导入任何Qt模块，可以在没有图形界面的机器上（脚本、定时任务、SSH）使用
+\n用法（在MCMigrate文件夹下运行，与图形界面共用config.yml和versions.json）：
+\n- python -m cli import <游戏文件夹> [--indie yes|no|both|skip]：解析并导入游戏文件夹
+\n- python -m cli list：列出游戏库中的版本
+\n- python -m cli scan <源版本>：按过滤规则统计需要迁移的文件，不复制
+\n- python -m cli resolve <源版本> <目标版本>：查询模组在目标版本中的适配版本，不下载
+\n- python -m cli migrate <源版本> <目标版本>...：迁移，可以同时迁移到多个目标
+\n- python -m cli report：查看队列中未完成的任务和可以续传的迁移
+\n版本可以写版本文件夹路径（game_path）或版本名称；加上--json时结果以json输出到stdout，日志都输出到stderr
+'''
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import argparse, json, os, sys, threading, logging
+
+from terminal.func import config, library, library_store, version
+import MCException
+
+# 设置日志
+logger = logging.getLogger(__name__)
+
+# 退出码
+EXIT_OK = 0
+EXIT_FAILURES = 1 # 完成了，但有文件/模组迁移失败或未适配
+EXIT_USAGE = 2 # 参数错误、找不到版本等
+EXIT_ERROR = 3 # 迁移中途出错
+EXIT_ABORTED = 130 # 被Ctrl+C终止（已完成的部分记录在迁移日志中，再次运行会继续）
+
+class CliError(Exception):
+    '''参数或输入有误，直接提示并以EXIT_USAGE退出'''
+
+def main(argv: list[str] = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    # 各模块的logger自己设置了INFO级别，不加-v时直接屏蔽INFO及以下的日志
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr, format='%(levelname)s %(message)s')
+    if not args.verbose:
+        logging.disable(logging.INFO)
+    try:
+        return args.func(args)
+    except CliError as e:
+        print(f"错误：{e}", file=sys.stderr)
+        return EXIT_USAGE
+
+def build_parser() -> argparse.ArgumentParser:
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--json', action='store_true', help='以json输出结果')
+    common.add_argument('-v', '--verbose', action='store_true', help='输出详细日志')
+
+    parser = argparse.ArgumentParser(prog='python -m cli', description='MCMigrate命令行（无图形界面）')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('import', parents=[common], help='解析并导入游戏文件夹（.minecraft）')
+    p.add_argument('path', type=Path)
+    p.add_argument('--indie', choices=('yes', 'no', 'both', 'skip'), default='skip', help='无法判断是否版本隔离时的处理方式（默认跳过）')
+    p.set_defaults(func=cmd_import)
+
+    p = sub.add_parser('list', parents=[common], help='列出游戏库中的版本')
+    p.set_defaults(func=cmd_list)
+
+    p = sub.add_parser('scan', parents=[common], help='统计需要迁移的文件，不复制')
+    p.add_argument('source')
+    p.set_defaults(func=cmd_scan)
+
+    p = sub.add_parser('resolve', parents=[common], help='查询模组在目标版本中的适配版本，不下载')
+    p.add_argument('source')
+    p.add_argument('target')
+    p.set_defaults(func=cmd_resolve)
+
+    p = sub.add_parser('migrate', parents=[common], help='迁移游戏文件和模组')
+    p.add_argument('source')
+    p.add_argument('targets', nargs='+')
+    p.set_defaults(func=cmd_migrate)
+
+    p = sub.add_parser('report', parents=[common], help='查看未完成的任务和可以续传的迁移')
+    p.set_defaults(func=cmd_report)
+    return parser
+
+# == 子命令 ==
+
+def cmd_import(args) -> int:
+    try:
+        result = version.add_game(args.path)
+    except (MCException.NotMCGameFolder, MCException.VersionsFolderNotFound) as e:
+        raise CliError(str(e))
+    # query_ver中每个版本各有隔离、非隔离两份（偶数项为隔离）
+    picked = {
+        'yes': result.query_ver[0::2],
+        'no': result.query_ver[1::2],
+        'both': result.query_ver,
+        'skip': []
+    }[args.indie]
+    game = result.to_dict()
+    game['versions'] = list(result.done_vers) + picked # 全部解析成功时done_vers是tuple
+
+    games, store = open_library()
+    touched, _ = games.merge_games(game)
+    store.games_changed(touched)
+    store.close()
+
+    output = {
+        'folder_path': result.folder_path,
+        'imported': [v['name'] for v in game['versions']],
+        'skipped': [v['name'] for v in result.query_ver[0::2]] if args.indie == 'skip' else [],
+        'failed': list(result.failed_vers)
+    }
+    if args.json:
+        print_json(output)
+    else:
+        print(f"已导入 {len(output['imported'])} 个版本：{result.folder_path}")
+        if output['skipped']: print(f"无法判断是否版本隔离，已跳过（可用--indie指定）：{'、'.join(output['skipped'])}")
+        if output['failed']: print(f"无法导入：{'、'.join(output['failed'])}")
+    return EXIT_FAILURES if output['failed'] else EXIT_OK
+
+def cmd_list(args) -> int:
+    games, store = open_library()
+    store.close()
+    if args.json:
+        print_json(games.games())
+        return EXIT_OK
+    for game in games.games():
+        print(f"{game['folder_name']}  {game['folder_path']}")
+        for v in game['versions']:
+            print(f"  {v['name']:<32} {v['mod_loader']}-{v['version']:<12} {v['game_path']}")
+    return EXIT_OK
+
+def cmd_scan(args) -> int:
+    from terminal.func import migrate, progress
+    games, store = open_library()
+    store.close()
+    source_json = find_version(games, args.source)
+    migration = migrate.Migration(Path(source_json['game_path']), [], source_json, [])
+    m = migration.scan()
+    mods_dir = migration.source_dir / 'mods'
+    mods = [name for name in os.listdir(mods_dir) if (mods_dir / name).is_file()] if mods_dir.is_dir() else []
+    output = {
+        'source': source_json['game_path'],
+        'files': m.total_files,
+        'bytes': m.total_bytes,
+        'dirs': sum(1 for _ in m.dirs()),
+        'mods': len(mods)
+    }
+    if args.json:
+        print_json(output)
+    else:
+        print(f"{output['source']}：{output['files']} 个文件（{progress.format_bytes(output['bytes'])}），{output['dirs']} 个文件夹，{output['mods']} 个模组")
+    return EXIT_OK
+
+def cmd_resolve(args) -> int:
+    from terminal.func import migrate, mod
+    games, store = open_library()
+    store.close()
+    source_json, target_json = find_version(games, args.source), find_version(games, args.target)
+    if source_json['mod_loader'] in migrate.NOT_MOD_LOADER or target_json['mod_loader'] in migrate.NOT_MOD_LOADER:
+        raise CliError('源版本和目标版本都需要有模组加载器')
+    mods_dir = Path(source_json['game_path']) / 'mods'
+    mod_list = sorted(name for name in os.listdir(mods_dir) if (mods_dir / name).is_file()) if mods_dir.is_dir() else []
+
+    def resolve(name: str) -> dict:
+        result = mod.modrinth_resolve(target_json['version'], target_json['mod_loader'], mods_dir / name)
+        if isinstance(result, dict) and result.get('files'):
+            return {'mod': name, 'status': 'found', 'file': result['files'][0]['filename'], 'version_id': result.get('id')}
+        status = 'not_adapted' if result == mod.Result.NOT_ADAPTED else 'failed'
+        return {'mod': name, 'status': status, 'file': None, 'version_id': None}
+
+    with ThreadPoolExecutor(migrate.Migration.MOD_WORKERS, thread_name_prefix='MCMigrate-mod') as executor:
+        results = list(executor.map(resolve, mod_list))
+    if args.json:
+        print_json(results)
+    else:
+        for r in results:
+            print(f"{r['mod']} -> {r['file'] or r['status']}")
+    return EXIT_OK if all(r['status'] == 'found' for r in results) else EXIT_FAILURES
+
+def cmd_migrate(args) -> int:
+    from terminal.func import migrate, progress
+    games, store = open_library()
+    store.close()
+    source_json = find_version(games, args.source)
+    target_jsons = [find_version(games, target) for target in args.targets]
+    source_dir = Path(source_json['game_path'])
+    target_dirs = [Path(target['game_path']) for target in target_jsons]
+    if source_dir in target_dirs:
+        raise CliError('不能迁移自己口牙>_<')
+    if len(set(target_dirs)) != len(target_dirs):
+        raise CliError('目标版本重复了')
+
+    def on_progress(p: progress.MigrateProgress):
+        if args.json or not sys.stderr.isatty(): return
+        print(f"\r{p.overall:6.1%}  {progress.format_bytes(p.speed)}/s  剩余 {progress.format_eta(p.eta)}   ", end='', file=sys.stderr, flush=True)
+
+    migration = migrate.Migration(
+        source_dir, target_dirs, source_json, target_jsons,
+        on_progress=on_progress, on_notice=lambda text: print(text, file=sys.stderr)
+    )
+    # 迁移放在子线程运行，主线程等待时才能及时响应Ctrl+C
+    outcome = {}
+    def run():
+        try:
+            outcome['completed'] = migration.run()
+        except Exception as e:
+            logger.exception(f"迁移任务出错: {e}")
+            migration.abort()
+            outcome['error'] = str(e)
+    thread = threading.Thread(target=run, name='MCMigrate-migrate')
+    thread.start()
+    try:
+        while thread.is_alive():
+            thread.join(0.2)
+    except KeyboardInterrupt:
+        print('\n正在终止，已完成的部分会在下次迁移时跳过...', file=sys.stderr)
+        migration.abort()
+        thread.join()
+    if not args.json and sys.stderr.isatty():
+        print(file=sys.stderr)
+
+    if 'error' in outcome:
+        status, code = 'error', EXIT_ERROR
+    elif not outcome.get('completed'):
+        status, code = 'aborted', EXIT_ABORTED
+    elif migration.has_failures:
+        status, code = 'done_with_failures', EXIT_FAILURES
+    else:
+        status, code = 'done', EXIT_OK
+    if args.json:
+        print_json({'status': status, 'error': outcome.get('error'), **migration.summary()})
+    else:
+        if report := migration.report():
+            print(f"{report.title}\n{report.content}", end='')
+        elif status == 'done':
+            print(f"{source_json['name']}已迁移至{'、'.join(target['name'] for target in target_jsons)}！")
+        if 'error' in outcome:
+            print(f"迁移任务出错：{outcome['error']}")
+    return code
+
+def cmd_report(args) -> int:
+    from terminal.func import jobqueue, journal
+    queue = jobqueue.JobQueue()
+    queue.load()
+    games, store = open_library()
+    store.close()
+    resumable = sorted({
+        v['game_path'] for game in games.games() for v in game['versions']
+        if (Path(v['game_path']) / journal.JOURNAL_NAME).is_file()
+    })
+    output = {
+        'jobs': [{'id': job.id, 'title': job.title, 'priority': job.priority, 'error': job.error} for job in queue.jobs()],
+        'resumable': resumable
+    }
+    if args.json:
+        print_json(output)
+    else:
+        print(f"未完成的任务：{len(output['jobs'])} 个")
+        for job in output['jobs']:
+            print(f"  [{job['id']}] {job['title']}" + (f"（出错：{job['error']}）" if job['error'] else ''))
+        print(f"可以续传的迁移目标：{len(resumable)} 个")
+        for path in resumable:
+            print(f"  {path}")
+    return EXIT_OK
+
+# == 辅助方法 ==
+
+def open_library() -> tuple[library.GameLibrary, library_store.LibraryStore]:
+    '''按config.yml中的library.backend读取游戏库'''
+    games = library.GameLibrary()
+    store = library_store.open_store(games, config.get_settings().library.backend)
+    try:
+        store.load()
+    except (TypeError, ValueError, OSError) as e:
+        raise CliError(f"读取游戏库失败：{e}")
+    return games, store
+
+def find_version(games: library.GameLibrary, spec: str) -> dict:
+    '''
+    按版本文件夹路径或版本名称查找版本
+    Raises:
+        CliError: 找不到或名称对应多个版本
+    '''
+    path = Path(spec).resolve() if os.sep in spec or '/' in spec else None
+    by_path, by_name = [], []
+    for game in games.games():
+        for v in game['versions']:
+            if path is not None and Path(v['game_path']).resolve() == path:
+                by_path.append(v)
+            elif v['name'] == spec:
+                by_name.append(v)
+    matched = by_path or by_name
+    if not matched:
+        raise CliError(f"游戏库中没有版本：{spec}（可以先用import导入）")
+    if len(matched) > 1:
+        raise CliError(f"有多个版本叫 {spec}，请改用版本文件夹路径：\n" + '\n'.join(v['game_path'] for v in matched))
+    return matched[0]
+
+def print_json(data):
+    json.dump(data, sys.stdout, ensure_ascii=False, indent=2)
+    print()
+
+if __name__ == '__main__':
+    sys.exit(main())
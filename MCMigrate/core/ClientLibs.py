@@ -1,106 +1,92 @@
 from PySide6 import QtGui, QtCore
-from PySide6.QtSvg import QSvgRenderer
-import re
+from collections import OrderedDict
+from itertools import compress
+from core import Icons
+
+try:
+    import numpy as np # 可选，没有时直接用bytes切片计算（打包时不包含numpy）
+except ImportError:
+    np = None
+
+_average_colors: OrderedDict[tuple[int, int], QtGui.QColor] = OrderedDict()
+MAX_AVERAGE_COLORS = 256
 
 def get_icon_average_color(icon: QtGui.QIcon, size=32) -> QtGui.QColor:
     """
     获取 QIcon 在指定尺寸下的平均非透明像素颜色。
+    \n结果按(icon.cacheKey(), size)缓存；像素直接从QImage的内存中整块读取，不再逐个像素创建QColor
     """
-    # 1. 生成 QPixmap（使用 normal 状态和 normal 模式）
-    pixmap = icon.pixmap(size, size)
-    
-    # 2. 转为 QImage
-    image = pixmap.toImage()
-    
+    key = (icon.cacheKey(), size)
+    cached = _average_colors.get(key)
+    if cached is not None:
+        _average_colors.move_to_end(key)
+        return QtGui.QColor(cached)
+
+    # 转成固定的RGBA8888（非预乘，字节顺序和平台无关），每个像素依次是R、G、B、A四个字节
+    image = icon.pixmap(size, size).toImage().convertToFormat(QtGui.QImage.Format_RGBA8888)
     if image.isNull():
         return QtGui.QColor()  # 无效图像返回透明色
 
-    total_r = total_g = total_b = total_a = count = 0
-
-    for x in range(image.width()):
-        for y in range(image.height()):
-            pixel = image.pixelColor(x, y)  # 返回 QColor
-            if pixel.alpha() > 0:  # 忽略完全透明像素
-                total_r += pixel.red()
-                total_g += pixel.green()
-                total_b += pixel.blue()
-                total_a += pixel.alpha()
-                count += 1
+    width, height, stride = image.width(), image.height(), image.bytesPerLine()
+    data = image.constBits()[:stride * height]
+    if stride != width * 4: # 每行末尾有对齐用的填充字节时先去掉
+        data = b''.join(data[row * stride: row * stride + width * 4] for row in range(height))
+
+    if np is not None:
+        pixels = np.frombuffer(data, dtype=np.uint8).reshape(-1, 4)
+        opaque = pixels[pixels[:, 3] > 0] # 忽略完全透明像素
+        count = len(opaque)
+        totals = opaque.sum(axis=0, dtype=np.uint64).tolist() if count else [0, 0, 0, 0]
+    else:
+        data = bytes(data)
+        alpha = data[3::4]
+        count = len(alpha) - alpha.count(0)
+        # compress只保留alpha不为0的像素，求和都在C里完成
+        totals = [sum(compress(data[channel::4], alpha)) for channel in range(3)] + [sum(alpha)]
 
     if count == 0:
-        return QtGui.QColor(0, 0, 0, 0)  # 全透明
+        color = QtGui.QColor(0, 0, 0, 0)  # 全透明
+    else:
+        color = QtGui.QColor(*(total // count for total in totals))
 
-    avg_r = total_r // count
-    avg_g = total_g // count
-    avg_b = total_b // count
-    avg_a = total_a // count
-
-    return QtGui.QColor(avg_r, avg_g, avg_b, avg_a)
+    _average_colors[key] = color
+    if len(_average_colors) > MAX_AVERAGE_COLORS:
+        _average_colors.popitem(last=False)
+    return QtGui.QColor(color)
 
 class ColorIconGenerator(QtCore.QObject):
+    '''
+    纯色svg图标的改色器，color属性可以直接用于QPropertyAnimation
+    \nsvg的形状只栅格化一次（见Icons.mask()），改色只是按遮罩填色，同样的尺寸和颜色还会直接用Icons里缓存的结果
+    '''
     def __init__(self, svg_path_or_data, default_color: QtGui.QColor = QtGui.QColor('#ffffff')):
         super().__init__()
         self._original_svg_data = self._load_svg_data(svg_path_or_data)
-        self._color = default_color
-        self._current_renderer = None
-        self._update_renderer()
+        self._color = QtGui.QColor(default_color)
+        Icons.mask_renderer(self._original_svg_data) # 提前解析一次，svg无效时抛出ValueError
 
     def _load_svg_data(self, svg_path_or_data):
         if isinstance(svg_path_or_data, str):
             if svg_path_or_data.endswith('.svg'):
-                with open(svg_path_or_data, 'r', encoding='utf-8') as f:
-                    return f.read()
+                return Icons.svg_data(svg_path_or_data) # 同一个文件只读取一次
             else:
                 return svg_path_or_data  # raw SVG string
         else:
             # Assume bytes or QByteArray
             return bytes(svg_path_or_data).decode('utf-8')
 
-    def _update_renderer(self):
-        # 替换 fill 和 stroke 颜色（简单粗暴但有效）
-        svg_data = self._original_svg_data
-        color_hex = self._color.name(QtGui.QColor.NameFormat.HexArgb)  # 如 #ff000000
-
-        # 移除 alpha 通道如果不需要（或保留）
-        # 如果你希望完全不透明，可用 HexRgb
-        color_hex = self._color.name(QtGui.QColor.NameFormat.HexRgb)  # 如 #000000
-
-        # 替换常见 fill/stroke 属性（忽略大小写，处理多种格式）
-        # 注意：这只是一个启发式方法，复杂 SVG 可能需要更严谨的 XML 解析
-        svg_data = re.sub(
-            r'(?i)(fill|stroke)="[^"]*"', 
-            f'\\1="{color_hex}"', 
-            svg_data
-        )
-        # 移除 style="fill:xxx" 这类内联样式（可选，更复杂）
-        # 可扩展支持 <style> 标签，但大多数图标 SVG 不包含
-
-        self._current_renderer = QSvgRenderer(QtCore.QByteArray(svg_data.encode('utf-8')))
-        if not self._current_renderer.isValid():
-            raise ValueError("Generated SVG is invalid")
-
     def setColor(self, color: QtGui.QColor):
         if self._color != color:
             self._color = QtGui.QColor(color)  # 确保拷贝
-            self._update_renderer()
 
     def getColor(self):
         return self._color
 
     color = QtCore.Property(QtGui.QColor, getColor, setColor)
 
-    def pixmap(self, size: QtCore.QSize, color: QtGui.QColor = None) -> QtGui.QPixmap:
-        if color is not None and color != self._color:
-            # 临时颜色：创建临时 renderer
-            temp_gen = ColorIconGenerator(self._original_svg_data, color)
-            return temp_gen.pixmap(size)
-        else:
-            pixmap = QtGui.QPixmap(size)
-            pixmap.fill(QtCore.Qt.GlobalColor.transparent)
-            painter = QtGui.QPainter(pixmap)
-            self._current_renderer.render(painter)
-            painter.end()
-            return pixmap
+    def pixmap(self, size: QtCore.QSize, color: QtGui.QColor = None, dpr: float = 1.0) -> QtGui.QPixmap:
+        '''color不传时使用当前颜色；dpr为设备像素比，传widget.devicePixelRatioF()时在HiDPI屏幕上不会发虚'''
+        return Icons.tinted(self._original_svg_data, size, self._color if color is None else color, dpr)
 
-    def icon(self, size: QtCore.QSize, color: QtGui.QColor = None) -> QtGui.QIcon:
-        return QtGui.QIcon(self.pixmap(size, color))
\ No newline at end of file
+    def icon(self, size: QtCore.QSize, color: QtGui.QColor = None, dpr: float = 1.0) -> QtGui.QIcon:
+        return QtGui.QIcon(self.pixmap(size, color, dpr))
@@ -0,0 +1,228 @@
+'''
+图标和图片的共享缓存
+\n同一个文件在同一尺寸、同一设备像素比（HiDPI屏幕的缩放倍数）下只栅格化一次，之后所有控件拿到的都是同一个QPixmap/QIcon
+\n路径可以是相对于程序目录的资源路径（如assets/folder.svg），也可以是resource_path()之后的绝对路径
+'''
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+from PySide6 import QtGui, QtCore
+from PySide6.QtSvg import QSvgRenderer
+import threading, logging, time, re
+from core.func import resource_path
+
+logger = logging.getLogger(__name__)
+
+MAX_PIXMAPS = 256 # 缓存的栅格化结果数量上限，超出后丢弃最久没用过的
+
+# 启动时预先栅格化的图标及其逻辑尺寸，见preload()
+PRELOAD = {
+    **{f'assets/icon/{key}.png': (36,) for key in ('fabric', 'neoforge', 'forge', 'quilt', 'release', 'optifine', 'snapshot', 'unknown')}, # 版本卡片的加载器图标
+    'assets/folder.svg': (16,), # 版本卡片和游戏文件夹的悬浮按钮
+    'assets/delete.svg': (16,),
+    'assets/refresh.svg': (),
+    'assets/icon/github.svg': (),
+    'assets/section_fold.svg': ()
+}
+
+_lock = threading.RLock()
+_pixmaps: OrderedDict[tuple, QtGui.QPixmap] = OrderedDict()
+_icons: dict[tuple, QtGui.QIcon] = {}
+_renderers: dict[str, QSvgRenderer] = {}
+
+def _lru_put(cache: OrderedDict, key: tuple, value):
+    cache[key] = value
+    if len(cache) > MAX_PIXMAPS:
+        cache.popitem(last=False)
+    return value
+
+@lru_cache(maxsize=None)
+def _abspath(path: str | Path) -> str:
+    path = Path(path)
+    return str(path if path.is_absolute() else Path(resource_path(str(path))))
+
+def _is_svg(path: str) -> bool:
+    return path.lower().endswith('.svg')
+
+@lru_cache(maxsize=None)
+def svg_data(path: str | Path) -> str:
+    '''svg文件的文本（只读取一次）'''
+    with open(_abspath(path), 'r', encoding='utf-8') as f:
+        return f.read()
+
+def svg_renderer(path: str | Path) -> QSvgRenderer:
+    '''共享的QSvgRenderer，可用于QGraphicsSvgItem.setSharedRenderer()，不要修改它'''
+    path = _abspath(path)
+    with _lock:
+        renderer = _renderers.get(path)
+        if renderer is None:
+            renderer = _renderers[path] = QSvgRenderer(QtCore.QByteArray(svg_data(path).encode('utf-8')))
+            if not renderer.isValid():
+                logger.error(f"无法解析svg图标: {path}")
+        return renderer
+
+@lru_cache(maxsize=64)
+def _source_image(path: str) -> QtGui.QImage:
+    image = QtGui.QImage(path)
+    if image.isNull():
+        logger.error(f"无法加载图标: {path}")
+    return image
+
+def device_pixel_ratios() -> tuple[float, ...]:
+    '''当前所有屏幕的设备像素比（总是包含1.0）'''
+    ratios = {1.0}
+    if QtGui.QGuiApplication.instance() is not None:
+        ratios.update(screen.devicePixelRatio() for screen in QtGui.QGuiApplication.screens())
+    return tuple(sorted(ratios))
+
+def _rasterize(path: str, width: int, height: int, dpr: float) -> QtGui.QPixmap:
+    pixel_width, pixel_height = max(1, round(width * dpr)), max(1, round(height * dpr))
+    if _is_svg(path):
+        image = QtGui.QImage(pixel_width, pixel_height, QtGui.QImage.Format_ARGB32_Premultiplied)
+        image.fill(QtCore.Qt.GlobalColor.transparent)
+        painter = QtGui.QPainter(image)
+        svg_renderer(path).render(painter)
+        painter.end()
+    else:
+        image = _source_image(path)
+        if not image.isNull():
+            image = image.scaled(pixel_width, pixel_height, QtCore.Qt.IgnoreAspectRatio, QtCore.Qt.SmoothTransformation)
+    pixmap = QtGui.QPixmap.fromImage(image)
+    pixmap.setDevicePixelRatio(dpr)
+    return pixmap
+
+def pixmap(path: str | Path, size: int | QtCore.QSize, dpr: float = 1.0) -> QtGui.QPixmap:
+    '''
+    取指定逻辑尺寸和设备像素比的图标
+
+    Args:
+        path: 图标路径（svg或位图）
+        size: 逻辑尺寸，int表示正方形
+        dpr: 设备像素比，传widget.devicePixelRatioF()；返回的QPixmap已设置好devicePixelRatio，按逻辑尺寸绘制即可
+    '''
+    path = _abspath(path)
+    width, height = (size, size) if isinstance(size, int) else (size.width(), size.height())
+    key = (path, width, height, round(dpr, 2))
+    with _lock:
+        cached = _pixmaps.get(key)
+        if cached is not None:
+            _pixmaps.move_to_end(key)
+            return cached
+        return _lru_put(_pixmaps, key, _rasterize(path, width, height, dpr))
+
+def icon(path: str | Path, sizes: tuple[int, ...] = ()) -> QtGui.QIcon:
+    '''
+    共享的QIcon
+
+    Args:
+        path: 图标路径
+        sizes: 需要预先栅格化的逻辑尺寸，每个尺寸会按device_pixel_ratios()各生成一张；
+            不传时svg交给Qt的svg引擎按需绘制，位图直接使用原图
+    '''
+    path = _abspath(path)
+    key = (path, tuple(sizes))
+    with _lock:
+        cached = _icons.get(key)
+        if cached is not None:
+            return cached
+        if sizes:
+            result = QtGui.QIcon()
+            for size in sizes:
+                for dpr in device_pixel_ratios():
+                    result.addPixmap(pixmap(path, size, dpr))
+        else:
+            result = QtGui.QIcon(path)
+        _icons[key] = result
+        return result
+
+def preload(items: dict[str, tuple[int, ...]] = PRELOAD):
+    '''启动时调用：把常用图标按需要的尺寸和当前屏幕的设备像素比全部栅格化'''
+    start = time.perf_counter()
+    for path, sizes in items.items():
+        try:
+            if _is_svg(path):
+                svg_renderer(path)
+            icon(path, sizes)
+        except OSError as e:
+            logger.error(f"预加载图标{path}失败: {e}")
+    logger.info(f"已预加载{len(items)}个图标，用时{(time.perf_counter() - start) * 1000:.1f}ms")
+
+# 着色图标：svg的形状只栅格化一次成为遮罩，之后每种颜色只是用遮罩的透明度填色，不再重新解析svg
+_SVG_COLOR = re.compile(r'(?i)(fill|stroke)="[^"]*"')
+_masks: OrderedDict[tuple, QtGui.QImage] = OrderedDict()
+_tinted: OrderedDict[tuple, QtGui.QPixmap] = OrderedDict()
+
+@lru_cache(maxsize=64)
+def mask_renderer(svg: str) -> QSvgRenderer:
+    '''
+    用于栅格化遮罩的renderer，同一段svg只解析一次
+
+    Raises:
+        ValueError: svg无法解析
+    '''
+    # 和原来改色的做法一样，把所有fill/stroke都换成同一种颜色，这样遮罩的形状和直接改色渲染出来的完全一致
+    renderer = QSvgRenderer(QtCore.QByteArray(_SVG_COLOR.sub(r'\1="#000000"', svg).encode('utf-8')))
+    if not renderer.isValid():
+        raise ValueError("Generated SVG is invalid")
+    return renderer
+
+def mask(svg: str, width: int, height: int, dpr: float = 1.0) -> QtGui.QImage:
+    '''
+    svg按指定尺寸栅格化后的遮罩（只有透明度有意义）
+
+    Args:
+        svg: svg文本（文件用svg_data()读取）
+
+    Raises:
+        ValueError: svg无法解析
+    '''
+    key = (svg, width, height, round(dpr, 2))
+    with _lock:
+        cached = _masks.get(key)
+        if cached is not None:
+            _masks.move_to_end(key)
+            return cached
+        image = QtGui.QImage(max(1, round(width * dpr)), max(1, round(height * dpr)), QtGui.QImage.Format_ARGB32_Premultiplied)
+        image.fill(QtCore.Qt.GlobalColor.transparent)
+        painter = QtGui.QPainter(image)
+        mask_renderer(svg).render(painter)
+        painter.end()
+        return _lru_put(_masks, key, image)
+
+def tinted(svg: str, size: int | QtCore.QSize, color: QtGui.QColor, dpr: float = 1.0) -> QtGui.QPixmap:
+    '''
+    指定颜色的纯色图标，同样的(svg, 尺寸, 颜色)只合成一次
+
+    Args:
+        svg: svg文本
+        size: 逻辑尺寸，int表示正方形
+        color: 图标颜色，忽略透明度（和原来改写svg颜色的效果一致）
+        dpr: 设备像素比
+
+    Raises:
+        ValueError: svg无法解析
+    '''
+    width, height = (size, size) if isinstance(size, int) else (size.width(), size.height())
+    rgb = QtGui.QColor(color).rgb() # 带不透明的alpha
+    key = (svg, width, height, round(dpr, 2), rgb)
+    with _lock:
+        cached = _tinted.get(key)
+        if cached is not None:
+            _tinted.move_to_end(key)
+            return cached
+        image = mask(svg, width, height, dpr).copy()
+        painter = QtGui.QPainter(image)
+        painter.setCompositionMode(QtGui.QPainter.CompositionMode_SourceIn) # 只在遮罩不透明的地方填色
+        painter.fillRect(image.rect(), QtGui.QColor.fromRgb(rgb))
+        painter.end()
+        result = QtGui.QPixmap.fromImage(image)
+        result.setDevicePixelRatio(dpr)
+        return _lru_put(_tinted, key, result)
+
+def clear():
+    '''清空栅格化的缓存（如屏幕的设备像素比改变后）'''
+    with _lock:
+        _pixmaps.clear()
+        _icons.clear()
+        _masks.clear()
+        _tinted.clear()
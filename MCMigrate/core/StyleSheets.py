@@ -0,0 +1,81 @@
+'''
+qss样式表的注册表
+\n启动时一次性读取qss文件夹下的全部样式表并去掉注释，之后按名称（文件名去掉.qss）取用，不会再读文件
+\n样式表只设置在应用程序或者界面的根控件上，子控件靠objectName匹配规则，不需要每个控件单独setStyleSheet
+（每次setStyleSheet都会让Qt重新解析一遍整个样式表，列表项多的时候很明显）
+'''
+from pathlib import Path
+from PySide6 import QtWidgets
+import re, time, logging
+from core.func import resource_path
+
+logger = logging.getLogger(__name__)
+
+QSS_DIR = 'qss'
+# 这些样式表的选择器都是唯一的objectName，而且对应的控件不只出现在某一个界面里，直接设置在应用程序上
+APP_SHEETS = ('collapsible_box', 'dialog', 'menu')
+
+_COMMENT = re.compile(r'/\*.*?\*/', re.S)
+
+class StyleRegistry:
+    def __init__(self, qss_dir: str = QSS_DIR):
+        self.qss_dir = qss_dir
+        self._sheets: dict[str, str] = {}
+        self._loaded = False
+
+    def preload(self):
+        '''读取qss_dir下的全部样式表，重复调用会重新读取'''
+        start = time.perf_counter()
+        sheets = {}
+        for path in sorted(Path(resource_path(self.qss_dir)).glob('*.qss')):
+            try:
+                text = path.read_text(encoding='utf-8')
+            except OSError as e:
+                logger.error(f"加载样式表{path.name}失败: {e}")
+                continue
+            sheets[path.stem] = _COMMENT.sub('', text).strip()
+        self._sheets, self._loaded = sheets, True
+        logger.info(f"已加载{len(sheets)}个样式表，用时{(time.perf_counter() - start) * 1000:.1f}ms")
+
+    def get(self, *names: str) -> str:
+        '''
+        按名称取出样式表，多个时按顺序拼在一起（后面的同优先级规则会覆盖前面的）
+
+        Raises:
+            KeyError: 没有这个样式表
+        '''
+        if not self._loaded:
+            self.preload()
+        return '\n'.join(self._sheets[name] for name in names)
+
+    def apply(self, widget: QtWidgets.QWidget | QtWidgets.QApplication, *names: str, extra: str = ''):
+        '''
+        把样式表设置到widget（或QApplication）上，并记录Qt解析应用所花的时间
+
+        Args:
+            widget: 界面的根控件，或者QApplication
+            *names: 样式表名称
+            extra: 追加在最后的样式，用于只属于这个界面、没有单独文件的规则
+        '''
+        sheet = self.get(*names)
+        if extra:
+            sheet = f"{sheet}\n{extra}"
+        start = time.perf_counter()
+        widget.setStyleSheet(sheet)
+        logger.debug(f"{type(widget).__name__}应用样式表{', '.join(names)}，用时{(time.perf_counter() - start) * 1000:.1f}ms")
+
+registry = StyleRegistry()
+
+def preload():
+    registry.preload()
+
+def get(*names: str) -> str:
+    return registry.get(*names)
+
+def apply(widget: QtWidgets.QWidget | QtWidgets.QApplication, *names: str, extra: str = ''):
+    registry.apply(widget, *names, extra=extra)
+
+def apply_app(app: QtWidgets.QApplication):
+    '''启动时调用一次：读取全部样式表，并把APP_SHEETS设置到应用程序上'''
+    registry.preload()
+    registry.apply(app, *APP_SHEETS)
@@ -1,10 +1,9 @@
 import time
 from PySide6 import QtWidgets, QtGui, QtCore
 from PySide6.QtSvgWidgets import QGraphicsSvgItem
-from core.func import resource_path, load_stylesheet
 from windows.MainWindow import MainWindow
 from pathlib import Path
-from core import ClientLibs
+from core import ClientLibs, Icons
 import Animation
 
 class CollapsibleBox(QtWidgets.QWidget):
@@ -68,7 +67,6 @@ class CollapsibleBox(QtWidgets.QWidget):
         def __init__(self, text: str, parent):
             super().__init__(parent)
             self.setObjectName('selection_bar')
-            self.setStyleSheet(load_stylesheet(resource_path('qss/collapsible_box.qss')))
             self.setLayout(QtWidgets.QHBoxLayout())
             self.layout().setContentsMargins(5,5,5,5)
 
@@ -80,7 +78,8 @@ class CollapsibleBox(QtWidgets.QWidget):
             # 小图标
             self.icon_view = QtWidgets.QGraphicsView(self)
             self.icon_view.setScene(QtWidgets.QGraphicsScene())
-            self.icon = QGraphicsSvgItem(resource_path("assets/section_fold.svg"))
+            self.icon = QGraphicsSvgItem()
+            self.icon.setSharedRenderer(Icons.svg_renderer("assets/section_fold.svg")) # 所有折叠框共用一个renderer，不再各自解析svg
             self.icon_view.scene().addItem(self.icon)
             # 图标大小
             font_height = self.fontMetrics().height()
@@ -131,6 +130,9 @@ class CollapsibleBox(QtWidgets.QWidget):
             super().paintEvent(arg__1)
 
     class Item(QtWidgets.QWidget):
+        COLOR_NORMAL = QtGui.QColor('#ffffff')
+        COLOR_HOVER = QtGui.QColor("#89E1DD")
+        COLOR_PRESSED = QtGui.QColor("#6FCBC7")
         def __init__(self, text: str, data, parent: 'CollapsibleBox.ItemList'=None):
             super().__init__(parent)
             self.data = data
@@ -141,30 +143,23 @@ class CollapsibleBox(QtWidgets.QWidget):
             self.setAutoFillBackground(True)
             self.layout().addWidget(self.text)
             self.layout().setAlignment(QtCore.Qt.AlignmentFlag.AlignLeft)
+            self.anim = Animation.ColorTransition.for_palette(self) # 悬停和点击共用，快速划过时不会堆积动画
         
         def mousePressEvent(self, event):
             super().mousePressEvent(event)
             self.parent_list.selected.emit(self)
-
-            # 动画部分
-            self.anim = QtCore.QSequentialAnimationGroup()
-            self.anim.addAnimation(Animation.ChangeColor(self, QtGui.QColor("#6FCBC7"), color_role=self.backgroundRole(), duration=100))  
-            self.anim.addPause(120)
-            self.anim.addAnimation(Animation.ChangeColor(self, QtGui.QColor("#89E1DD"), color_role=self.backgroundRole(), duration=60))
-            self.anim.start()
+            self.anim.flash(self.COLOR_PRESSED, self.COLOR_HOVER)
 
         def enterEvent(self, event):
             super().enterEvent(event)
             self.parent_list.hover_item = self
-            self.anim = Animation.ChangeColor(self, QtGui.QColor("#89E1DD"), color_role=self.backgroundRole(), duration=100)
-            self.anim.start()
+            self.anim.to(self.COLOR_HOVER, 100)
             
         def leaveEvent(self, event):
             super().leaveEvent(event)
             if self.parent_list.hover_item == self:
                 self.parent_list.hover_item = None
-            self.anim = Animation.ChangeColor(self, QtGui.QColor('#ffffff'), color_role=self.backgroundRole(), duration=100)
-            self.anim.start()
+            self.anim.to(self.COLOR_NORMAL, 100)
     
     class ItemList(QtWidgets.QScrollArea):
         CLICKED_INTERVAL = 0.1 # 100ms点击间隔限制
@@ -216,6 +211,11 @@ class CollapsibleBox(QtWidgets.QWidget):
                 main_window.add_global_click_event(global_click_event)
                 self.destroyed.connect(lambda: main_window.remove_global_click_event(global_click_event))
 
+            # 折叠和展开动画
+            self.fade = Animation.Fade(self, duration_in=90, duration_out=100)
+            self.anim_move = QtCore.QPropertyAnimation(self, b'pos', self)
+            self.anim_move.setDuration(100)
+
             # 调整位置
             self.move(self.expand_pos)
             self.hide()
@@ -226,27 +226,23 @@ class CollapsibleBox(QtWidgets.QWidget):
             self.fold_pos = self.expand_pos + QtCore.QPoint(0, -20)
 
             self.raise_()
-            self.show()
             self.is_folded = False
-            self.anim_move_in = QtCore.QPropertyAnimation(self, b'pos')
-            self.anim_move_in.setDuration(100)
-            self.anim_move_in.setStartValue(self.fold_pos)
-            self.anim_move_in.setEndValue(self.expand_pos)
-            self.anim = QtCore.QParallelAnimationGroup()
-            self.anim.addAnimation(self.anim_move_in)
-            self.anim.addAnimation(Animation.FadeIn(self,90))
-            self.anim.start()
+            if not self.isVisible():
+                self.move(self.fold_pos)
+            self.move_to(self.expand_pos)
+            self.fade.fade_in()
 
         def fold(self):
             self.is_folded = True
-            self.anim_move_out = QtCore.QPropertyAnimation(self, b'pos')
-            self.anim_move_out.setDuration(100)
-            self.anim_move_out.setEndValue(self.fold_pos)
-            self.anim = QtCore.QParallelAnimationGroup()
-            self.anim.addAnimation(self.anim_move_out)
-            self.anim.addAnimation(Animation.FadeOut(self))
-            self.anim.finished.connect(self.hide)
-            self.anim.start()
+            self.move_to(self.fold_pos)
+            self.fade.fade_out() # 淡出后隐藏
+
+        def move_to(self, pos: QtCore.QPoint):
+            '''从当前位置移动到pos'''
+            self.anim_move.stop()
+            self.anim_move.setStartValue(self.pos())
+            self.anim_move.setEndValue(pos)
+            Animation.driver.start(self.anim_move)
 
         def add_item(self, text: str, data=None):
             item = CollapsibleBox.Item(text, data, self)
@@ -271,32 +267,28 @@ class TransparentColorButton(QtWidgets.QPushButton):
         self.icon_size = min(self.height(), self.width())
         self.icon_gen = ClientLibs.ColorIconGenerator(icon_path, theme_color)
         self.setToolTip(tool_tips)
-        self.setIcon(self.icon_gen.icon(QtCore.QSize(self.icon_size, self.icon_size), self.theme_color))
+        self.setIcon(self.icon_gen.icon(QtCore.QSize(self.icon_size, self.icon_size), self.theme_color, self.devicePixelRatioF()))
         self.setContentsMargins(0,0,0,0)
         self.setSizePolicy(QtWidgets.QSizePolicy.Policy.Expanding, QtWidgets.QSizePolicy.Policy.Expanding)
+        # 背景和图标颜色的过渡，悬停、离开和点击都复用这两个
+        self.anim_btn = Animation.ColorTransition.for_palette(self, QtGui.QPalette.ColorRole.Button)
+        self.anim_icon = Animation.ColorTransition(self, theme_color, self.set_icon_color)
+
+    def set_icon_color(self, color: QtGui.QColor):
+        self.icon_gen.setColor(color)
+        side = min(self.width(), self.height())
+        self.setIcon(self.icon_gen.icon(QtCore.QSize(side, side), color, self.devicePixelRatioF()))
 
     def enterEvent(self, event):
         super().enterEvent(event)
-        self.anim_btn = Animation.ChangeColor(self, QtGui.QColor(self.theme_color), duration=120, color_role=QtGui.QPalette.ColorRole.Button)
-        self.anim_icon = Animation.ChangeButtonIconColorTransiting(self, self.icon_gen, QtGui.QColor(self.default_color), duration=120)
-        self.anim = QtCore.QParallelAnimationGroup()
-        self.anim.addAnimation(self.anim_btn)
-        self.anim.addAnimation(self.anim_icon)
-        self.anim.start()
+        self.anim_btn.to(self.theme_color, 120)
+        self.anim_icon.to(self.default_color, 120)
 
     def leaveEvent(self, event):
         super().leaveEvent(event)
-        self.anim_btn = Animation.ChangeColor(self, QtGui.QColor(self.default_color), duration=120, color_role=QtGui.QPalette.ColorRole.Button)
-        self.anim_icon = Animation.ChangeButtonIconColorTransiting(self, self.icon_gen, QtGui.QColor(self.theme_color), duration=120)
-        self.anim = QtCore.QParallelAnimationGroup()
-        self.anim.addAnimation(self.anim_btn)
-        self.anim.addAnimation(self.anim_icon)
-        self.anim.start()
+        self.anim_btn.to(self.default_color, 120)
+        self.anim_icon.to(self.theme_color, 120)
 
     def mousePressEvent(self, e):
         super().mousePressEvent(e)
-        self.anim = QtCore.QSequentialAnimationGroup()
-        self.anim.addAnimation(Animation.ChangeColor(self, self.clicked_color, color_role=QtGui.QPalette.ColorRole.Button, duration=100))  
-        self.anim.addPause(120)
-        self.anim.addAnimation(Animation.ChangeColor(self, self.theme_color, color_role=QtGui.QPalette.ColorRole.Button, duration=60))
-        self.anim.start()
\ No newline at end of file
+        self.anim_btn.flash(self.clicked_color, self.theme_color)
\ No newline at end of file
@@ -1,5 +1,5 @@
 from pathlib import Path
-import os, sys, shutil, logging, json
+import os, sys, shutil, logging, json, copy, time, threading, atexit
 
 def clean_log_folder(LOG_DIR: str):
     '''清理logs，维持日志文件数量在7个'''
@@ -27,37 +27,146 @@ def load_stylesheet(path):
         logging.error(f"加载样式表失败: {e}")
         return ""
     
-def get_app_state() -> dict:
-    '''获取用户上次关闭程序时的窗口状态'''
-    try:
-        with open('app_state.json', 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return new_app_state()
-    
-def new_app_state() -> dict:
-    '''生成初始的app_state.json文件'''
-    default_state = {
+APP_STATE_JSON = 'app_state.json'
+
+def _default_app_state() -> dict:
+    return {
+        "window_size": [1024, 768],
         "migrate": {
-            "window_size": [1024, 768],
             "splitter_state": None,
             "latest_game_folder_path": None
         }
     }
-    with open('app_state.json', 'w', encoding='utf-8') as f:
-        json.dump(default_state, f, indent=4)
+
+class AppStateStore:
+    '''
+    app_state.json的内存副本
+    \n读取只在第一次使用时进行；修改只改内存，停止修改FLUSH_DELAY秒后才合并写入一次（拖动窗口大小时不会每一帧都写文件），
+    一直在修改时最多等MAX_DELAY秒
+    \n写入时先写临时文件再替换，程序退出时会再写入一次还没保存的修改
+    '''
+    FLUSH_DELAY = 1.0
+    MAX_DELAY = 5.0
+
+    def __init__(self, path: str = APP_STATE_JSON):
+        self.path = path
+        self._state: dict | None = None
+        self._dirty = False
+        self._first_change = self._last_change = 0.0
+        self._timer: threading.Timer | None = None
+        self._lock = threading.RLock()
+
+    def _loaded(self) -> dict:
+        if self._state is None:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    state = json.load(f)
+                if not isinstance(state, dict):
+                    raise ValueError('app_state.json的内容不是字典')
+            except FileNotFoundError:
+                state = _default_app_state()
+            except (OSError, ValueError) as e:
+                logging.warning(f"读取app_state.json失败，使用默认状态: {e}")
+                state = _default_app_state()
+            self._state = state
+        return self._state
+
+    def get(self, *keys, default=None):
+        '''按多级键读取，不存在时返回default'''
+        with self._lock:
+            current = self._loaded()
+            for key in keys:
+                if not isinstance(current, dict) or key not in current:
+                    return default
+                current = current[key]
+            return copy.deepcopy(current)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return copy.deepcopy(self._loaded())
+
+    def set(self, value, *keys):
+        '''修改指定键值（中间缺少的层级会自动创建），稍后写入文件'''
+        with self._lock:
+            current = self._loaded()
+            for key in keys[:-1]:
+                if not isinstance(current.get(key), dict):
+                    current[key] = {}
+                current = current[key]
+            if current.get(keys[-1]) == value:
+                return
+            current[keys[-1]] = copy.deepcopy(value)
+            self._mark_dirty()
+
+    def replace(self, state: dict):
+        with self._lock:
+            self._state = copy.deepcopy(state)
+            self._mark_dirty()
+
+    def _mark_dirty(self):
+        now = time.monotonic()
+        if not self._dirty:
+            self._first_change = now
+        self._dirty = True
+        self._last_change = now
+        if self._timer is None: # 已经在等待写入的话，到时间后会根据最后一次修改的时间决定是否继续等
+            self._start_timer(self.FLUSH_DELAY)
+
+    def _start_timer(self, delay: float):
+        self._timer = threading.Timer(delay, self._on_timer)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _on_timer(self):
+        with self._lock:
+            self._timer = None
+            if not self._dirty:
+                return
+            now = time.monotonic()
+            wait = min(self._last_change + self.FLUSH_DELAY, self._first_change + self.MAX_DELAY) - now
+            if wait > 0:
+                self._start_timer(wait)
+                return
+            self.flush()
+
+    def flush(self):
+        '''立即写入还没保存的修改'''
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._dirty:
+                return
+            tmp_path = self.path + '.tmp'
+            try:
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(self._state, f, indent=4)
+                os.replace(tmp_path, self.path)
+                self._dirty = False
+            except OSError as e:
+                logging.error(f"保存app_state.json失败: {e}")
+
+app_state = AppStateStore()
+atexit.register(app_state.flush) # 退出前写入还没保存的修改
+
+def get_app_state() -> dict:
+    '''获取用户上次关闭程序时的窗口状态（内存中的副本，不会读写文件）'''
+    return app_state.snapshot()
+    
+def new_app_state() -> dict:
+    '''重置为初始的窗口状态'''
+    default_state = _default_app_state()
+    app_state.replace(default_state)
     return default_state
 
 def save_app_state(state: dict):
-    '''保存当前窗口状态到app_state.json'''
-    with open('app_state.json', 'w', encoding='utf-8') as f:
-        json.dump(state, f, indent=4)
+    '''保存当前窗口状态，稍后写入app_state.json'''
+    app_state.replace(state)
 
 def modify_app_state(value, *keys):
-    '''修改app_state.json中的指定键值'''
-    state = get_app_state()
-    current = state
-    for key in keys[:-1]:
-        current = current[key]
-    current[keys[-1]] = value
-    save_app_state(state)
\ No newline at end of file
+    '''修改app_state.json中的指定键值，稍后写入'''
+    app_state.set(value, *keys)
+
+def flush_app_state():
+    '''立即写入app_state.json（程序退出时调用）'''
+    app_state.flush()
@@ -1,13 +1,12 @@
 from PySide6 import QtCore, QtWidgets, QtGui
 from terminal.Terminal import Terminal
-from terminal.func import version
 from logging.handlers import TimedRotatingFileHandler
-import os, sys, logging, time, json, core.func
+import os, sys, logging, time, core.func
 
-from windows.Migrate import Migrate
-from windows.Welcome import Welcome
 from windows.MainWindow import MainWindow
+from core import StyleSheets, Icons
 from message import Dialog, Message
+import Animation
 
 # 配置日志文件夹
 BASE_DIR = os.path.dirname(sys.executable) if getattr(sys, 'frozen', False) else os.path.dirname(__file__)
@@ -40,9 +39,11 @@ core.func.clean_log_folder(LOG_DIR)
         
 # 初始化主窗口
 app = QtWidgets.QApplication([])
+StyleSheets.apply_app(app) # 启动时一次性读取全部样式表，之后界面和控件都不再读qss文件
+Icons.preload() # 以及按屏幕缩放栅格化常用图标
 window = MainWindow(app)
 window.setWindowTitle("MCMigrator")
-window.setWindowIcon(QtGui.QIcon(core.func.resource_path("assets/icon_64x64.png")))
+window.setWindowIcon(Icons.icon("assets/icon_64x64.png"))
 window.resize(800, 400)
 
 # 设置全局异常处理器
@@ -71,6 +72,9 @@ sys.excepthook = handle_exception
 
 # 初始化 Terminal
 terminal = Terminal(window)
+app.aboutToQuit.connect(terminal.close) # 退出前写入还没保存的游戏库改动
+app.aboutToQuit.connect(core.func.flush_app_state) # 以及还没写入的窗口状态
+app.aboutToQuit.connect(Animation.driver.shutdown) # 控件销毁前停下所有动画
 
 def show_dialog_slot(title: str, level, content_text: str, payload: dict):
     buttons = payload['buttons']      # tuple
@@ -82,42 +86,31 @@ terminal.dialog_requested.connect(show_dialog_slot)
 terminal.dialog_series_requested.connect(window.dialog.ask_in_series)
 
 def show_welcome():
-    window.setCentralWidget(Welcome(terminal=terminal))
+    terminal.switch_window(Terminal.WindowEnum.WELCOME)
 
-# 加载界面
-if os.path.exists("versions.json") and os.path.getsize("versions.json") > 0:
-    versions = version.get_versions()
+# 加载界面（游戏库已由terminal加载进内存，不需要再读一遍versions.json）
+if terminal.get_games() == []:
+    show_welcome()
+else:
     try:
-        if versions == []: 
-            show_welcome()
-        else:
-            try:
-                migrate = Migrate(terminal=terminal)
-                window.setCentralWidget(migrate)
-            except (ValueError, KeyError):
-                logging.error("解析versions.json文件失败")
-                show_welcome()
-                terminal.send_message("加载版本列表失败：解析versions.json文件失败", Message.Level.ERROR)
-            except Exception as e:
-                logging.error(f"加载主界面时发生错误：{e}")
-                show_welcome()
-                terminal.send_message(f"加载主界面时发生错误：{e}", Message.Level.ERROR)
-    except json.JSONDecodeError:
+        terminal.switch_window(Terminal.WindowEnum.MIGRATE) # 迁移界面会被缓存，之后切换回来不会重新生成
+    except (ValueError, KeyError):
         logging.error("解析versions.json文件失败")
         show_welcome()
         terminal.send_message("加载版本列表失败：解析versions.json文件失败", Message.Level.ERROR)
-else:
-    show_welcome()
-    terminal.send_message("加载版本列表失败：解析versions.json文件失败", Message.Level.ERROR)
+    except Exception as e:
+        logging.error(f"加载主界面时发生错误：{e}")
+        show_welcome()
+        terminal.send_message(f"加载主界面时发生错误：{e}", Message.Level.ERROR)
 window.show()
 
 # 用户操作记录部分
 # 读取窗口大小记录
 try:
-    window.resize(*core.func.get_app_state()['window_size'])
+    window.resize(*core.func.app_state.get('window_size'))
 except Exception:
     pass
-# 监听窗口大小变化以记录操作
+# 监听窗口大小变化以记录操作（只改内存中的状态，停下来之后才会合并写入文件）
 window.resizeEvent = lambda event: (
     QtWidgets.QMainWindow.resizeEvent(window, event),
     core.func.modify_app_state([window.width(), window.height()], 'window_size')
@@ -8,7 +8,6 @@ from typing import Callable, Dict, Any, Iterable
 from enum import Enum
 from dataclasses import dataclass
 from utils.func import hex_rgba_to_tuple
-from core.func import resource_path, load_stylesheet
 import Animation
 
 class Level(Enum):
@@ -42,6 +41,8 @@ class DialogWindow(QtWidgets.QWidget):
         self.parent_widget = parent_widget
         self.can_not_be_covered = False
         self.level = level
+        self.fade = Animation.Fade(self, duration_in=300, duration_out=100)
+        self.fade.faded_out.connect(self.close)
 
         # 因为要适配后端创建窗口时无parent_widget的情况，所以把之前需要parent_widget的代码移到update()，在show()的时候再更新
         
@@ -49,7 +50,6 @@ class DialogWindow(QtWidgets.QWidget):
         self.dialog_window = QtWidgets.QWidget(self)
         self.dialog_window.setFixedSize(500, 240)
         self.dialog_window.setObjectName("dialogWindow")
-        self.dialog_window.setStyleSheet(load_stylesheet(resource_path("qss/dialog.qss")))
         self.dialog_window.setLayout(QtWidgets.QVBoxLayout())
         self.dialog_window.layout().setSpacing(5)
         self.dialog_window.setContentsMargins(0, 0, 0, 0)
@@ -62,7 +62,6 @@ class DialogWindow(QtWidgets.QWidget):
         # 内容文本
         self.content_text = QtWidgets.QLabel(content_text, self.dialog_window)
         self.content_text.setObjectName("contentText")
-        self.content_text.setStyleSheet(load_stylesheet(resource_path("qss/dialog.qss")))
         self.content_text.setMaximumWidth(self.dialog_window.width() - 30)
         self.content_text.setWordWrap(True)
         self.content_text.setSizePolicy(QtWidgets.QSizePolicy.Fixed, QtWidgets.QSizePolicy.Expanding)
@@ -72,7 +71,6 @@ class DialogWindow(QtWidgets.QWidget):
         self.content_text_view.setWidget(self.content_text)
         self.content_text_view.setWidgetResizable(True)
         self.content_text_view.setObjectName('contentTextView')
-        self.content_text_view.setStyleSheet(load_stylesheet(resource_path("qss/dialog.qss")))
         self.dialog_window.layout().addWidget(self.content_text_view)
 
         # 按钮区
@@ -81,7 +79,6 @@ class DialogWindow(QtWidgets.QWidget):
         self.button_section.setLayout(QtWidgets.QHBoxLayout())
         self.button_section.layout().setAlignment(QtCore.Qt.AlignmentFlag.AlignRight)
         self.button_section.setObjectName("buttonSection")
-        self.button_section.setStyleSheet(load_stylesheet(resource_path("qss/dialog.qss")))
         self.dialog_window.layout().addWidget(self.button_section, 0)
         # 添加按钮
         if buttons:
@@ -130,7 +127,7 @@ class DialogWindow(QtWidgets.QWidget):
         super().show()
 
     def show_with_animation(self):
-        self.show()
+        self.fade.fade_in() # 先设为透明再show()
         self.raise_()
 
         # 先将其移到中心，并设为 0 大小
@@ -138,15 +135,9 @@ class DialogWindow(QtWidgets.QWidget):
         self.dialog_window.move(center.x() - 250, center.y() - 120)  # 初始位置（目标中心）
         self.dialog_window.resize(0, 0)  # 从 0 开始
         self.dialog_window.show()
-
-        # 透明度动画
-        self.anim = Animation.FadeIn(self)
-        self.anim.start()
     
     def close_with_animation(self):
-        self.anim = Animation.FadeOut(self)
-        self.anim.finished.connect(self.close)
-        self.anim.start()
+        self.fade.fade_out() # 淡出后close()
     
     def close(self):
         self.closed.emit()
@@ -195,23 +186,18 @@ class DialogWindow(QtWidgets.QWidget):
                 if dialog_window:
                     self.parent_widget = dialog_window
                 self.button = button
-                self.anim = None
+                self.fade = Animation.Fade(self, duration_in=200, duration_out=100)
                 self.setObjectName('hoverText')
-                self.setStyleSheet(load_stylesheet(resource_path("qss/dialog.qss")))
                 self.adjustSize()
 
             def show_with_anim(self):
                 self.raise_()
                 if not self.parent(): self.setParent(self.parent_widget.parentWidget()) # 适配DialogSeriesButton, 防止初始化的时候parent_widget.parentWidget()为None
                 self.move(self.button.mapTo(self.parentWidget(), QtCore.QPoint((self.button.width()-self.width())/2, -self.button.height()-2))) # 移动到按钮上方中央
-                self.show()
-                self.anim = Animation.FadeIn(self, duration=200)
-                self.anim.start()
+                self.fade.fade_in()
 
             def hide_with_anim(self):
-                self.anim = Animation.FadeOut(self)
-                self.anim.finished.connect(self.hide)
-                self.anim.start()
+                self.fade.fade_out()
 
 class DialogSeries(QtCore.QObject):
     '''
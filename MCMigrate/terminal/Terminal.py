@@ -3,34 +3,80 @@ from typing import Callable, Union
 from pathlib import Path
 from PySide6 import QtWidgets, QtCore
 from windows.MainWindow import MainWindow
-import os, shutil, json, logging
+import json, logging, sqlite3, threading
 
-from utils import func
-from terminal.func import version, mod, config
+from terminal.func import version, config, library, library_store, progress, jobqueue, migrate
 from message import Message, Dialog, DisplayMessageable
 import MCException
 
 logging.basicConfig(level=logging.INFO)
 
 class Terminal(Message.Messageable, Dialog.Dialogable):
+    library_changed = QtCore.Signal(str) # 游戏库发生改变时发出，参数为library.Event中的事件类型
+    library_save_failed = QtCore.Signal(str) # 后台写入游戏库失败，可能从计时器线程发出，参数为错误信息
     def __init__(self, main_window: MainWindow):
         super().__init__(__name__)
+        self.library_save_failed.connect(self._on_library_save_failed, QtCore.Qt.ConnectionType.QueuedConnection) # 排队到GUI线程再弹消息
         self.config = config.get_config()
         self.main_window = main_window
-        self.thread_migrate = QtCore.QThread()
-        self.task_migrate = None
+        self.scheduler = MigrateScheduler(self) # 迁移任务队列
+        if config.get_settings().library.manifest_cache: # 跨次扫描缓存jar包内的版本信息
+            version.enable_persistent_cache()
 
         # versions.json索引部分
         try:
-            self.versions_manager = VersionsJsonManager(self)
+            self.versions_manager = self._open_library()
+        except (sqlite3.DatabaseError, OSError) as e: # library.db损坏或被其他进程锁住, 这次先用versions.json
+            logging.exception(f"打开游戏库数据库失败: {e}")
+            self.versions_manager = self._open_library('json')
+            self._send_message_later(f'打开游戏库数据库失败（{e}），本次改用versions.json保存游戏库，如果数据库已损坏可以删除{library_store.LIBRARY_DB}后重启', Message.Level.ERROR)
+        self.versions_manager.library.add_listener(self._on_library_event)
+
+    def _open_library(self, backend: str = None) -> 'VersionsJsonManager':
+        '''
+        加载游戏库，versions.json是旧格式时先升级，格式无法识别时重置
+        Args:
+            backend(str): 持久化后端，None时使用config.yml中的library.backend
+        Raises:
+            sqlite3.DatabaseError: library.db无法打开或已损坏
+            OSError: 游戏库文件无法读写
+        '''
+        try:
+            return VersionsJsonManager(self, backend)
         except KeyError:
-            games_json = version.get_versions()
-            if not isinstance(games_json[0].get('versions', None), dict) and isinstance(games_json[0].get('game_jar', None), str): # 升级旧版本versions.json
-                version.update_versions_json()
+            if library_store.is_legacy_versions_json(library_store.read_versions_json()): # 升级旧版本versions.json（sqlite后端会在重新加载时导入升级后的文件）
+                library_store.upgrade_versions_json()
             else: # versions.json格式又炸了, 重置
                 version.gen_new_versions()
-                self.send_message('加载versions.json文件时出错，已重置文件')
-            self.versions_manager = VersionsJsonManager(self)
+                self._send_message_later('加载versions.json文件时出错，已重置文件')
+            return VersionsJsonManager(self, backend)
+
+    @QtCore.Slot(str)
+    def _on_library_save_failed(self, error: str):
+        self.send_message(f'保存游戏库失败: {error}', Message.Level.ERROR)
+
+    def _send_message_later(self, msg: str, level: Message.Level = Message.Level.INFO):
+        '''构造期间消息信号还没有连接到窗口，等事件循环开始后再发送'''
+        QtCore.QTimer.singleShot(0, self, lambda: self.send_message(msg, level))
+
+    def _on_library_event(self, event: str, games: list):
+        self.library_changed.emit(event)
+
+    def close(self):
+        '''程序退出前调用，暂停正在运行的迁移任务（下次启动后可以继续），写入还没保存的游戏库改动'''
+        self.scheduler.close()
+        # 窗口马上就要销毁了, 之后游戏库的改动（比如还没停下的后台线程）不能再通知到界面
+        self.versions_manager.library.remove_listener(self._on_library_event)
+        try:
+            self.library_changed.disconnect()
+        except (RuntimeError, TypeError): # 没有连接过
+            pass
+        self.versions_manager.close()
+
+    @property
+    def task_migrate(self) -> 'TaskMigrateAbortable | None':
+        '''当前正在运行的迁移任务中排在最前面的一个'''
+        return self.scheduler.current_task()
     # == 前端封装方法 ==
 
     def import_version(self) -> list[dict] | None:
@@ -48,9 +94,7 @@ class Terminal(Message.Messageable, Dialog.Dialogable):
         if version_path == Path("."): return None # 传空值就忽略，什么消息也不发
         # 开始解析版本路径
         try:
-            versions = self.check_and_apply_import_result(version.add_game(version_path))
-            self.versions_manager.refresh()
-            return versions
+            return self.check_and_apply_import_result(version.add_game(version_path))
         except MCException.NotMCGameFolder as e:
             self.send_message(f"{e}", Message.Level.ERROR)
             return None
@@ -59,9 +103,7 @@ class Terminal(Message.Messageable, Dialog.Dialogable):
             return None
 
     def import_versions_from_pcl(self):
-        versions = self.check_and_apply_import_result(version.get_versions_from_pcl())
-        self.versions_manager.refresh()
-        return versions
+        return self.check_and_apply_import_result(version.get_versions_from_pcl())
         
     def check_and_apply_import_result(self, result: version.PathParseResult | list[version.PathParseResult]) -> list[dict] | None:
         '''
@@ -69,24 +111,14 @@ class Terminal(Message.Messageable, Dialog.Dialogable):
         Returns:
             list[dict]|None: 完成写入之后的versions.json中内容。若为None，则说明正在向用户询问版本隔离的信息。
         '''
-        def _finish_import_versions() -> list[dict]: # 将结果写入导入
-            try:
-                if versions:= version.get_versions():
-                    self.versions_manager.games_json = versions
-                    return versions
-                raise IOError("version.json内容为空")
-            except (IOError, OSError) as e:
-                self.send_message(f"读取versions.json失败：{e}", Message.Level.ERROR)
-                return None
-            except json.JSONDecodeError:
-                self.send_message("解析versions.json时失败", Message.Level.ERROR)
-                return None
-            except Exception as e:
-                self.send_message(f"发生了意外的错误：{e}", Message.Level.ERROR)
-                return None
+        def _finish_import_versions() -> list[dict]: # 结果已经合并进游戏库了，直接返回内存里的内容
+            if versions:= self.get_games():
+                return versions
+            self.send_message("游戏库内容为空", Message.Level.ERROR)
+            return None
 
         if isinstance(result, version.PathParseResult) and result.is_suc: # 只有一个PathParseResult的情况，且全解析成功了！直接用这个数据同步到本地并更新前端
-            version.update_versions_json(result.to_dict())
+            self.versions_manager.merge_games(result.to_dict())
             return _finish_import_versions()
         
         else:
@@ -113,7 +145,7 @@ class Terminal(Message.Messageable, Dialog.Dialogable):
                 
                 else: # 没有疑问但有无法导入的版本
                     send_failed_games_content()
-                    version.update_versions_json([r.to_dict() for r in result])
+                    self.versions_manager.merge_games([r.to_dict() for r in result])
                     return _finish_import_versions()
             
             else:
@@ -121,7 +153,7 @@ class Terminal(Message.Messageable, Dialog.Dialogable):
                     series = self.get_query_dialog_series(result)
                 else:
                     send_failed_games_content()
-                    version.update_versions_json(result.to_dict())
+                    self.versions_manager.merge_games(result.to_dict())
                     return _finish_import_versions()
 
             # 问答结束后对结果的处理
@@ -129,27 +161,26 @@ class Terminal(Message.Messageable, Dialog.Dialogable):
             def _end_asked(queried_result: list):
                 if isinstance(queried_result[0][0], dict): # 取样，查看是否为单个游戏文件夹
                     result.update_vers(queried_result)
-                    version.update_versions_json(result.to_dict())
+                    self.versions_manager.merge_games(result.to_dict())
 
                 else: # 多个游戏文件夹的情况
 
                     # 应用询问结果
                     for i in query_games:
-                        print(f"queried result {i}: {queried_result[i]}")
+                        logging.debug(f"queried result {i}: {queried_result[i]}")
                         result[i].update_vers(queried_result[i])
 
                     # 先弹出导入成功的数量信息
-                    self.send_message(f'成功导入版本', Dialog.Level.DONE)
+                    self.send_message('成功导入版本', Dialog.Level.DONE)
 
                     if failed_games != []: # 出现无法正常导入的版本，弹窗提示
                         send_failed_games_content()
 
                     # 将解析完成的数据添加进本地的versions.json
-                    version.update_versions_json([r.to_dict() for r in result])
+                    self.versions_manager.merge_games([r.to_dict() for r in result])
                     # 更新versions.json数据
                 
                 # 版本路径解析完毕了，接下来就是加载前端版本列表
-                self.versions_manager.refresh()
                 self.switch_window(Terminal.WindowEnum.MIGRATE)
 
             # 开始问答！
@@ -183,13 +214,10 @@ class Terminal(Message.Messageable, Dialog.Dialogable):
                     else:
                         # 先记录下一个需要询问的版本位置
                         for i in range(i_games+1, len(data)):
-                            print(i)
                             if data[i][1] == []: # 跳过没有问题的游戏目录
-                                print('has')
                                 next_query_game_i = i
                             else: 
                                 break
-                        print(next_query_game_i, len(data))
                         if len(data) <= next_query_game_i+1: # 索引溢出，说明后面没有其他需要询问的版本了
                             next_query_game_i = i_games
                             action = Dialog.DialogSeries.Action('END')
@@ -210,10 +238,8 @@ class Terminal(Message.Messageable, Dialog.Dialogable):
                         )
                 if action.type != 'END':
                     if is_query_vers_finished: # 无剩余版本但后续其他游戏目录还有需要询问的，转到下一个需要询问的游戏目录
-                        print('next game')
                         add_node(next_query_game_i, 0, node.add_new_dialog_node(), None)
                     else: # 还有剩余版本，继续在相同版本询问
-                        print('next ver')
                         add_node(i_games, i_vers+2, node.add_new_dialog_node(), next_query_game_i)
 
             add_node(0, 0, series.create_dialog_tree())
@@ -255,11 +281,11 @@ class Terminal(Message.Messageable, Dialog.Dialogable):
         Returns:
             list[dict]: 刷新后的所有版本信息
         '''
-        games = version.get_versions()
-        changed_vers_count = 0
+        games = self.get_games()
         game_results: list[version.PathParseResult] = []
-        for game in games:
-            game_results.append(version.add_game(Path(game['folder_path'])))
+        with version.manifest_scope(): # 所有游戏文件夹共用同一份版本清单缓存
+            for game in games:
+                game_results.append(version.add_game(Path(game['folder_path'])))
             
         return self.check_and_apply_refresh_result(game_results)
         
@@ -269,24 +295,14 @@ class Terminal(Message.Messageable, Dialog.Dialogable):
         Returns:
             list[dict]|None: 完成写入之后的versions.json中内容。若为None，则说明正在向用户询问版本隔离的信息。
         '''
-        def _finish_refresh_versions() -> list[dict]: # 将结果写入导入
-            try:
-                if versions:= version.get_versions():
-                    self.versions_manager.games_json = versions
-                    return versions
-                raise IOError("version.json内容为空")
-            except (IOError, OSError) as e:
-                self.send_message(f"读取versions.json失败：{e}", Message.Level.ERROR)
-                return None
-            except json.JSONDecodeError:
-                self.send_message("解析versions.json时失败", Message.Level.ERROR)
-                return None
-            except Exception as e:
-                self.send_message(f"发生了意外的错误：{e}", Message.Level.ERROR)
-                return None
+        def _finish_refresh_versions() -> list[dict]: # 结果已经合并进游戏库了，直接返回内存里的内容
+            if versions:= self.get_games():
+                return versions
+            self.send_message("游戏库内容为空", Message.Level.ERROR)
+            return None
 
         if isinstance(result, version.PathParseResult) and result.is_suc: # 只有一个PathParseResult的情况，且全解析成功了！直接用这个数据同步到本地并更新前端
-            version.update_versions_json(result.to_dict())
+            self.versions_manager.merge_games(result.to_dict())
             return _finish_refresh_versions()
         
         else:
@@ -309,12 +325,12 @@ class Terminal(Message.Messageable, Dialog.Dialogable):
                     if result[i].query_ver != []: query_games.append(i)
 
                 if query_games != []: # 出现无法判断版本隔离的情况，让用户判断
-                    print(result)
+                    logging.debug(result)
                     series = self.get_query_dialog_series(result)
                 
                 else: # 没有疑问但有无法导入的版本
                     send_failed_games_content()
-                    version.update_versions_json([r.to_dict() for r in result])
+                    self.versions_manager.merge_games([r.to_dict() for r in result])
                     return _finish_refresh_versions()
             
             else:
@@ -322,7 +338,7 @@ class Terminal(Message.Messageable, Dialog.Dialogable):
                     series = self.get_query_dialog_series(result)
                 else:
                     send_failed_games_content()
-                    version.update_versions_json(result.to_dict())
+                    self.versions_manager.merge_games(result.to_dict())
                     return _finish_refresh_versions()
 
             # 问答结束后对结果的处理
@@ -330,27 +346,26 @@ class Terminal(Message.Messageable, Dialog.Dialogable):
             def _end_asked(queried_result: list):
                 if isinstance(queried_result[0][0], dict): # 取样，查看是否为单个游戏文件夹
                     result.update_vers(queried_result)
-                    version.update_versions_json(result.to_dict())
+                    self.versions_manager.merge_games(result.to_dict())
 
                 else: # 多个游戏文件夹的情况
 
                     # 应用询问结果
                     for i in query_games:
-                        print(f"queried result {i}: {queried_result[i]}")
+                        logging.debug(f"queried result {i}: {queried_result[i]}")
                         result[i].update_vers(queried_result[i])
 
                     # 先弹出导入成功的数量信息
-                    self.send_message(f'已刷新所有游戏目录', Dialog.Level.DONE)
+                    self.send_message('已刷新所有游戏目录', Dialog.Level.DONE)
 
                     if failed_games != []: # 出现无法正常导入的版本，弹窗提示
                         send_failed_games_content()
 
                     # 将解析完成的数据添加进本地的versions.json
-                    version.update_versions_json([r.to_dict() for r in result])
+                    self.versions_manager.merge_games([r.to_dict() for r in result])
                     # 更新versions.json数据
                 
                 # 版本路径解析完毕了，接下来就是加载前端版本列表
-                self.versions_manager.refresh()
                 self.switch_window(Terminal.WindowEnum.MIGRATE)
 
             # 开始问答！
@@ -365,8 +380,17 @@ class Terminal(Message.Messageable, Dialog.Dialogable):
         \n但因为qt本身会立马删除没有使用或是show()的窗口，所以很大情况不能通过直接传入widget来实现窗口切换
         \n因此只能根据传入的自己搓的窗口枚举类WindowEnum及其对应的形参来现场生成一个窗口并setCentralWidget()
         \n为什么要用枚举类？防止其他窗口调用该方法时产生循环导入（circular import）
+        \n可缓存的窗口（WindowEnum.cacheable）只在第一次生成，之后切换回来时调用它的activate(*params)同步离开期间的变化，不再重新生成
         '''
-        self.main_window.setCentralWidget(window_enum.clazz(self, *params))
+        if window_enum is Terminal.WindowEnum.WELCOME: # 回到欢迎界面说明游戏库已经清空，缓存的界面也没用了
+            for enum in Terminal.WindowEnum:
+                self.main_window.drop_cached_page(enum.name)
+        window = self.main_window.cached_page(window_enum.name) if window_enum.cacheable else None
+        if window is None:
+            window = window_enum.clazz(self, *params)
+        elif hasattr(window, 'activate'):
+            window.activate(*params)
+        self.main_window.setCentralWidget(window, cache_key=window_enum.name if window_enum.cacheable else None)
     
     def switch_window_with_msg(self, window_enum: 'WindowEnum', msg_bar: tuple[str, Message.Level], *params):
         # 切换窗口界面
@@ -384,40 +408,29 @@ class Terminal(Message.Messageable, Dialog.Dialogable):
         if dialog and hasattr(self.main_window.centralWidget(), 'dialog'):
             self.send_message(*dialog)
 
-    def migrate(self, source_json: dict, target_json: dict):
-        if self.thread_migrate.isRunning(): return
-        source_dir = Path(source_json['game_path'])
-        target_dir = Path(target_json['game_path'])
+    def migrate(self, source_json: dict, target_json: dict | list[dict], priority: int = 0) -> jobqueue.MigrateJob:
+        '''
+        把迁移任务加入队列，有空位时立即开始
+        Args:
+            target_json(dict | list[dict]): 目标版本，传入多个时源文件只读取一次，同时迁移到所有目标
+            priority(int): 优先级，越大越先运行
+        Returns:
+            jobqueue.MigrateJob: 加入队列的任务
+        '''
+        target_jsons = [target_json] if isinstance(target_json, dict) else list(target_json)
         # 路径检查
-        if source_dir == None or target_dir == None:
+        if source_json is None or not target_jsons or None in target_jsons:
             logging.info("请先选择迁移版本和目标版本")
             raise MCException.VersionVerifyFailed("请先选择迁移版本和目标版本", Message.Level.INFO)
-             
-        elif source_dir == target_dir:
+        source_dir = Path(source_json['game_path'])
+        target_dirs = [Path(target['game_path']) for target in target_jsons]
+        if source_dir in target_dirs:
             raise MCException.VersionVerifyFailed('不能迁移自己口牙>_<', Message.Level.WARNING)
+        if len(set(target_dirs)) != len(target_dirs):
+            raise MCException.VersionVerifyFailed('目标版本重复了', Message.Level.WARNING)
 
-        # 条件符合，开始迁移！
-        # 创建新线程
-        def finish():
-            self.thread_migrate.quit()
-            self.task_migrate.deleteLater()
-            self.task_migrate = None
-            self.message_requested.emit(f"{source_json.get('name')}已迁移至{target_json.get('name')}！", Message.Level.DONE)
-        self.task_migrate = TaskMigrateAbortable(self, source_dir, target_dir, source_json, target_json)
-        self.task_migrate.finished.connect(finish)
-        self.task_migrate.moveToThread(self.thread_migrate)
-        self.thread_migrate.started.connect(self.task_migrate.do_work)
-        self.thread_migrate.start()
-    
-    def terminate_migrate_task(self):
-        if self.task_migrate:
-            self.task_migrate.abort()
-        def cleanup():
-            logging.info('已终止迁移任务')
-            self.thread_migrate.quit()
-            self.task_migrate.deleteLater()
-            self.task_migrate = None
-        self.task_migrate.terminated.connect(cleanup)
+        # 条件符合，加入队列！
+        return self.scheduler.submit(source_json, target_jsons, priority)
 
     # == versions.json操作代理方法 ==
 
@@ -471,6 +484,11 @@ class Terminal(Message.Messageable, Dialog.Dialogable):
         MIGRATE = "windows.Migrate.Migrate"
         MIGRATE_DETAIL = "windows.MigrateDetail.MigrateDetail"
 
+        @property
+        def cacheable(self) -> bool:
+            '''切走之后是否保留该窗口；迁移界面生成的开销和游戏库的大小有关，而且会自己跟随游戏库更新'''
+            return self is Terminal.WindowEnum.MIGRATE
+
         @property
         def clazz(self):
             # 延迟导入：只有访问 .clazz 时才导入
@@ -479,248 +497,277 @@ class Terminal(Message.Messageable, Dialog.Dialogable):
             module = importlib.import_module(module_path)
             return getattr(module, class_name)
         
+class MigrateScheduler(QtCore.QObject):
+    '''
+    迁移任务的调度器，每个运行中的任务都有自己的QThread
+    \n按优先级从队列中取出任务运行，最多同时运行migrate.jobs.max_running个，其中最多max_disk个任务在复制文件（其他任务可以先下载模组）
+    \n会写入同一个文件夹（或是一个任务的目标是另一个任务的源）的任务不会同时运行
+    '''
+    jobs_changed = QtCore.Signal(str) # 任务列表或某个任务的状态改变，参数为任务id（清除已结束的任务时为空字符串）
+    progress_updated = QtCore.Signal(str, object) # 参数为(任务id, progress.MigrateProgress)
+    job_ended = QtCore.Signal(str) # 任务运行结束（完成、失败、暂停或取消）
+    all_finished = QtCore.Signal() # 队列里已经没有未完成的任务
+    WAIT_ON_CLOSE = 3000 # 退出程序时等待任务停下的最长时间（毫秒）
+
+    def __init__(self, terminal: 'Terminal'):
+        super().__init__()
+        self.terminal = terminal
+        self.queue = jobqueue.JobQueue()
+        self.queue.load()
+        self.queue.add_listener(lambda job: self.jobs_changed.emit(job.id if job else ''))
+        # 和max_running一样，修改config.yml中的max_disk后立即生效
+        self.disk_slots = jobqueue.DiskSlots(lambda: config.get_settings().migrate.jobs.max_disk)
+        config.add_listener(lambda settings: self.disk_slots.wake())
+        self._running: dict[str, tuple[QtCore.QThread, 'TaskMigrateAbortable']] = {}
+
+    def submit(self, source_json: dict, target_jsons: list[dict], priority: int = 0) -> jobqueue.MigrateJob:
+        job = self.queue.add(source_json, target_jsons, priority)
+        logging.info(f"已加入迁移队列: {job.title}")
+        self.schedule()
+        return job
+
+    def task_of(self, job_id: str) -> 'TaskMigrateAbortable | None':
+        running = self._running.get(job_id)
+        return running[1] if running else None
+
+    def current_task(self) -> 'TaskMigrateAbortable | None':
+        for job in self.queue.by_state(jobqueue.JobState.RUNNING):
+            if task := self.task_of(job.id):
+                return task
+        return None
+
+    def overall_percent(self) -> float:
+        '''所有运行中任务的平均进度'''
+        tasks = [task for _, task in self._running.values()]
+        if not tasks:
+            return 0.0
+        return sum(task.progress.snapshot().overall for task in tasks) / len(tasks)
+
+    def pause(self, job_id: str):
+        '''暂停任务，已经复制完的文件记录在迁移日志中，继续时会跳过'''
+        job = self.queue.get(job_id)
+        if job is None or job.finished:
+            return
+        self.queue.set_state(job, jobqueue.JobState.PAUSED)
+        if task := self.task_of(job_id):
+            task.abort()
+
+    def resume(self, job_id: str):
+        job = self.queue.get(job_id)
+        if job is None or job.state not in (jobqueue.JobState.PAUSED, jobqueue.JobState.FAILED):
+            return
+        self.queue.set_state(job, jobqueue.JobState.QUEUED)
+        self.schedule()
+
+    def cancel(self, job_id: str):
+        job = self.queue.get(job_id)
+        if job is None or job.finished:
+            return
+        self.queue.set_state(job, jobqueue.JobState.CANCELLED)
+        if task := self.task_of(job_id):
+            task.abort()
+        elif not self.queue.has_unfinished():
+            self.all_finished.emit()
+
+    def set_priority(self, job_id: str, priority: int):
+        if job := self.queue.get(job_id):
+            self.queue.set_priority(job, priority)
+            self.schedule()
+
+    def schedule(self):
+        '''有空位时按优先级启动等待中的任务'''
+        max_running = config.get_settings().migrate.jobs.max_running # 修改config.yml后立即生效
+        for job in self.queue.by_state(jobqueue.JobState.QUEUED):
+            if len(self._running) >= max_running:
+                break
+            if any(job.conflicts_with(self.queue.get(running_id)) for running_id in self._running):
+                continue
+            self._start(job)
+
+    def _start(self, job: jobqueue.MigrateJob):
+        thread = QtCore.QThread()
+        task = TaskMigrateAbortable(self.terminal, job.source_dir, job.target_dirs, job.source_json, job.target_jsons, disk_slots=self.disk_slots)
+        task.job_id = job.id
+        task.moveToThread(thread)
+        thread.started.connect(task.do_work)
+        # 任务在子线程中发出信号，连接到调度器的槽函数，回到主线程处理
+        task.finished.connect(self._on_task_finished)
+        task.terminated.connect(self._on_task_terminated)
+        task.failed.connect(self._on_task_failed)
+        task.progress_updated.connect(self._on_task_progress)
+        self._running[job.id] = (thread, task)
+        self.queue.set_state(job, jobqueue.JobState.RUNNING)
+        logging.info(f"开始迁移任务: {job.title}")
+        thread.start()
+
+    @QtCore.Slot()
+    def _on_task_finished(self):
+        job = self._end(self.sender())
+        if job is None: return
+        self.queue.set_state(job, jobqueue.JobState.DONE)
+        self.terminal.message_requested.emit(f"{job.source_json.get('name')}已迁移至{job.target_names}！", Message.Level.DONE)
+        self._after_end(job)
+
+    @QtCore.Slot()
+    def _on_task_terminated(self):
+        job = self._end(self.sender())
+        if job is None: return
+        if job.state == jobqueue.JobState.RUNNING: # 不是通过pause()/cancel()停下的
+            self.queue.set_state(job, jobqueue.JobState.PAUSED)
+        logging.info(f"迁移任务已{'取消' if job.state == jobqueue.JobState.CANCELLED else '暂停'}: {job.title}")
+        self._after_end(job)
+
+    @QtCore.Slot(str)
+    def _on_task_failed(self, error: str):
+        job = self._end(self.sender())
+        if job is None: return
+        self.queue.set_state(job, jobqueue.JobState.FAILED, error)
+        self.terminal.message_requested.emit(f"迁移任务出错：{error}", Message.Level.ERROR)
+        self._after_end(job)
+
+    @QtCore.Slot(object)
+    def _on_task_progress(self, p: progress.MigrateProgress):
+        task = self.sender()
+        if task is not None and task.job_id:
+            self.progress_updated.emit(task.job_id, p)
+
+    def _end(self, task: 'TaskMigrateAbortable') -> jobqueue.MigrateJob | None:
+        '''回收任务的线程'''
+        if task is None or task.job_id not in self._running:
+            return None
+        thread, _ = self._running.pop(task.job_id)
+        thread.quit()
+        thread.wait()
+        task.deleteLater()
+        thread.deleteLater()
+        return self.queue.get(task.job_id)
+
+    def _after_end(self, job: jobqueue.MigrateJob):
+        self.job_ended.emit(job.id)
+        self.schedule()
+        if not self.queue.has_unfinished():
+            self.all_finished.emit()
+
+    def close(self):
+        '''退出程序前调用，正在运行的任务会被暂停并保存在队列中'''
+        for job_id, (thread, task) in list(self._running.items()):
+            self.queue.set_state(self.queue.get(job_id), jobqueue.JobState.PAUSED)
+            task.abort()
+        for thread, _ in self._running.values():
+            thread.quit()
+            thread.wait(self.WAIT_ON_CLOSE)
+        self.queue.save()
+
 class TaskMigrateAbortable(QtCore.QObject):
+    '''
+    在QThread中运行的迁移任务，迁移流程都在migrate.Migration中（命令行也用它），这里只负责把结果转成信号和弹窗
+    '''
     finished = QtCore.Signal()
     terminated = QtCore.Signal()
-    update_migrate_general = QtCore.Signal(int)
-    update_migrate_detail = QtCore.Signal(int, int)
-    def __init__(self, terminal: 'Terminal', source_dir: Path, target_dir: Path, source_json: dict, target_json: dict):
+    failed = QtCore.Signal(str) # 任务因为异常中止，参数为错误信息
+    progress_updated = QtCore.Signal(object) # 参数为progress.MigrateProgress
+    def __init__(self, terminal: 'Terminal', source_dir: Path, target_dir: Path | list[Path], source_json: dict, target_json: dict | list[dict], disk_slots: jobqueue.DiskSlots = None):
         '''
         Args:
         source_json(dict): 原版本在versions.json里的dict表现
-        target_json(dict): 目标版本在versions.json里的dict表现
+        target_json(dict | list[dict]): 目标版本在versions.json里的dict表现，可以是多个（与target_dir一一对应），源文件只读取一次，同时写入所有目标
+        disk_slots(jobqueue.DiskSlots): 多个任务共用，限制同时复制文件的任务数
         '''
         super().__init__()
         self.terminal = terminal
+        self.job_id: str = None # 所属的队列任务
         self.source_dir = source_dir
-        self.target_dir = target_dir
         self.source_json = source_json
-        self.target_json = target_json
-
-        # 状态
-        self.is_calculating = True
-        self._abort = False
-
-        # 任务总数
-        self.pending_num = 0
-        self.pending_num_total = 0
-
-        self.pending_num_mod = -1
-        self.pending_num_mod_total = -1
-        
-        self.pending_num_file = -1
-        self.pending_num_file_total = -1
-
-        # 错误实例
-        self.failed_files_copy = []
-        self.failed_mods_dl = []
-        self.failed_mods_not_adapt = []
-
-        # 迁移时会跳过的文件
-        self.exclude_files = [
-            source_json['name']+".json",
-            source_json['name']+".jar",
-            "launcher_profiles.json",
-            "PCL.ini",
-            "mods"
-        ]
-        if config.get_config_value('migrate', 'filter_rule') == 'excludes':
-            self.exclude_files.extend(config.get_config_value('migrate', 'excludes'))
+        self.target_dirs: list[Path] = [target_dir] if isinstance(target_dir, Path) else list(target_dir)
+        self.target_jsons: list[dict] = [target_json] if isinstance(target_json, dict) else list(target_json)
+        self.target_dir = self.target_dirs[0]
+        self.target_json = self.target_jsons[0]
+        self.migration = migrate.Migration(
+            source_dir, self.target_dirs, source_json, self.target_jsons,
+            on_progress=self.progress_updated.emit,
+            on_notice=lambda text: self.terminal.send_message(text, Message.Level.INFO),
+            disk_slots=disk_slots
+        )
+
+    @property
+    def is_calculating(self) -> bool:
+        return self.migration.is_calculating
+
+    @property
+    def progress(self) -> progress.ProgressMeter:
+        return self.migration.progress
+
+    @property
+    def abort_event(self) -> threading.Event:
+        return self.migration.abort_event
 
     def abort(self):
         '''终止任务'''
-        self._abort = True
+        self.migration.abort()
         
     @QtCore.Slot()
     def do_work(self):
-        # 计算待处理任务数量（复制文件）
-        if self._abort:
-            logging.info('任务被终止（计算任务数阶段）')
-            self.terminated.emit()
-            return
-        self.pending_num_file = len([dir for dir in os.listdir(self.source_dir) if dir not in self.exclude_files])
-        self.pending_num += self.pending_num_file
-        self.pending_num_total = self.pending_num
-        self.pending_num_file_total = self.pending_num_file
-
-        # 计算待处理任务数量（mod下载）
-        not_mod_loader = ['optifine', 'release', 'snapshot', 'unknown']
-        mod_list: list[str] = None
-        if (self.source_json['mod_loader'] not in not_mod_loader) and (self.target_json['mod_loader'] not in not_mod_loader):
-            mod_list = os.listdir(self.source_dir / "mods")
-            self.pending_num_mod = len(mod_list)
-            self.pending_num += self.pending_num_mod
-            self.pending_num_total = self.pending_num
-            self.pending_num_mod_total = self.pending_num_mod
-        if self._abort:
-            logging.info('任务被终止（计算任务数阶段）')
-            self.terminated.emit()
+        try:
+            completed = self.migration.run()
+        except Exception as e:
+            logging.exception(f"迁移任务出错: {e}")
+            self.migration.abort()
+            self.failed.emit(str(e))
             return
-        # 算完任务数量了，接下来就来干正事吧（
-        self.is_calculating = False
-        
-        # 开始下载mod
-        if mod_list:
-            logging.info("下载mod中")
-            if not config.get_config_value('migrate', 'keep-original-mods'):
-                func.clear_folder(self.target_dir / 'mods')
-            self.download_mods(self.source_dir / "mods", self.target_dir / "mods", self.target_json["version"], self.target_json["mod_loader"], mod_list)
-            if self._abort:
-                logging.info('任务被终止（模组下载阶段）')
-                self.terminated.emit()
-                return
-            logging.info("mod下载完成") 
-            
-        # 开始迁移文件
-        logging.info("迁移游戏文件")
-        self.migrate_file(self.source_dir, self.target_dir)
-        if self._abort:
-            logging.info('任务被终止（文件迁移阶段）')
+        if not completed:
             self.terminated.emit()
             return
-        logging.info("游戏文件迁移完成")
         self.report_exception()
         self.finished.emit()
 
-    def migrate_file(self, source_dir: Path, target_dir: Path):
-        for item in Path(source_dir).iterdir():
-            if self._abort:
-                return
-            if item.name.startswith('.') or item.name.startswith('$'): continue # 跳过隐藏文件
-            if item.name not in self.exclude_files: # 根据config.yml中的过滤规则来筛去文件
-                logging.info(f"复制{item}至{target_dir / item.name}")
-                try:
-                    if item.is_dir(): # 文件夹（覆盖）
-                        self.copy_tree_with_abort(item, target_dir / item.name, exist_ok=True)
-                    else: # 文件
-                        shutil.copy(item, target_dir / item.name)
-                except PermissionError as e:
-                    logging.warning("权限不足")
-                    self.failed_files_copy.append([item.name, "权限不足"])
-                except Exception as e:
-                    logging.error("未知错误：" + str(e))
-                    self.failed_files_copy.append([item.name, e])
-            self.reduce_pending_num_file()
-            
-    def download_mods(self, source_dir: str, target_dir: str, target_ver: str, mod_loader: str, file_name_list: list[str]):
-        # 缓存，记录没有下载完成的mod
-        if not os.path.exists(f"{target_dir}dl.txt"):
-            with open(f"{target_dir}dl.txt", 'w') as f:
-                logging.info("已创建缓存文件dl.txt")
-        with open(f"{target_dir}dl.txt", 'r') as f:
-            logging.info("读取缓存文件dl.txt")
-            file_name_list_done: list[str] = [line.strip() for line in f.readlines()]
-        self.failed_mods_not_adapt: list[str] = []
-
-        for old_file_name in file_name_list:
-            if self._abort:
-                return
-            logging.info(f"\n{old_file_name}")
-            
-            # 检测是否已下载，有则跳过
-            if old_file_name in file_name_list_done:
-                logging.info(f"{old_file_name} 已下载")
-                self.reduce_pending_num_mod()
-                continue
-            
-            modrinth_result = mod.modrinth(target_ver, mod_loader, source_dir, old_file_name, target_dir)
-            # 尝试查找并下载
-            if not modrinth_result == mod.Result.SUCCESS: # 有下载失败的，具体分析
-                if isinstance(modrinth_result, list): # 依赖下载失败的
-                    self.failed_mods_dl.append(f"{old_file_name}的依赖：\n{"\n".join(modrinth_result)}")
-
-                elif modrinth_result == mod.Result.NOT_ADAPTED: self.failed_mods_not_adapt.append(old_file_name) # 模组本体未适配版本的
-                else: self.failed_mods_dl.append(old_file_name)
-            
-            self.reduce_pending_num_mod()
-
-        # 结果统计
-        if len(self.failed_mods_not_adapt) != 0:
-            logging.info("\n以下模组暂未找到适配：")
-            for not_adapt_mod in self.failed_mods_not_adapt: logging.info(not_adapt_mod)
-        else: 
-            logging.info("\n无不适配情况，全部模组已完成版本迁移！")
-            os.remove(f"{target_dir}dl.txt")
-    
     def report_exception(self):
-        if self.failed_files_copy != [] or self.failed_mods_dl != [] or self.failed_mods_not_adapt != []:
-            report_content = ""
-            level = Dialog.Level.WARNING
-            title = "还有些需要留意..."
-
-            # 模组未适配
-            if self.failed_mods_not_adapt != []:
-                report_content += f"以下模组在 {self.target_json.get('mod_loader')}-{self.target_json.get('version')} 版本中没有适配：\n"
-                for file in self.failed_mods_not_adapt:
-                    report_content += file + '\n'
-                report_content += '\n'
-
-            # 模组下载失败
-            if self.failed_mods_dl != []:
-                report_content += f"以下模组下载失败：\n"
-                for file in self.failed_mods_dl:
-                    report_content += file + '\n'
-                report_content += '\n'
-
-            # 文件迁移失败（这个部分问题就比较多了，就由说明具体错误
-            if self.failed_files_copy != []:
-                title = "遇到问题了..."
-                level = Dialog.Level.ERROR
-                report_content += f"以下文件在迁移时出错：\n"
-                for file in self.failed_files_copy:
-                    report_content += f"{file[0]}：{file[1]}\n"
-                report_content += '\n'
-            self.terminal.send_dialog(
-                title,
-                level,
-                report_content,
-                None,
-                change_cancel_btn_text='好的'
-            )
-
-    def reduce_pending_num(self):
-        self.pending_num -= 1
-        self.update_migrate_general.emit(self.pending_num)
-        self.update_migrate_detail.emit(self.pending_num_mod, self.pending_num_file)
-
-    def reduce_pending_num_mod(self):
-        self.pending_num_mod -= 1
-        self.reduce_pending_num()
-
-    def reduce_pending_num_file(self):
-        self.pending_num_file -= 1
-        self.reduce_pending_num()
-
-    def copy_tree_with_abort(self, src: Path, dst: Path, exist_ok=True):
-        """递归复制目录，支持中途终止"""
-        if self._abort:
+        report = self.migration.report()
+        if report is None:
             return
-
-        dst.mkdir(parents=True, exist_ok=exist_ok)
-        
-        for item in src.iterdir():
-            if self._abort:
-                return
-            if item.is_dir():
-                self.copy_tree_with_abort(item, dst / item.name)
-            else:
-                try:
-                    shutil.copy2(item, dst / item.name)
-                except Exception as e:
-                    self.failed_files_copy.append([str(item), str(e)])
+        self.terminal.send_dialog(
+            report.title,
+            Dialog.Level.ERROR if report.level == 'error' else Dialog.Level.WARNING,
+            report.content,
+            None,
+            change_cancel_btn_text='好的'
+        )
 
 class VersionsJsonManager:
-    def __init__(self, terminal: 'Terminal'):
+    '''
+    versions.json的管理类
+    \n内容以library.GameLibrary索引在内存中，所有查询与修改都通过folder_path/game_jar的字典索引完成
+    \n修改之后只把改动的部分交给持久化后端（config.yml中的library.backend: json | sqlite）
+    '''
+    def __init__(self, terminal: 'Terminal', backend: str = None):
+        '''
+        Args:
+            backend(str): 持久化后端，None时使用config.yml中的library.backend
+        '''
         self.terminal = terminal
+        self.library = library.GameLibrary()
+        self.store = library_store.open_store(self.library, backend or config.get_settings().library.backend)
+        self.store.on_error = lambda e: self.terminal.library_save_failed.emit(str(e)) # 在计时器线程里调用，不能直接碰界面
         try:
-            self.games_json = version.get_versions()
-            self.game_folder_paths = [g['folder_path'] for g in self.games_json] # 用于通过folder_path快速索引游戏文件夹
-        except (TypeError, json.JSONDecodeError) as e:
+            self.store.load()
+        except (TypeError, KeyError, json.JSONDecodeError, sqlite3.DatabaseError, OSError) as e:
             logging.error("解析 versions.json 文件错误")
+            self.store.close() # 上层会换一个后端或者重新加载, 先释放数据库连接
             raise e
 
     def get_games(self) -> list[dict]:
-        return self.games_json
+        return self.library.games()
+
+    def merge_games(self, games: dict | list[dict]):
+        '''
+        将解析结果合并进游戏库（已有的游戏文件夹替换版本列表，新的游戏文件夹添加到最前面）
+        Args:
+            games(dict | list[dict]): 单个游戏文件夹的json或是多个游戏文件夹的json列表
+        '''
+        if not games: # 过滤None
+            return
+        touched, new_count = self.library.merge_games(games)
+        if self._persist(self.store.games_changed, touched):
+            logging.info(f"已更新游戏库，新增 {new_count} 个游戏文件夹")
 
     # ========== 版本管理 ==========
 
@@ -731,27 +778,19 @@ class VersionsJsonManager:
             game: 游戏条目 dict 或 folder_path 字符串
             new_version: 完整的版本 dict（需包含 game_jar 等字段）
         """
-        if isinstance(game, str):
-            game = self.get_game_by_path(game)
-            if game is None:
-                self.terminal.send_message('未找到对应游戏文件夹，无法添加版本', Message.Level.ERROR)
-                return
-
-        try:
-            idx = self.games_json.index(game)
-        except ValueError:
-            self.terminal.send_message('游戏文件夹不在当前管理列表中', Message.Level.ERROR)
+        folder_path = self._folder_path_of(game)
+        if folder_path not in self.library:
+            self.terminal.send_message('未找到对应游戏文件夹，无法添加版本', Message.Level.ERROR)
             return
 
-        # 避免重复添加（按 game_jar 判断）
-        for v in self.games_json[idx]['versions']:
-            if v.get('game_jar') == new_version.get('game_jar'):
-                self.terminal.send_message('该版本已存在，跳过添加', Message.Level.INFO)
-                return
+        # 避免重复添加（按 game_jar 和 game_path 判断）
+        record = self.library.add_version(folder_path, new_version)
+        if record is None:
+            self.terminal.send_message('该版本已存在，跳过添加', Message.Level.INFO)
+            return
 
-        self.games_json[idx]['versions'].append(new_version)
         self.terminal.send_message(f'已添加版本: {new_version.get("name", "unnamed")}', Message.Level.DONE)
-        self._save()
+        self._persist(self.store.version_added, self.library.get_game(folder_path), record)
 
     def remove_version(self, game: dict | str, version: dict | str):
         """
@@ -764,40 +803,30 @@ class VersionsJsonManager:
             MCException.NoSuchVersion: 若指定的版本不在对应游戏文件夹中
         """
         # 验证game
-        if isinstance(game, str):
-            game = self.get_game_by_path(game)
-            if game is None:
-                logging.info('未找到对应游戏文件夹')
-                raise MCException.NoSuchGameFolder('未找到对应游戏文件夹')
-        # 验证该game是否存在该versions.json中
-        try:
-            game_i = self.games_json.index(game)
-
-        except ValueError:
-            logging.info('游戏文件夹不在列表中或已被改变')
-            raise MCException.NoSuchGameFolder('游戏文件夹不在列表中或已被改变')
+        folder_path = self._folder_path_of(game)
+        if folder_path not in self.library:
+            logging.info('未找到对应游戏文件夹')
+            raise MCException.NoSuchGameFolder('未找到对应游戏文件夹')
 
         # 获取version
         if isinstance(version, str):
-            version = self.get_ver_by_game_jar(game, version)
-            if version is None:
+            record = self.library.get_version(folder_path, version)
+            if record is None:
                 logging.info('未找到对应版本')
                 raise MCException.NoSuchVersion('未找到对应版本')
-        
+            key = record.key
+        else:
+            key = library.VersionRecord.key_of(version)
+
         # 移除version
         try:
-            game_versions: list[dict] = game['versions']
-            game_versions.remove(version)
-            game['versions'] = game_versions
-        except ValueError:
+            removed = self.library.remove_version(folder_path, key)
+        except KeyError:
             logging.info('版本不在该游戏文件夹中或已被改变')
-            raise MCException.NoSuchGameFolder('版本不在该游戏文件夹中或已被改变')
-
-        # 应用该game的更改
-        self.games_json[game_i] = game
-        self._save()
+            raise MCException.NoSuchVersion('版本不在该游戏文件夹中或已被改变')
+        self._persist(self.store.version_removed, self.library.get_game(folder_path), removed)
 
-        self.terminal.send_message(f'已成功移除版本: {version}', Message.Level.DONE)
+        self.terminal.send_message(f'已成功移除版本: {removed.name}', Message.Level.DONE)
 
     # ========== 游戏文件夹管理 ==========
 
@@ -812,14 +841,13 @@ class VersionsJsonManager:
             return
 
         # 检查是否已存在
-        for g in self.games_json:
-            if g['folder_path'] == new_game['folder_path']:
-                self.terminal.send_message('该游戏文件夹已存在，跳过添加', Message.Level.INFO)
-                return
+        record = self.library.add_game(new_game)
+        if record is None:
+            self.terminal.send_message('该游戏文件夹已存在，跳过添加', Message.Level.INFO)
+            return
 
-        self.games_json.append(new_game)
         self.terminal.send_message(f'已添加游戏: {new_game.get("folder_name", "unnamed")}', Message.Level.DONE)
-        self._save()
+        self._persist(self.store.games_changed, [record])
     
     def refresh_game(self, game: dict | str) -> list[dict] | None:
         '''
@@ -827,22 +855,17 @@ class VersionsJsonManager:
         Args:
             game: 完整的游戏条目 dict 或是 folder_path
         '''
-        self.refresh()
-        if isinstance(game, dict): # 由game获取folder_path
-            folder_path = game['folder_path']
+        folder_path = self._folder_path_of(game)
 
         # 检验该folder_path是否存在
-        try:
-            self.game_folder_paths.index(folder_path)
-        except ValueError:
+        if folder_path not in self.library:
             logging.warning('该游戏目录不存在')
             raise MCException.NoSuchGameFolder()
         
         # 获取最新该游戏文件夹的信息
         result = version.add_game(Path(folder_path))
         if new_games_json:= self.terminal.check_and_apply_import_result(result):
-            self.games_json = new_games_json
-            return self.games_json
+            return new_games_json
 
     def remove_game(self, game: dict | str):
         """
@@ -853,62 +876,53 @@ class VersionsJsonManager:
         Raises:
             MCException.NoSuchGame: 若指定的游戏文件夹不在当前索引中
         """
-        # 通过folder_path定位game
+        # 通过folder_path定位并移除game
         try:
-            if isinstance(game, str):
-                i = self.game_folder_paths.index(game) # 验证是否存在该folder_path
-            else:
-                i = self.games_json.index(game)
-        except ValueError:
-            logging.info('游戏文件夹不在当前索引中，已忽略操作')
-            raise MCException.NoSuchGameFolder()
-
-        # 移除game
-        try:
-            game_name = self.games_json.pop(i)['folder_name']
-            self.game_folder_paths.pop(i)
-            self._save()
-            self.terminal.send_message(f'已移除游戏: {game_name}', Message.Level.DONE)
-        except ValueError:
+            record = self.library.remove_game(self._folder_path_of(game))
+        except KeyError:
             logging.info('游戏文件夹不在当前索引中，已忽略操作')
             raise MCException.NoSuchGameFolder()
+        self._persist(self.store.game_removed, record)
+        self.terminal.send_message(f'已移除游戏: {record.folder_name}', Message.Level.DONE)
 
     def clear_all_games(self):
-        version.clear_all_vers()
-        self.games_json = []
+        self.library.clear()
+        self._persist(self.store.cleared)
         logging.info("已清除所有游戏版本")
 
     # ========== 辅助方法 ==========
 
     def get_game_by_path(self, folder_path: str) -> dict | None:
         """根据 folder_path 查找游戏条目"""
-        for g in self.games_json:
-            if g.get('folder_path') == folder_path:
-                return g
-        return None
+        record = self.library.get_game(folder_path)
+        return record.to_dict() if record else None
 
-    def get_ver_by_game_jar(self, game: dict, game_jar: str) -> dict | None:
+    def get_ver_by_game_jar(self, game: dict | str, game_jar: str) -> dict | None:
         """根据 game_jar 查找版本条目"""
-        for v in game.get('versions', []):
-            if v.get('game_jar') == game_jar:
-                return v
-        return None
+        record = self.library.get_version(self._folder_path_of(game), game_jar)
+        return record.to_dict() if record else None
 
     def refresh(self):
-        """重新从文件加载（用于外部修改后同步）"""
+        """重新从持久化后端加载（用于外部修改后同步）"""
         try:
-            self.games_json = version.get_versions()
-            self.game_folder_paths = [g['folder_path'] for g in self.games_json]
-            logging.info('已重新加载 versions.json')
+            self.store.load()
+            logging.info('已重新加载游戏库')
         except Exception as e:
             self.terminal.send_message(f'重新加载失败: {e}', Message.Level.ERROR)
 
-    def _save(self):
-        """统一保存入口，调用外部 update_versions_json"""
+    def close(self):
+        """写入还没保存的改动并关闭持久化后端"""
+        self._persist(self.store.close)
+
+    @staticmethod
+    def _folder_path_of(game: dict | str) -> str:
+        return game if isinstance(game, str) else game.get('folder_path')
+
+    def _persist(self, func: Callable, *args) -> bool:
+        """统一保存入口，将改动交给持久化后端写入"""
         try:
-            with open('versions.json', 'w', encoding='utf-8') as f:
-                json.dump(self.games_json, f, ensure_ascii=False, indent=2)
+            func(*args)
         except Exception as e:
-            self.terminal.send_message(f'保存 versions.json 失败: {e}', Message.Level.ERROR)
-            return
-        logging.info("保存 versions.json 文件")
\ No newline at end of file
+            self.terminal.send_message(f'保存游戏库失败: {e}', Message.Level.ERROR)
+            return False
+        return True
@@ -1,8 +1,7 @@
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Any
-import yaml, os, logging
-from message import Message
-from core.func import resource_path
+from typing import Any, Callable
+import yaml, os, copy, time, threading, logging
 
 # 设置日志
 logger = logging.getLogger(__name__)
@@ -13,16 +12,32 @@ if not logger.hasHandlers():
     handler.setFormatter(formatter)
     logger.addHandler(handler)
 
-message = Message.Messageable(logger)
-
 CONFIG_PATH = Path('config.yml')
 
+try:
+    _Loader = yaml.CSafeLoader # libyaml的C实现，比纯Python的SafeLoader快很多
+except AttributeError:
+    _Loader = yaml.SafeLoader
+
+# 配置文件的格式版本，旧版本的配置在读取时由_upgrade()升级
+CONFIG_VERSION = 2
+
 default_config = {
+        'config_version': CONFIG_VERSION,
         'migrate':{
             'file': {
-                'copy_option': 'keep'
+                'copy_option': 'overwrite', # overwrite | keep | sync
+                'compare_hash': False, # sync模式下是否比较文件内容，而不只是大小和修改时间
+                'method': 'copy', # copy | reflink（写时复制，不支持的文件系统会自动退回普通复制）
+                'hardlink': [] # 以硬链接迁移的文件夹（如resourcepacks），源和目标会共用同一份文件，只适合不会修改的资源
+            },
+            'filter_rule': 'excludes', # excludes | includes
+            'includes': [], # filter_rule为includes时，只迁移这些项
+            'rules': [], # 额外的.gitignore风格规则（如 config/xaero/cache/ 或 !saves/**/*.dat 或 logs/*.gz age>7d），写法见pathfilter.py
+            'jobs': {
+                'max_running': 2, # 最多同时运行的迁移任务数
+                'max_disk': 1 # 其中最多同时复制文件的任务数，其他任务可以先下载模组
             },
-            'filter_rule': 'excludes',
             'excludes': [
                 'assets',
                 'data',
@@ -33,76 +48,248 @@ default_config = {
                 'PCL',
                 'versions'
             ]
+        },
+        'library': {
+            'backend': 'json', # json | sqlite
+            'manifest_cache': False # 是否把jar包内的版本信息缓存到manifest_cache.json
         }
     }
-def config_exist() -> bool:
-    return CONFIG_PATH.exists() and CONFIG_PATH.stat().st_size > 0
+# 配置项中只能取这些值的，不在其中时按默认值处理
+CHOICES = {
+    ('migrate', 'file', 'copy_option'): ('overwrite', 'keep', 'sync'),
+    ('migrate', 'file', 'method'): ('copy', 'reflink', 'hardlink'),
+    ('migrate', 'filter_rule'): ('excludes', 'includes'),
+    ('library', 'backend'): ('json', 'sqlite')
+}
 
-def check_and_fix() -> dict:
-    '''检测并修复配置文件的完整性'''
-    if not config_exist():
-        gen_default_config()
-        return default_config.copy()
-
-    try:
-        with open(CONFIG_PATH, 'r', encoding='utf-8') as f:
-            config = yaml.safe_load(f) or {}
-    except (FileNotFoundError, yaml.YAMLError):
-        gen_default_config()
-        return default_config.copy()
-
-    def check_unit(target: dict, sample: dict) -> dict:
-        # 1. 补全缺失的键
-        for key, default_val in sample.items():
-            if key not in target:
-                target[key] = default_val
-
-        # 2. 修正类型错误 & 递归修复子 dict
-        for key, current_val in list(target.items()):
-            if key not in sample:
-                continue  # 可选：保留用户自定义字段，或 del target[key]
-            
-            expected_val = sample[key]
-            expected_type = type(expected_val)
-
-            # 如果期望的是 dict，且当前值也是 dict → 递归修复
-            if isinstance(expected_val, dict):
-                if isinstance(current_val, dict):
-                    target[key] = check_unit(current_val, expected_val)
-                else:
-                    # 类型不符，恢复默认 dict
-                    target[key] = expected_val.copy()  # 避免引用问题
+@dataclass(frozen=True, slots=True)
+class FileSettings:
+    copy_option: str
+    compare_hash: bool
+    method: str
+    hardlink: tuple[str, ...]
+
+@dataclass(frozen=True, slots=True)
+class JobSettings:
+    max_running: int
+    max_disk: int
+
+@dataclass(frozen=True, slots=True)
+class MigrateSettings:
+    file: FileSettings
+    filter_rule: str
+    includes: tuple[str, ...]
+    excludes: tuple[str, ...]
+    rules: tuple[str, ...]
+    jobs: JobSettings
+    keep_original_mods: bool # 不在默认配置里，需要手动写上keep-original-mods: true，迁移模组时不清空目标的mods文件夹
+
+@dataclass(frozen=True, slots=True)
+class LibrarySettings:
+    backend: str
+    manifest_cache: bool
+
+@dataclass(frozen=True, slots=True, eq=False)
+class Settings:
+    '''config.yml校验后的只读视图，每次重新读取都会生成新的实例，拿到的实例本身不会改变'''
+    migrate: MigrateSettings
+    library: LibrarySettings
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'Settings':
+        '''由已经补全过的配置dict生成（见_fix_unit()）'''
+        migrate, file, jobs, lib = data['migrate'], data['migrate']['file'], data['migrate']['jobs'], data['library']
+        strings = lambda items: tuple(str(item) for item in items or [])
+        return cls(
+            MigrateSettings(
+                FileSettings(
+                    _choice(file['copy_option'], 'migrate', 'file', 'copy_option'),
+                    bool(file['compare_hash']),
+                    _choice(file['method'], 'migrate', 'file', 'method'),
+                    strings(file['hardlink'])
+                ),
+                _choice(migrate['filter_rule'], 'migrate', 'filter_rule'),
+                strings(migrate['includes']),
+                strings(migrate['excludes']),
+                strings(migrate['rules']),
+                JobSettings(max(1, jobs['max_running']), max(1, jobs['max_disk'])),
+                bool(migrate.get('keep-original-mods', False))
+            ),
+            LibrarySettings(_choice(lib['backend'], 'library', 'backend'), bool(lib['manifest_cache']))
+        )
+
+def _choice(value: str, *keys: str) -> str:
+    if value in CHOICES[keys]:
+        return value
+    default = default_config
+    for key in keys: default = default[key]
+    logger.warning(f"配置项{'.'.join(keys)}的值{value!r}无效，按{default}处理")
+    return default
+
+def _fix_unit(target: dict, sample: dict) -> dict:
+    '''按sample补全缺失的键，并把类型不对的值恢复成默认值（会直接修改target）'''
+    # 1. 补全缺失的键
+    for key, default_val in sample.items():
+        if key not in target:
+            target[key] = copy.deepcopy(default_val)
+
+    # 2. 修正类型错误 & 递归修复子 dict
+    for key, current_val in list(target.items()):
+        if key not in sample:
+            continue  # 保留用户自定义字段
+        
+        expected_val = sample[key]
+
+        # 如果期望的是 dict，且当前值也是 dict → 递归修复
+        if isinstance(expected_val, dict):
+            if isinstance(current_val, dict):
+                target[key] = _fix_unit(current_val, expected_val)
             else:
-                # 期望的是非 dict（如 bool, str, list）
-                if not isinstance(current_val, expected_type):
-                    target[key] = expected_val  # 恢复默认值
+                # 类型不符，恢复默认 dict
+                target[key] = copy.deepcopy(expected_val)
+        else:
+            # 期望的是非 dict（如 bool, str, list），int的地方不接受bool
+            if not isinstance(current_val, type(expected_val)) or (isinstance(current_val, bool) and not isinstance(expected_val, bool)):
+                target[key] = copy.deepcopy(expected_val)
+
+    return target
+
+def _upgrade(data: dict) -> dict:
+    '''
+    升级旧版本的配置（会直接修改data）
+    \n- 1 → 2：以前的版本不管copy_option写的是什么都会覆盖目标文件，配置里的keep只是当时的默认值，
+    升级时改成overwrite，保持原来的迁移行为；想保留目标已有文件的需要重新改回keep
+    '''
+    version = data.get('config_version', 1)
+    if not isinstance(version, int) or isinstance(version, bool) or version >= CONFIG_VERSION:
+        return data
+    file = data.get('migrate', {}).get('file') if isinstance(data.get('migrate'), dict) else None
+    if isinstance(file, dict) and file.get('copy_option', 'keep') == 'keep':
+        file['copy_option'] = 'overwrite'
+        logger.warning("配置文件已升级：migrate.file.copy_option改为overwrite（与之前的版本一样覆盖目标文件），需要保留目标已有文件时请改回keep")
+    data['config_version'] = CONFIG_VERSION
+    return data
+
+class ConfigCache:
+    '''
+    config.yml的内存缓存
+    \n只在第一次使用和文件的修改时间（或大小）改变时重新读取，平时的查询都只是读内存；检查文件是否改变最多每CHECK_INTERVAL秒一次
+    \n重新读取后内容有变化时，调用通过add_listener()注册的监听函数，参数为新的Settings
+    '''
+    CHECK_INTERVAL = 1.0
 
-        return target
+    def __init__(self, path: Path = CONFIG_PATH):
+        self.path = Path(path)
+        self._raw: dict | None = None
+        self._settings: Settings | None = None
+        self._stamp: tuple[int, int] | None = None # (修改时间, 大小)
+        self._checked = 0.0
+        self._lock = threading.Lock()
+        self._listeners: list[Callable[[Settings], None]] = []
 
-    fixed_config = check_unit(config, default_config)
+    def add_listener(self, func: Callable[[Settings], None]):
+        self._listeners.append(func)
 
-    # 将修复后的配置写回文件
-    with open(CONFIG_PATH, 'w', encoding='utf-8') as f:
-        yaml.dump(fixed_config, f, allow_unicode=True, default_flow_style=False, indent=2)
+    def remove_listener(self, func: Callable[[Settings], None]):
+        if func in self._listeners:
+            self._listeners.remove(func)
 
-    return fixed_config
+    def settings(self) -> Settings:
+        self._refresh()
+        return self._settings
+
+    def raw(self) -> dict:
+        '''补全过的配置dict，不要修改它'''
+        self._refresh()
+        return self._raw
+
+    def reload(self):
+        '''不管文件有没有改变，都立即重新读取'''
+        self._refresh(force=True)
+
+    def _refresh(self, force: bool = False):
+        now = time.monotonic()
+        if not force and self._settings is not None and now - self._checked < self.CHECK_INTERVAL:
+            return
+        with self._lock:
+            self._checked = now
+            if not force and self._settings is not None and self._stat() == self._stamp:
+                return
+            raw = self._load()
+            changed = self._raw is not None and raw != self._raw
+            self._raw, self._settings = raw, Settings.from_dict(raw)
+            self._stamp = self._stat() # _load()可能写回了文件，以写回之后的为准
+            settings = self._settings
+        if changed:
+            logger.info("配置文件已改变，已重新加载")
+            for listener in list(self._listeners):
+                try:
+                    listener(settings)
+                except Exception as e:
+                    logger.exception(f"配置变更的监听函数出错: {e}")
+
+    def _stat(self) -> tuple[int, int] | None:
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _load(self) -> dict:
+        '''读取并补全配置，文件不存在或无法解析时重新生成默认配置；只有补全了内容时才写回文件'''
+        if not (self.path.exists() and self.path.stat().st_size > 0):
+            _write(default_config, self.path)
+            return copy.deepcopy(default_config)
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = yaml.load(f, Loader=_Loader) or {}
+            if not isinstance(data, dict):
+                raise yaml.YAMLError('配置文件的内容不是字典')
+        except (OSError, yaml.YAMLError) as e:
+            logger.error(f"读取配置文件失败：{e}，正在重新生成初始配置文件")
+            _write(default_config, self.path)
+            return copy.deepcopy(default_config)
+
+        fixed = _fix_unit(_upgrade(copy.deepcopy(data)), default_config)
+        if fixed != data:
+            logger.info("配置文件有缺失或错误的项，已补全")
+            _write(fixed, self.path)
+        return fixed
+
+_cache = ConfigCache()
+
+def get_settings() -> Settings:
+    '''当前的配置（带缓存，文件改变后会自动重新读取）'''
+    return _cache.settings()
+
+def add_listener(func: Callable[[Settings], None]):
+    '''配置文件被修改并重新读取后调用func，参数为新的Settings'''
+    _cache.add_listener(func)
+
+def remove_listener(func: Callable[[Settings], None]):
+    _cache.remove_listener(func)
+
+def config_exist() -> bool:
+    return CONFIG_PATH.exists() and CONFIG_PATH.stat().st_size > 0
+
+def check_and_fix() -> dict:
+    '''检测并修复配置文件的完整性'''
+    _cache.reload()
+    return copy.deepcopy(_cache.raw())
 
 def gen_default_config():
-    with open(CONFIG_PATH, 'w', encoding='utf-8') as f:
-        yaml.dump(default_config, f, allow_unicode=True, default_flow_style=False, indent=2)
+    _write(default_config)
+
+def _write(data: dict, path: Path = CONFIG_PATH):
+    with open(path, 'w', encoding='utf-8') as f:
+        yaml.dump(data, f, allow_unicode=True, default_flow_style=False, indent=2)
 
 def get_config() -> dict:
-    if not config_exist():
-        gen_default_config()
-    try:
-        with open(CONFIG_PATH, 'r', encoding='utf-8') as f:
-            return yaml.safe_load(f)
-    except Exception as e:
-        logger.error('读取配置文件时出现错误：' + e)
+    return copy.deepcopy(_cache.raw())
 
 def get_config_value(*keys: str) -> Any | None:
     """
-    获取配置值，支持多级嵌套访问。
+    获取配置值，支持多级嵌套访问（读的是缓存，不会每次都读取文件）。
     
     示例：
         get_config_dict("migrate") 
@@ -112,27 +299,14 @@ def get_config_value(*keys: str) -> Any | None:
     if not keys:
         return None
 
-    try:
-        if not config_exist():
-            gen_default_config()
-        
-        with open(CONFIG_PATH, 'r', encoding='utf-8') as f:
-            config = yaml.safe_load(f) or {}
-        
-        current = config
-        for key in keys:
-            if isinstance(current, dict):
-                current = current.get(key)
-            elif isinstance(current, list) and isinstance(key, int):
-                current = current[key] if 0 <= key < len(current) else None
-            else:
-                return None  # 无法继续深入
-            if current is None:
-                break
-        return current
-
-    except (OSError, yaml.YAMLError) as e:
-        logger.error(f"读取配置文件失败：{e}，正在重新生成初始配置文件")
-        fixed_config = check_and_fix()
-        # 递归调用自己（此时文件已修复）
-        return get_config_value(*keys)
\ No newline at end of file
+    current = _cache.raw()
+    for key in keys:
+        if isinstance(current, dict):
+            current = current.get(key)
+        elif isinstance(current, list) and isinstance(key, int):
+            current = current[key] if 0 <= key < len(current) else None
+        else:
+            return None  # 无法继续深入
+        if current is None:
+            break
+    return copy.deepcopy(current) if isinstance(current, (dict, list)) else current
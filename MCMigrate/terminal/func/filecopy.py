@@ -0,0 +1,480 @@
+'''
+多线程的游戏文件复制
+\n由调用线程负责遍历目录（生产者），按遍历顺序先创建目标文件夹，再把文件交给线程池复制
+\n不依赖Qt，进度和错误都通过回调与CopyEngine.failed取得
+\n支持写时复制（reflink）和硬链接，文件系统不支持时会自动退回普通复制，检测结果按(源设备, 目标设备)缓存
+\n也可以直接按预先扫描好的manifest.Manifest复制，这时不会再访问源文件的元数据，还可以同时写入多个目标，每个源文件只读取一次
+'''
+from concurrent.futures import ThreadPoolExecutor
+from enum import Enum
+from pathlib import Path
+from typing import Callable, TYPE_CHECKING
+from terminal.func.manifest import Manifest, FileMeta
+import os, shutil, threading, hashlib, errno, logging
+try:
+    import fcntl
+except ImportError: # Windows没有fcntl，reflink直接视为不支持
+    fcntl = None
+if TYPE_CHECKING:
+    from terminal.func.journal import MigrateJournal
+
+# 设置日志
+logger = logging.getLogger(__name__)
+
+class CopyOption(Enum):
+    '''目标文件已存在时的处理方式，对应config.yml中的migrate.file.copy_option'''
+    OVERWRITE = 'overwrite' # 全部覆盖
+    KEEP = 'keep' # 保留目标已有的文件
+    SYNC = 'sync' # 只复制有变化的文件（大小和修改时间不同，或开启hash比较时内容不同）
+
+    @classmethod
+    def parse(cls, value: str | None) -> 'CopyOption':
+        try:
+            return cls(value)
+        except ValueError:
+            logger.warning(f"未知的copy_option: {value}，按overwrite处理")
+            return cls.OVERWRITE
+
+class CopyMethod(Enum):
+    '''文件的复制方式，对应config.yml中的migrate.file.method'''
+    COPY = 'copy' # 普通复制
+    REFLINK = 'reflink' # 写时复制（btrfs, XFS等），不支持时依次退回copy_file_range和普通复制
+    HARDLINK = 'hardlink' # 硬链接，源和目标共用同一份文件！只适合迁移后不会再修改的资源，不支持时退回reflink
+
+    @classmethod
+    def parse(cls, value: str | None) -> 'CopyMethod':
+        try:
+            return cls(value)
+        except ValueError:
+            logger.warning(f"未知的复制方式: {value}，按copy处理")
+            return cls.COPY
+
+MTIME_TOLERANCE_NS = 2_000_000_000 # FAT/exFAT的修改时间精度只有2秒
+FICLONE = 0x40049409 # linux/fs.h
+# 出现这些错误说明是文件系统（或两个文件系统之间）不支持，而不是这个文件本身的问题
+# （EPERM通常是目标文件本身没有权限，不能因为一个文件就把整个文件系统当成不支持）
+_UNSUPPORTED_ERRNOS = {errno.EOPNOTSUPP, errno.ENOTSUP, errno.EXDEV, errno.EINVAL, errno.ENOTTY, errno.ENOSYS, errno.EMLINK}
+# 只有link()返回EPERM时表示文件系统不支持硬链接（如FAT/exFAT）
+_HARDLINK_UNSUPPORTED_ERRNOS = _UNSUPPORTED_ERRNOS | {errno.EPERM}
+
+def reflink(src: Path, dst: Path):
+    '''通过FICLONE创建写时复制的副本，不会复制实际数据'''
+    with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+        fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+
+def copy_range(src: Path, dst: Path, size: int):
+    '''
+    通过copy_file_range在内核中复制，部分文件系统（NFS/SMB）还能在服务端直接复制
+    \n有的文件系统没复制完就返回0，这时剩下的部分改用普通读写接着复制
+    Raises:
+        OSError: 复制完的大小和size不一致（源文件在复制过程中变小了）
+    '''
+    with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+        remaining = size
+        while remaining > 0:
+            n = os.copy_file_range(fsrc.fileno(), fdst.fileno(), min(remaining, 1 << 30))
+            if n == 0: break
+            remaining -= n
+        # copy_file_range会同时移动两边的文件偏移，直接从当前位置继续
+        while remaining > 0 and (chunk := fsrc.read(min(remaining, 1 << 20))):
+            fdst.write(chunk)
+            remaining -= len(chunk)
+        if remaining > 0:
+            raise OSError(errno.EIO, f"复制不完整，还差 {remaining} 字节", str(src))
+
+def hardlink(src: Path, dst: Path):
+    try:
+        os.link(src, dst)
+    except FileExistsError: # 覆盖已有文件
+        os.unlink(dst)
+        os.link(src, dst)
+
+def copy_to_many(src: Path, dsts: list[Path], chunk_size: int = 1 << 20) -> list[Exception | None]:
+    '''
+    把源文件同时复制到多个目标，源文件只读取一次；某个目标写入失败时不影响其他目标
+    Returns:
+        list[Exception | None]: 与dsts一一对应，复制成功为None
+    '''
+    errors: list[Exception | None] = [None] * len(dsts)
+    outputs: list = [None] * len(dsts)
+    try:
+        with open(src, 'rb') as fsrc:
+            for k, dst in enumerate(dsts):
+                try:
+                    outputs[k] = open(dst, 'wb')
+                except OSError as e:
+                    errors[k] = e
+            buffer = bytearray(chunk_size)
+            view = memoryview(buffer)
+            while any(outputs) and (n := fsrc.readinto(buffer)):
+                for k, out in enumerate(outputs):
+                    if out is None: continue
+                    try:
+                        out.write(view[:n])
+                    except OSError as e:
+                        errors[k] = e
+                        out.close()
+                        outputs[k] = None
+    except OSError as e: # 源文件读取失败，所有目标都算失败
+        errors = [error or e for error in errors]
+    finally:
+        for k, out in enumerate(outputs):
+            if out is None: continue
+            try:
+                out.close()
+            except OSError as e:
+                errors[k] = errors[k] or e
+    for k, dst in enumerate(dsts):
+        if errors[k] is None:
+            try:
+                shutil.copystat(src, dst)
+            except OSError as e:
+                errors[k] = e
+    return errors
+
+def file_hash(path: Path) -> bytes:
+    with open(path, 'rb') as f:
+        return hashlib.file_digest(f, 'blake2b').digest()
+
+def is_same_file(src: Path, dst: Path, src_st: os.stat_result | FileMeta, dst_st: os.stat_result, compare_hash: bool = False) -> bool:
+    '''判断目标文件是否已经和源文件一致'''
+    if src_st.st_size != dst_st.st_size:
+        return False
+    if compare_hash:
+        return file_hash(src) == file_hash(dst)
+    return abs(src_st.st_mtime_ns - dst_st.st_mtime_ns) < MTIME_TOLERANCE_NS
+
+class _Dest:
+    '''一个目标根目录，同一个源文件可以同时复制到多个目标'''
+    __slots__ = ('root', 'dev', 'journal')
+
+    def __init__(self, root: Path, dev: int | None, journal: 'MigrateJournal' = None):
+        self.root = root
+        self.dev = dev # 目标所在的设备，用于按文件系统缓存reflink/硬链接的支持情况
+        self.journal = journal # copy_manifest()时记录每个文件的进度
+
+class _Batch:
+    '''记录一次copy()还有多少文件没复制完，全部完成后调用on_done'''
+    __slots__ = ('pending', 'on_done', 'method', 'lock', 'callback_lock')
+
+    def __init__(self, on_done: Callable[[], None] | None, method: CopyMethod, callback_lock: threading.Lock):
+        self.pending = 1 # 生产者自己占一个，遍历完之后才释放，避免遍历途中就被判定为完成
+        self.on_done = on_done
+        self.method = method
+        self.lock = threading.Lock()
+        self.callback_lock = callback_lock
+
+    def acquire(self):
+        with self.lock:
+            self.pending += 1
+
+    def release(self):
+        with self.lock:
+            self.pending -= 1
+            done = self.pending == 0
+        if done and self.on_done:
+            with self.callback_lock: # 回调串行执行，调用方不用再考虑线程安全
+                self.on_done()
+
+class CopyEngine:
+    '''
+    线程池文件复制引擎，需要用with语句使用
+    \n复制失败的文件会记录在failed中（[路径, 错误信息]），不会中断整个复制
+    \n复制/跳过的文件数和字节数记录在files_copied, bytes_copied, files_skipped, bytes_skipped中（同时复制到多个目标时按目标分别计数），
+    其中通过reflink/硬链接完成、没有占用额外空间的部分另外记录在bytes_linked中
+    '''
+    def __init__(self, workers: int = None, abort_event: threading.Event = None, option: CopyOption = CopyOption.OVERWRITE, compare_hash: bool = False, method: CopyMethod = CopyMethod.COPY, on_file: Callable[[int, bool], None] = None):
+        '''
+        Args:
+            workers(int): 复制线程数，不传入则按CPU核数决定（复制主要在等IO，所以比核数多一些）
+            abort_event(threading.Event): 终止信号，可以和其他任务共用
+            option(CopyOption): 目标文件已存在时的处理方式
+            compare_hash(bool): SYNC模式下，大小相同时比较文件内容的hash，而不是修改时间
+            method(CopyMethod): 默认的复制方式，copy()时可以单独指定
+            on_file(Callable[[int, bool], None]): 每个源文件处理完（包括跳过和失败）后在复制线程中调用，参数为(文件大小, 是否复制了数据)
+        '''
+        self.workers = workers or min(32, (os.cpu_count() or 4) * 2)
+        self.abort_event = abort_event or threading.Event()
+        self.option = option
+        self.compare_hash = compare_hash
+        self.method = method
+        self.on_file = on_file
+        self.failed: list[list[str]] = []
+        self.files_copied = 0
+        self.bytes_copied = 0
+        self.files_skipped = 0
+        self.bytes_skipped = 0
+        self.bytes_linked = 0
+        self.copied_indices: dict[Path, list[int]] = {} # copy_manifest()时，目标根目录 -> 实际复制了的文件在清单中的下标
+        self._caps: dict[tuple[str, int, int], bool] = {} # (方式, 源设备, 目标设备) -> 是否支持
+        self._lock = threading.Lock()
+        self._callback_lock = threading.Lock()
+        self._executor: ThreadPoolExecutor | None = None
+        self._slots: threading.BoundedSemaphore | None = None # 限制排队中的文件数，遍历超大目录时不会占满内存
+
+    def __enter__(self) -> 'CopyEngine':
+        self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix='MCMigrate-copy')
+        self._slots = threading.BoundedSemaphore(self.workers * 4)
+        return self
+
+    def __exit__(self, *exc):
+        self._executor.shutdown(wait=True, cancel_futures=self.aborted)
+        self._executor = None
+
+    @property
+    def aborted(self) -> bool:
+        return self.abort_event.is_set()
+
+    def abort(self):
+        self.abort_event.set()
+
+    def copy(self, src: Path, dst: Path, on_done: Callable[[], None] = None, method: CopyMethod = None):
+        '''
+        复制单个文件或整个文件夹（目标文件已存在时按option处理）
+        \n遍历完成后立即返回，文件在后台线程复制
+        Args:
+            on_done(Callable): 该文件/文件夹下的全部文件都复制完（或失败）后调用，可能在复制线程中调用
+            method(CopyMethod): 这次复制使用的方式，不传入则使用self.method
+        '''
+        method = method or self.method
+        batch = _Batch(on_done, method, self._callback_lock)
+        dest = _Dest(dst, self._dst_dev(dst))
+        try:
+            if src.is_dir():
+                self._walk(src, dst, dest, batch)
+            else:
+                self._submit(src, [(dst, dest)], batch)
+        finally:
+            batch.release()
+
+    def copy_manifest(self, manifest: Manifest, dst_root: Path | list[Path], method_of: Callable[[str], CopyMethod | None] = None, skip_empty_dirs: bool = False, journal: 'MigrateJournal | list[MigrateJournal]' = None):
+        '''
+        按清单复制：先按遍历顺序创建全部文件夹，再从大到小提交文件（大文件最先开始，最后不会只剩一个大文件拖着）
+        \n源文件的大小、修改时间直接取自清单，不会再次stat源文件
+        \n传入多个目标时，每个源文件只读取一次，同时写入所有目标
+        Args:
+            dst_root(Path | list[Path]): 目标根目录，可以是多个
+            method_of(Callable[[str], CopyMethod | None]): 参数为顶层文件/文件夹名，返回该项的复制方式，返回None则使用self.method
+            skip_empty_dirs(bool): 不创建下面没有文件的文件夹
+            journal(MigrateJournal | list[MigrateJournal]): 迁移日志（多个目标时与dst_root一一对应），日志中已完成的文件直接跳过（计入files_skipped），其余文件复制时记录到日志中
+        '''
+        roots = [Path(dst_root)] if isinstance(dst_root, (str, Path)) else [Path(root) for root in dst_root]
+        journals = journal if isinstance(journal, (list, tuple)) else [journal] * len(roots)
+        batches: dict[CopyMethod, _Batch] = {}
+        def batch_of(i: int) -> _Batch:
+            method = (method_of and method_of(manifest.top(i))) or self.method
+            if method not in batches:
+                batches[method] = _Batch(None, method, self._callback_lock)
+            return batches[method]
+
+        try:
+            dests = []
+            for root, root_journal in zip(roots, journals):
+                root.mkdir(parents=True, exist_ok=True)
+                dests.append(_Dest(root, self._dst_dev(root), root_journal))
+                self.copied_indices.setdefault(root, [])
+            for i in manifest.dirs(skip_empty_dirs):
+                if self.aborted:
+                    return
+                for dest in dests:
+                    if dest.journal and i in dest.journal.done_dirs:
+                        continue
+                    try:
+                        (dest.root / manifest.relpath(i)).mkdir(exist_ok=True)
+                        if dest.journal: dest.journal.dir_done(i)
+                    except OSError as e:
+                        self._fail(manifest.root / manifest.relpath(i), e)
+            for i in manifest.files(largest_first=True):
+                if self.aborted:
+                    return
+                rel = manifest.relpath(i)
+                targets = [(dest.root / rel, dest) for dest in dests if not (dest.journal and i in dest.journal.done_files)]
+                if len(targets) < len(dests): # 上次已经迁移完的文件
+                    size = manifest.sizes[i]
+                    with self._lock:
+                        self.files_skipped += len(dests) - len(targets)
+                        self.bytes_skipped += size * (len(dests) - len(targets))
+                    if not targets:
+                        if self.on_file: self.on_file(size, False)
+                        continue
+                self._submit(manifest.root / rel, targets, batch_of(i), manifest.meta(i), i)
+        finally:
+            for batch in batches.values():
+                batch.release()
+
+    @staticmethod
+    def _dst_dev(dst: Path) -> int | None:
+        try:
+            return os.stat(dst if dst.exists() else dst.parent).st_dev
+        except OSError:
+            return None
+
+    def _walk(self, src: Path, dst: Path, dest: _Dest, batch: _Batch):
+        stack = [(src, dst)]
+        while stack:
+            if self.aborted:
+                return
+            s, d = stack.pop()
+            try:
+                d.mkdir(parents=True, exist_ok=True) # 父文件夹一定比子文件夹先出栈，所以创建顺序是有序的
+                with os.scandir(s) as it:
+                    entries = list(it)
+            except OSError as e:
+                self._fail(s, e)
+                continue
+
+            subdirs = []
+            for entry in entries:
+                if self.aborted:
+                    return
+                if entry.is_dir():
+                    subdirs.append((s / entry.name, d / entry.name))
+                else:
+                    self._submit(s / entry.name, [(d / entry.name, dest)], batch)
+            stack.extend(reversed(subdirs)) # 保持原来的遍历顺序
+
+    def _submit(self, src: Path, targets: list[tuple[Path, _Dest]], batch: _Batch, meta: FileMeta = None, index: int = None):
+        while not self._slots.acquire(timeout=0.1):
+            if self.aborted:
+                return
+        batch.acquire()
+        self._executor.submit(self._copy_file, src, targets, batch, meta, index)
+
+    def _copy_file(self, src: Path, targets: list[tuple[Path, _Dest]], batch: _Batch, meta: FileMeta = None, index: int = None):
+        size, copied = 0, False
+        try:
+            if not self.aborted:
+                st = meta or os.stat(src)
+                size = st.st_size
+                pending = []
+                for dst, dest in targets:
+                    try:
+                        try:
+                            dst_st = os.stat(dst)
+                        except FileNotFoundError:
+                            dst_st = None
+                        redo = dest.journal is not None and index is not None and index in dest.journal.redo_files
+                        if redo:
+                            if dst_st is not None:
+                                os.unlink(dst) # 上次复制到一半中断的文件，不管复制选项是什么都重新复制
+                                dst_st = None
+                        elif self._should_skip(src, dst, st, dst_st, batch.method):
+                            with self._lock:
+                                self.files_skipped += 1
+                                self.bytes_skipped += st.st_size
+                            if dest.journal and index is not None: dest.journal.file_done(index)
+                            continue
+                        if dest.journal and index is not None: dest.journal.begin(index)
+                        if dst_st is not None and dst_st.st_nlink > 1 and batch.method is not CopyMethod.HARDLINK:
+                            os.unlink(dst) # 目标是硬链接，先断开，不然写入时会连另一边的文件一起改掉
+                        pending.append((dst, dest))
+                    except Exception as e:
+                        self._fail_file(src if len(targets) == 1 else dst, e)
+
+                for dst, dest, linked in self._transfer(src, pending, st, batch.method, len(targets) > 1):
+                    copied = True
+                    with self._lock:
+                        self.files_copied += 1
+                        self.bytes_copied += st.st_size
+                        if linked: self.bytes_linked += st.st_size
+                        if index is not None: self.copied_indices[dest.root].append(index)
+                    if dest.journal and index is not None: dest.journal.file_done(index)
+        except Exception as e:
+            self._fail_file(src, e)
+        finally:
+            if self.on_file and not self.aborted:
+                self.on_file(size, copied)
+            self._slots.release()
+            batch.release()
+
+    def _transfer(self, src: Path, targets: list[tuple[Path, _Dest]], st: os.stat_result | FileMeta, method: CopyMethod, multi: bool) -> list[tuple[Path, _Dest, bool]]:
+        '''
+        按method复制文件，不支持的方式会逐级退回；需要普通复制的目标有多个时，源文件只读取一次
+        Args:
+            multi(bool): 是否同时复制到多个目标（失败时记录目标路径而不是源路径）
+        Returns:
+            list[tuple[Path, _Dest, bool]]: 复制成功的目标，以及是否通过reflink/硬链接完成（没有复制实际数据）
+        '''
+        done, plain = [], []
+        for dst, dest in targets:
+            devs = (st.st_dev, dest.dev)
+            try:
+                if method is not CopyMethod.COPY and dest.dev is not None:
+                    if method is CopyMethod.HARDLINK and self._try('hardlink', devs, hardlink, src, dst, unsupported=_HARDLINK_UNSUPPORTED_ERRNOS):
+                        done.append((dst, dest, True))
+                        continue
+                    if fcntl is not None and self._try('reflink', devs, reflink, src, dst):
+                        shutil.copystat(src, dst)
+                        done.append((dst, dest, True))
+                        continue
+                    if hasattr(os, 'copy_file_range') and self._try('copy_file_range', devs, copy_range, src, dst, st.st_size):
+                        shutil.copystat(src, dst)
+                        done.append((dst, dest, False))
+                        continue
+                plain.append((dst, dest))
+            except Exception as e:
+                self._fail_file(dst if multi else src, e)
+
+        if len(plain) == 1:
+            dst, dest = plain[0]
+            try:
+                shutil.copy2(src, dst)
+                done.append((dst, dest, False))
+            except Exception as e:
+                self._fail_file(dst if multi else src, e)
+        elif plain:
+            errors = copy_to_many(src, [dst for dst, _ in plain])
+            for (dst, dest), error in zip(plain, errors):
+                if error is None:
+                    done.append((dst, dest, False))
+                else:
+                    self._fail_file(dst, error)
+        return done
+
+    def _try(self, kind: str, devs: tuple[int, int], func: Callable, *args, unsupported: set[int] = _UNSUPPORTED_ERRNOS) -> bool:
+        '''
+        尝试用该方式复制，文件系统不支持时记录下来，同一对文件系统之后不再尝试
+        Args:
+            unsupported(set[int]): 视为文件系统不支持的errno
+        Raises:
+            OSError: 与文件系统支持无关的错误（权限不足、磁盘满了之类的）
+        '''
+        key = (kind, *devs)
+        if self._caps.get(key) is False:
+            return False
+        try:
+            func(*args)
+        except OSError as e:
+            if e.errno not in unsupported:
+                raise
+            if self._caps.get(key) is None:
+                logger.info(f"当前文件系统不支持{kind}（{e}），改用其他方式复制")
+            self._caps[key] = False
+            return False
+        self._caps[key] = True
+        return True
+
+    def _should_skip(self, src: Path, dst: Path, st: os.stat_result | FileMeta, dst_st: os.stat_result | None, method: CopyMethod) -> bool:
+        if dst_st is None:
+            return False
+        # 之前已经硬链接过去了，本来就是同一个文件，不用硬链接时要重新复制一份独立的
+        # （Windows上DirEntry.stat()不带inode，为0时不判断）
+        if st.st_ino and os.path.samestat(st, dst_st):
+            return method is CopyMethod.HARDLINK
+        if self.option is CopyOption.OVERWRITE:
+            return False
+        if self.option is CopyOption.KEEP:
+            return True
+        return is_same_file(src, dst, st, dst_st, self.compare_hash)
+
+    def _fail_file(self, path: Path, e: Exception):
+        if isinstance(e, PermissionError):
+            logger.warning(f"权限不足: {path}")
+            self._fail(path, "权限不足")
+        else:
+            logger.error(f"复制{path}失败: {e}")
+            self._fail(path, e)
+
+    def _fail(self, path: Path, e: Exception | str):
+        with self._lock:
+            self.failed.append([str(path), str(e)])
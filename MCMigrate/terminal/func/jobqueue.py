@@ -0,0 +1,207 @@
+'''
+迁移任务队列
+\n记录所有迁移任务及其状态，按优先级决定下一个要运行的任务；未完成的任务会保存在migrate_jobs.json中，重启程序后可以继续
+\n只负责任务的数据和排序，真正运行任务的调度器在Terminal.MigrateScheduler中
+'''
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable
+import json, os, time, uuid, threading, logging
+
+# 设置日志
+logger = logging.getLogger(__name__)
+
+JOBS_JSON = Path('migrate_jobs.json')
+
+class JobState:
+    '''任务状态'''
+    QUEUED = 'queued' # 等待运行
+    RUNNING = 'running'
+    PAUSED = 'paused' # 暂停后再继续时，会通过迁移日志跳过已完成的文件
+    DONE = 'done'
+    FAILED = 'failed'
+    CANCELLED = 'cancelled'
+
+    UNFINISHED = (QUEUED, RUNNING, PAUSED)
+
+@dataclass(slots=True)
+class MigrateJob:
+    source_json: dict
+    target_jsons: list[dict]
+    priority: int = 0 # 越大越先运行
+    state: str = JobState.QUEUED
+    id: str = field(default_factory=lambda: uuid.uuid4().hex[:12])
+    created: float = field(default_factory=time.time)
+    error: str | None = None # 失败原因
+
+    @property
+    def source_dir(self) -> Path:
+        return Path(self.source_json['game_path'])
+
+    @property
+    def target_dirs(self) -> list[Path]:
+        return [Path(target['game_path']) for target in self.target_jsons]
+
+    @property
+    def target_names(self) -> str:
+        return '、'.join(str(target.get('name')) for target in self.target_jsons)
+
+    @property
+    def title(self) -> str:
+        return f"{self.source_json.get('name')} → {self.target_names}"
+
+    @property
+    def finished(self) -> bool:
+        return self.state not in JobState.UNFINISHED
+
+    def conflicts_with(self, other: 'MigrateJob') -> bool:
+        '''两个任务是否会写入同一个文件夹，或是一个任务的目标是另一个任务的源（不能同时运行）'''
+        mine, theirs = set(self.target_dirs), set(other.target_dirs)
+        return bool(mine & theirs) or self.source_dir in theirs or other.source_dir in mine
+
+    def to_dict(self) -> dict:
+        return {
+            'id': self.id, 'source_json': self.source_json, 'target_jsons': self.target_jsons,
+            'priority': self.priority, 'state': self.state, 'created': self.created, 'error': self.error
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'MigrateJob':
+        return cls(
+            data['source_json'], list(data['target_jsons']), int(data.get('priority', 0)),
+            data.get('state', JobState.QUEUED), data['id'], float(data.get('created', time.time())), data.get('error')
+        )
+
+class DiskSlots:
+    '''
+    同时复制文件的任务名额，用法和threading.Semaphore相同（acquire/release）
+    \n名额上限不是固定的，每次判断时都会调用limit()重新取，改小后已经在复制的任务不受影响，只是之后的任务要等到名额降下来
+    '''
+    def __init__(self, limit: Callable[[], int]):
+        self.limit = limit
+        self._in_use = 0
+        self._cond = threading.Condition()
+
+    @property
+    def in_use(self) -> int:
+        return self._in_use
+
+    def acquire(self, timeout: float = None) -> bool:
+        '''
+        Returns:
+            bool: 是否拿到了名额，超时为False
+        '''
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._in_use < self.limit(), timeout):
+                return False
+            self._in_use += 1
+            return True
+
+    def release(self):
+        with self._cond:
+            self._in_use -= 1
+            self._cond.notify_all()
+
+    def wake(self):
+        '''上限改变后调用，让等待中的任务重新判断'''
+        with self._cond:
+            self._cond.notify_all()
+
+class JobQueue:
+    '''
+    迁移任务队列，任务按加入顺序保存，运行顺序由sort_key()决定（优先级高的在前，同优先级先加入的在前）
+    \n每次修改后都会调用监听者（参数为发生改变的任务），并写入migrate_jobs.json
+    '''
+    def __init__(self, path: Path = JOBS_JSON):
+        self.path = Path(path)
+        self._jobs: dict[str, MigrateJob] = {}
+        self._listeners: list[Callable[[MigrateJob | None], None]] = []
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    def __contains__(self, job_id: str) -> bool:
+        return job_id in self._jobs
+
+    def add_listener(self, listener: Callable[[MigrateJob | None], None]):
+        self._listeners.append(listener)
+
+    def get(self, job_id: str) -> MigrateJob | None:
+        return self._jobs.get(job_id)
+
+    @staticmethod
+    def sort_key(job: MigrateJob) -> tuple:
+        return (-job.priority, job.created)
+
+    def jobs(self) -> list[MigrateJob]:
+        '''所有任务，未完成的按运行顺序在前，已结束的在后'''
+        return sorted(self._jobs.values(), key=lambda job: (job.finished, *self.sort_key(job)))
+
+    def by_state(self, *states: str) -> list[MigrateJob]:
+        return sorted((job for job in self._jobs.values() if job.state in states), key=self.sort_key)
+
+    def has_unfinished(self) -> bool:
+        return any(not job.finished for job in self._jobs.values())
+
+    def add(self, source_json: dict, target_jsons: list[dict], priority: int = 0) -> MigrateJob:
+        job = MigrateJob(source_json, list(target_jsons), priority)
+        self._jobs[job.id] = job
+        self._changed(job)
+        return job
+
+    def set_state(self, job: MigrateJob, state: str, error: str = None):
+        job.state = state
+        job.error = error
+        self._changed(job)
+
+    def set_priority(self, job: MigrateJob, priority: int):
+        job.priority = priority
+        self._changed(job)
+
+    def clear_finished(self):
+        '''清除已结束（完成、失败、取消）的任务'''
+        for job in [job for job in self._jobs.values() if job.finished]:
+            del self._jobs[job.id]
+        self._changed(None)
+
+    # == 持久化 ==
+
+    def load(self):
+        '''
+        读取上次没有完成的任务，上次正在运行或等待中的任务都会变为暂停，由用户决定什么时候继续
+        '''
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            jobs = [MigrateJob.from_dict(item) for item in data]
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError, TypeError, KeyError) as e:
+            logger.warning(f"读取{self.path}失败，已忽略上次的迁移任务: {e}")
+            return
+        for job in jobs:
+            if job.finished:
+                continue
+            job.state = JobState.PAUSED
+            self._jobs[job.id] = job
+        if self._jobs:
+            logger.info(f"已恢复 {len(self._jobs)} 个未完成的迁移任务")
+
+    def save(self):
+        '''原子地写入未完成的任务（先写临时文件再替换）'''
+        data = [job.to_dict() for job in self._jobs.values() if not job.finished]
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        try:
+            if not data:
+                self.path.unlink(missing_ok=True)
+                return
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.error(f"保存迁移任务队列失败: {e}")
+
+    def _changed(self, job: MigrateJob | None):
+        self.save()
+        for listener in self._listeners:
+            listener(job)
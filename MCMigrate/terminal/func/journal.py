@@ -0,0 +1,178 @@
+'''
+可断点续传的迁移日志
+\n复制过程中在目标文件夹里追加写入日志，中途崩溃或被终止后，下次迁移同一对文件夹时直接跳过已经完成的文件
+\n日志每行一条记录，字段以\\t分隔（相对路径放在最后，可以包含空格）：
+\n- H 版本号 源文件夹：文件头，源文件夹不一致时整个日志作废
+\n- D 相对路径：文件夹已创建
+\n- B 大小 修改时间 相对路径：开始复制该文件
+\n- F 大小 修改时间 相对路径：该文件已复制完成（或确认目标已是最新）
+\n只有B没有F的文件说明复制到一半就中断了，续传时会检查目标文件，确认完整才跳过，否则无论复制选项是什么都删掉重新复制
+'''
+from pathlib import Path
+from terminal.func.manifest import Manifest
+from terminal.func.filecopy import MTIME_TOLERANCE_NS
+import os, threading, logging
+
+# 设置日志
+logger = logging.getLogger(__name__)
+
+JOURNAL_NAME = '.mcmigrate_journal'
+VERSION = '1'
+
+class MigrateJournal:
+    '''
+    单次迁移任务的日志，需要用with语句使用
+    \n打开时读取已有的日志，按清单算出可以跳过的文件（done_files）和文件夹（done_dirs），之后只追加写入
+    \n上次复制到一半、目标不完整的文件记在redo_files里，复制时必须重新复制
+    '''
+    def __init__(self, dst_root: Path, manifest: Manifest):
+        self.dst_root = Path(dst_root)
+        self.path = self.dst_root / JOURNAL_NAME
+        self.manifest = manifest
+        self.done_files: set[int] = set()
+        self.done_dirs: set[int] = set()
+        self.redo_files: set[int] = set()
+        self._file = None
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> 'MigrateJournal':
+        self.open()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def resumed(self) -> bool:
+        '''是否从上次中断的地方继续'''
+        return bool(self.done_files or self.done_dirs or self.redo_files)
+
+    def open(self):
+        finished, started, dirs = self._read()
+        index_of = {self.manifest.relpath(i): i for i in range(len(self.manifest))}
+        for rel in dirs:
+            i = index_of.get(rel)
+            if i is not None and self.manifest.is_dir(i):
+                self.done_dirs.add(i)
+        for rel, (size, mtime) in finished.items():
+            i = index_of.get(rel)
+            if i is not None and not self.manifest.is_dir(i) and self._unchanged(i, size, mtime):
+                self.done_files.add(i)
+        for rel, (size, mtime) in started.items(): # 上次中断时正在复制的文件
+            i = index_of.get(rel)
+            if i is None or self.manifest.is_dir(i):
+                continue
+            if self._unchanged(i, size, mtime) and self._verify(i):
+                self.done_files.add(i)
+            else: # 目标只写了一部分，KEEP/SYNC也不能留着它
+                self.redo_files.add(i)
+        if self.resumed:
+            logger.info(f"从迁移日志恢复：跳过 {len(self.done_files)} 个已完成的文件，重新复制 {len(self.redo_files)} 个未完成的文件")
+
+        # 把仍然有效的记录重新写一遍，丢掉过期的部分，之后只追加
+        self.dst_root.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(JOURNAL_NAME + '.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(f"H\t{VERSION}\t{self.manifest.root}\n")
+            for i in sorted(self.done_dirs):
+                f.write(f"D\t{self.manifest.relpath(i)}\n")
+            for i in sorted(self.done_files):
+                f.write(self._file_line('F', i))
+            for i in sorted(self.redo_files): # 重新复制前再次中断时也要知道它们不完整
+                f.write(self._file_line('B', i))
+        os.replace(tmp, self.path)
+        self._file = open(self.path, 'a', encoding='utf-8')
+
+    def close(self):
+        with self._lock:
+            if self._file is None:
+                return
+            try:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+            except OSError as e:
+                logger.warning(f"写入迁移日志失败: {e}")
+            self._file.close()
+            self._file = None
+
+    def discard(self):
+        '''迁移全部完成后删除日志'''
+        self.close()
+        try:
+            self.path.unlink(missing_ok=True)
+        except OSError as e:
+            logger.warning(f"无法删除迁移日志{self.path}: {e}")
+
+    # 以下方法会在复制线程中调用
+    def dir_done(self, i: int):
+        self._write(f"D\t{self.manifest.relpath(i)}\n")
+
+    def begin(self, i: int):
+        self._write(self._file_line('B', i))
+
+    def file_done(self, i: int):
+        self._write(self._file_line('F', i))
+
+    def _file_line(self, kind: str, i: int) -> str:
+        return f"{kind}\t{self.manifest.sizes[i]}\t{self.manifest.mtimes[i]}\t{self.manifest.relpath(i)}\n"
+
+    def _write(self, line: str):
+        with self._lock:
+            if self._file is None:
+                return
+            try:
+                self._file.write(line)
+                self._file.flush() # 只交给系统，不fsync，程序崩溃时也不会丢
+            except OSError as e:
+                logger.warning(f"写入迁移日志失败，之后不再记录: {e}")
+                self._file.close()
+                self._file = None
+
+    def _read(self) -> tuple[dict[str, tuple[int, int]], dict[str, tuple[int, int]], set[str]]:
+        '''
+        Returns:
+            tuple: (已完成的文件, 开始了但没完成的文件, 已创建的文件夹)，文件为 相对路径 -> (大小, 修改时间)
+        '''
+        finished, started, dirs = {}, {}, set()
+        try:
+            f = open(self.path, 'r', encoding='utf-8')
+        except FileNotFoundError:
+            return finished, started, dirs
+        except OSError as e:
+            logger.warning(f"无法读取迁移日志{self.path}: {e}")
+            return finished, started, dirs
+        with f:
+            header = f.readline().rstrip('\n').split('\t')
+            if header != ['H', VERSION, str(self.manifest.root)]:
+                logger.info("迁移日志与本次任务不符，重新开始迁移")
+                return finished, started, dirs
+            for line in f:
+                if not line.endswith('\n'): # 最后一行没写完就中断了
+                    break
+                fields = line.rstrip('\n').split('\t', 3)
+                try:
+                    if fields[0] == 'D':
+                        dirs.add(fields[1])
+                    elif fields[0] in ('B', 'F'):
+                        rel, record = fields[3], (int(fields[1]), int(fields[2]))
+                        if fields[0] == 'F':
+                            finished[rel] = record
+                            started.pop(rel, None)
+                        else:
+                            started[rel] = record
+                            finished.pop(rel, None)
+                except (IndexError, ValueError):
+                    logger.warning(f"已忽略迁移日志中无法识别的一行: {line!r}")
+        return finished, started, dirs
+
+    def _unchanged(self, i: int, size: int, mtime: int) -> bool:
+        '''源文件在上次迁移之后没有改动'''
+        return self.manifest.sizes[i] == size and self.manifest.mtimes[i] == mtime
+
+    def _verify(self, i: int) -> bool:
+        '''复制时最后才会写入修改时间，大小和修改时间都对上说明目标文件是完整的'''
+        try:
+            st = os.stat(self.dst_root / self.manifest.relpath(i))
+        except OSError:
+            return False
+        return st.st_size == self.manifest.sizes[i] and abs(st.st_mtime_ns - self.manifest.mtimes[i]) < MTIME_TOLERANCE_NS
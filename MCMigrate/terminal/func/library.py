@@ -0,0 +1,316 @@
+from dataclasses import dataclass, field
+from itertools import count
+from typing import Callable, ClassVar
+import logging
+
+# 设置日志
+logger = logging.getLogger(__name__)
+
+@dataclass(slots=True)
+class VersionRecord:
+    '''versions.json中单个版本的记录，字段与version.VersionParseResult保持一致'''
+    id: int
+    game_jar: str
+    name: str
+    game_path: str
+    version: str
+    mod_loader: str
+    is_indie: bool
+    launcher: str | None
+    extra: dict = field(default_factory=dict) # 未知字段原样保留，写回时不丢失
+
+    FIELDS: ClassVar[tuple[str, ...]] = ('game_jar', 'name', 'game_path', 'version', 'mod_loader', 'is_indie', 'launcher')
+
+    @classmethod
+    def from_dict(cls, id: int, data: dict) -> 'VersionRecord':
+        extra = {k: v for k, v in data.items() if k not in cls.FIELDS}
+        return cls(
+            id,
+            data.get('game_jar', ''), # 兼容0.0.4版本之前没有game_jar的格式
+            data.get('name', ''),
+            data.get('game_path', ''),
+            data.get('version', ''),
+            data.get('mod_loader', ''),
+            data.get('is_indie', False),
+            data.get('launcher', None),
+            extra
+        )
+
+    @staticmethod
+    def key_of(data: dict) -> tuple[str, str]:
+        '''
+        版本的唯一键
+        \n同一个jar可能同时存在隔离与非隔离两份（询问版本隔离时选了"不知道啊"），因此还需要game_path来区分
+        '''
+        return (data.get('game_jar', ''), data.get('game_path', ''))
+
+    @property
+    def key(self) -> tuple[str, str]:
+        return (self.game_jar, self.game_path)
+
+    def to_dict(self) -> dict:
+        return {
+            'game_jar': self.game_jar,
+            'name': self.name,
+            'game_path': self.game_path,
+            'version': self.version,
+            'mod_loader': self.mod_loader,
+            'is_indie': self.is_indie,
+            'launcher': self.launcher,
+            **self.extra
+        }
+
+@dataclass(slots=True)
+class GameRecord:
+    '''单个游戏文件夹（.minecraft）的记录'''
+    id: int
+    folder_name: str
+    folder_path: str
+    order: int # 显示顺序，越小越靠前
+    versions: dict[tuple[str, str], VersionRecord] = field(default_factory=dict) # 以VersionRecord.key为索引
+    by_jar: dict[str, list[VersionRecord]] = field(default_factory=dict) # 以game_jar为索引
+    extra: dict = field(default_factory=dict)
+    _view: dict | None = None # to_dict()的缓存，记录改变时清空
+
+    def add_version(self, record: VersionRecord):
+        self.versions[record.key] = record
+        self.by_jar.setdefault(record.game_jar, []).append(record)
+        self._view = None
+
+    def pop_version(self, key: tuple[str, str]) -> VersionRecord:
+        '''移除版本，找不到时抛出KeyError'''
+        record = self.versions.pop(key)
+        same_jar = self.by_jar[record.game_jar]
+        same_jar.remove(record) # 同一jar最多只有隔离/非隔离两份，不算线性扫描
+        if not same_jar:
+            del self.by_jar[record.game_jar]
+        self._view = None
+        return record
+
+    def to_dict(self) -> dict:
+        if self._view is None:
+            self._view = {
+                'folder_name': self.folder_name,
+                'folder_path': self.folder_path,
+                'versions': [v.to_dict() for v in self.versions.values()],
+                **self.extra
+            }
+        return self._view
+
+class Event:
+    '''GameLibrary变更通知的事件类型'''
+    LOADED = 'loaded' # 整个库被重新加载
+    CLEARED = 'cleared'
+    GAMES_CHANGED = 'games_changed' # 合并解析结果，可能同时有新增和更新的游戏文件夹
+    GAME_ADDED = 'game_added'
+    GAME_REMOVED = 'game_removed'
+    VERSIONS_CHANGED = 'versions_changed' # 某个游戏文件夹的版本增减
+
+class GameLibrary:
+    '''
+    versions.json的内存索引模型，也是整个程序里唯一的游戏库数据来源
+    \n以folder_path和game_jar建立字典索引，并为每个游戏文件夹和版本分配在本次运行中稳定的id
+    \n对外提供的dict视图是缓存过的，只有对应记录发生改变时才会重新生成
+    \n每次修改后都会通知通过add_listener()注册的监听函数，参数为(Event, 发生改变的GameRecord列表)
+    '''
+    def __init__(self, games: list[dict] = None):
+        self._ids = count(1)
+        self._games: dict[str, GameRecord] = {} # folder_path -> GameRecord
+        self._games_by_id: dict[int, GameRecord] = {}
+        self._versions_by_id: dict[int, tuple[GameRecord, VersionRecord]] = {}
+        self._front = 0 # 当前最靠前的顺序号
+        self._back = 0 # 下一个追加到最后面的顺序号
+        self._view: list[dict] | None = None
+        self._listeners: list[Callable[[str, list[GameRecord]], None]] = []
+        if games:
+            self.load(games)
+
+    def __len__(self) -> int:
+        return len(self._games)
+
+    def __contains__(self, folder_path: str) -> bool:
+        return folder_path in self._games
+
+    def load(self, games: list[dict], orders: list[int] = None):
+        '''
+        用versions.json的内容重建索引
+        Args:
+            games(list[dict]): versions.json格式的游戏文件夹列表
+            orders(list[int]): 各游戏文件夹保存下来的显示顺序，不传入则按列表顺序
+        Raises:
+            KeyError: 游戏文件夹条目缺少folder_path或versions字段（如0.0.4之前的旧格式）
+        '''
+        self._reset()
+        if orders is None:
+            orders = range(len(games))
+        for game, order in zip(games, orders):
+            self._insert_game(game, front=False, order=order)
+        self._notify(Event.LOADED)
+
+    def clear(self):
+        self._reset()
+        self._notify(Event.CLEARED)
+
+    # ========== 变更通知 ==========
+
+    def add_listener(self, func: Callable[[str, list[GameRecord]], None]):
+        '''
+        添加变更监听函数
+        注意！在监听对象被销毁的时候，请手动移除对应监听函数！
+        '''
+        self._listeners.append(func)
+
+    def remove_listener(self, func: Callable[[str, list[GameRecord]], None]):
+        if func in self._listeners:
+            self._listeners.remove(func)
+
+    def _notify(self, event: str, games: list[GameRecord] = None):
+        for func in tuple(self._listeners):
+            try:
+                func(event, games or [])
+            except Exception:
+                logger.exception(f"处理游戏库变更通知 {event} 时出错")
+
+    # ========== 查询 ==========
+
+    def games(self) -> list[dict]:
+        '''按显示顺序返回所有游戏文件夹的dict视图（不要直接修改返回的内容）'''
+        if self._view is None:
+            self._view = [g.to_dict() for g in sorted(self._games.values(), key=lambda g: g.order)]
+        return self._view
+
+    def records(self) -> list[GameRecord]:
+        return sorted(self._games.values(), key=lambda g: g.order)
+
+    def get_game(self, folder_path: str) -> GameRecord | None:
+        return self._games.get(folder_path)
+
+    def get_game_by_id(self, game_id: int) -> GameRecord | None:
+        return self._games_by_id.get(game_id)
+
+    def get_version_by_id(self, version_id: int) -> tuple[GameRecord, VersionRecord] | None:
+        return self._versions_by_id.get(version_id)
+
+    def get_version(self, folder_path: str, game_jar: str) -> VersionRecord | None:
+        '''根据game_jar获取版本，若同一jar有隔离与非隔离两份，返回先添加的那份'''
+        game = self._games.get(folder_path)
+        if game is None: return None
+        same_jar = game.by_jar.get(game_jar)
+        return same_jar[0] if same_jar else None
+
+    # ========== 修改 ==========
+
+    def add_game(self, game: dict, front: bool = False) -> GameRecord | None:
+        '''
+        添加新的游戏文件夹
+        Returns:
+            GameRecord|None: 添加后的记录，若该folder_path已存在则返回None
+        '''
+        if game['folder_path'] in self._games:
+            return None
+        record = self._insert_game(game, front)
+        self._notify(Event.GAME_ADDED, [record])
+        return record
+
+    def remove_game(self, folder_path: str) -> GameRecord:
+        '''移除游戏文件夹，找不到时抛出KeyError'''
+        record = self._games.pop(folder_path)
+        del self._games_by_id[record.id]
+        for v in record.versions.values():
+            self._versions_by_id.pop(v.id, None)
+        self._view = None
+        self._notify(Event.GAME_REMOVED, [record])
+        return record
+
+    def set_versions(self, folder_path: str, versions: list[dict]) -> GameRecord:
+        '''用新的版本列表替换该游戏文件夹的版本，未改变的版本沿用原来的id'''
+        record = self._set_versions(folder_path, versions)
+        self._notify(Event.VERSIONS_CHANGED, [record])
+        return record
+
+    def _set_versions(self, folder_path: str, versions: list[dict]) -> GameRecord:
+        record = self._games[folder_path]
+        old = record.versions
+        record.versions = {}
+        record.by_jar = {}
+        for data in versions:
+            prev = old.pop(VersionRecord.key_of(data), None)
+            version = VersionRecord.from_dict(prev.id if prev else next(self._ids), data)
+            record.add_version(version)
+            self._versions_by_id[version.id] = (record, version)
+        for v in old.values(): # 被移除的版本
+            self._versions_by_id.pop(v.id, None)
+        record._view = None
+        self._view = None
+        return record
+
+    def merge_games(self, games: dict | list[dict]) -> tuple[list[GameRecord], int]:
+        '''
+        合并解析结果：已有的游戏文件夹替换版本列表，新的游戏文件夹插到最前面（与update_versions_json的行为一致）
+        Returns:
+            tuple[list[GameRecord], int]: 发生改变的游戏文件夹记录，以及其中新增的游戏文件夹数量
+        '''
+        if isinstance(games, dict):
+            games = [games]
+        touched: list[GameRecord] = []
+        new_count = 0
+        for game in reversed(games): # 倒序插入最前面，保持新游戏文件夹之间原本的顺序
+            if game['folder_path'] in self._games:
+                touched.append(self._set_versions(game['folder_path'], game['versions']))
+            else:
+                touched.append(self._insert_game(game, front=True))
+                new_count += 1
+        self._notify(Event.GAMES_CHANGED, touched)
+        return touched, new_count
+
+    def add_version(self, folder_path: str, data: dict) -> VersionRecord | None:
+        '''
+        向游戏文件夹添加版本
+        Returns:
+            VersionRecord|None: 添加后的记录，若已存在相同版本则返回None
+        Raises:
+            KeyError: 游戏文件夹不存在
+        '''
+        record = self._games[folder_path]
+        if VersionRecord.key_of(data) in record.versions:
+            return None
+        version = VersionRecord.from_dict(next(self._ids), data)
+        record.add_version(version)
+        self._versions_by_id[version.id] = (record, version)
+        self._view = None
+        self._notify(Event.VERSIONS_CHANGED, [record])
+        return version
+
+    def remove_version(self, folder_path: str, key: tuple[str, str]) -> VersionRecord:
+        '''移除版本，游戏文件夹或版本不存在时抛出KeyError'''
+        record = self._games[folder_path]
+        version = record.pop_version(key)
+        self._versions_by_id.pop(version.id, None)
+        self._view = None
+        self._notify(Event.VERSIONS_CHANGED, [record])
+        return version
+
+    def _reset(self):
+        self._games.clear()
+        self._games_by_id.clear()
+        self._versions_by_id.clear()
+        self._front = self._back = 0
+        self._view = None
+
+    def _insert_game(self, game: dict, front: bool, order: int = None) -> GameRecord:
+        if order is not None: # 沿用保存下来的顺序
+            self._front = min(self._front, order)
+            self._back = max(self._back, order + 1)
+        elif front:
+            self._front -= 1
+            order = self._front
+        else:
+            order = self._back
+            self._back += 1
+        folder_path, versions = game['folder_path'], game['versions'] # 先取值，缺字段时不留下残缺的记录
+        extra = {k: v for k, v in game.items() if k not in ('folder_name', 'folder_path', 'versions')}
+        record = GameRecord(next(self._ids), game.get('folder_name', ''), folder_path, order, extra=extra)
+        self._games[folder_path] = record
+        self._games_by_id[record.id] = record
+        self._set_versions(folder_path, versions)
+        return record
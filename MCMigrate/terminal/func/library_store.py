@@ -0,0 +1,329 @@
+'''
+游戏库（versions.json内容）的持久化后端
+\n- JsonLibraryStore: 兼容原来的versions.json，修改会在后台线程合并延迟写入（先写临时文件再替换，避免写一半炸掉）
+\n- SQLiteLibraryStore: 可选的SQLite后端，每次修改只写入改动的那一行/那个游戏文件夹，并且全部放在事务里
+'''
+from pathlib import Path
+from typing import Callable
+from terminal.func.library import GameLibrary, GameRecord, VersionRecord
+import json, os, sqlite3, threading, logging
+
+# 设置日志
+logger = logging.getLogger(__name__)
+
+VERSIONS_JSON = Path('versions.json')
+LIBRARY_DB = Path('library.db')
+
+def read_versions_json(path: Path = VERSIONS_JSON) -> list[dict]:
+    '''
+    读取旧格式的versions.json
+    Raises:
+        TypeError: 文件内容不是列表
+        json.JSONDecodeError: 文件内容无法解析
+    '''
+    path = Path(path)
+    if not path.exists() or path.stat().st_size < 8: # 空文件检测
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        games = json.load(f)
+    if not isinstance(games, list):
+        logger.error("versions.json文件格式错误")
+        raise TypeError("versions.json文件格式错误")
+    return games
+
+def write_versions_json(games: list[dict], path: Path = VERSIONS_JSON):
+    '''原子地写入versions.json：先写同目录下的临时文件，再替换原文件'''
+    path = Path(path)
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(games, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def is_legacy_versions_json(games: list[dict]) -> bool:
+    '''是否为0.0.4之前的旧格式（所有版本直接放在列表里，没有按游戏文件夹分组）'''
+    return bool(games) and isinstance(games[0], dict) and 'versions' not in games[0] and isinstance(games[0].get('game_jar', None), str)
+
+def upgrade_versions_json(path: Path = VERSIONS_JSON) -> list[dict]:
+    '''
+    把旧格式的versions.json按游戏文件夹分组，升级为现在的格式并写回
+    Returns:
+        list[dict]: 升级后的内容
+    Raises:
+        TypeError: 文件内容不是列表
+        json.JSONDecodeError: 文件内容无法解析
+        KeyError: 版本条目缺少game_jar
+    '''
+    games: dict[str, dict] = {} # folder_path -> 游戏文件夹
+    for ver in read_versions_json(path):
+        jar = Path(ver['game_jar']) # <游戏文件夹>/.minecraft/versions/<版本>/<版本>.jar
+        folder_path = jar.parents[2].as_posix()
+        game = games.setdefault(folder_path, {'folder_name': jar.parents[3].name, 'folder_path': folder_path, 'versions': []})
+        game['versions'].append(ver)
+    upgraded = list(games.values())
+    write_versions_json(upgraded, path)
+    logger.info('已将versions.json升级为新版本格式')
+    return upgraded
+
+class LibraryStore:
+    '''
+    持久化后端的接口
+    \n由VersionsJsonManager在修改GameLibrary之后调用对应的方法，后端只需要写入发生改变的部分
+    '''
+    def __init__(self, library: GameLibrary):
+        self.library = library
+        self.on_error: Callable[[Exception], None] = None # 后台写入失败时的回调
+
+    def load(self):
+        '''从后端读取内容并重建library的索引'''
+        raise NotImplementedError
+
+    def games_changed(self, games: list[GameRecord]):
+        '''新增了这些游戏文件夹，或是它们的版本列表被整个替换'''
+        raise NotImplementedError
+
+    def game_removed(self, game: GameRecord):
+        raise NotImplementedError
+
+    def version_added(self, game: GameRecord, version: VersionRecord):
+        raise NotImplementedError
+
+    def version_removed(self, game: GameRecord, version: VersionRecord):
+        raise NotImplementedError
+
+    def cleared(self):
+        raise NotImplementedError
+
+    def flush(self):
+        '''把还没写入的改动立即写入'''
+        pass
+
+    def close(self):
+        self.flush()
+
+class JsonLibraryStore(LibraryStore):
+    '''
+    旧的versions.json后端
+    \n每次修改只记录下最新的内容快照，由后台计时器在FLUSH_DELAY秒后统一写入一次，连续的修改会被合并成一次写入
+    '''
+    FLUSH_DELAY = 0.5
+
+    def __init__(self, library: GameLibrary, path: Path = VERSIONS_JSON):
+        super().__init__(library)
+        self.path = path
+        self._pending: list[dict] | None = None # 等待写入的快照
+        self._timer: threading.Timer | None = None
+        self._state_lock = threading.Lock()
+        self._write_lock = threading.Lock() # 保证快照按顺序写入
+
+    def load(self):
+        self.library.load(read_versions_json(self.path))
+
+    def save(self):
+        '''记录当前快照，并安排一次延迟写入（需要在修改library的线程里调用）'''
+        with self._state_lock:
+            self._pending = self.library.games() # 视图里未改变的游戏文件夹dict是共用的，拍快照很便宜
+            if self._timer is None:
+                self._timer = threading.Timer(self.FLUSH_DELAY, self._flush_in_background)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        with self._write_lock:
+            with self._state_lock:
+                games, self._pending = self._pending, None
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+            if games is not None:
+                write_versions_json(games, self.path)
+                logger.info("保存 versions.json 文件")
+
+    def _flush_in_background(self):
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"保存 versions.json 失败: {e}")
+            if self.on_error:
+                self.on_error(e)
+
+    def games_changed(self, games: list[GameRecord]):
+        self.save()
+
+    def game_removed(self, game: GameRecord):
+        self.save()
+
+    def version_added(self, game: GameRecord, version: VersionRecord):
+        self.save()
+
+    def version_removed(self, game: GameRecord, version: VersionRecord):
+        self.save()
+
+    def cleared(self):
+        with self._write_lock:
+            with self._state_lock:
+                self._pending = None
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+            if self.path.exists():
+                logger.info('已删除versions.json文件')
+                self.path.unlink()
+
+class SQLiteLibraryStore(LibraryStore):
+    '''
+    SQLite后端
+    \n游戏文件夹和版本分表存储，并对game_jar建立索引；每次修改只在一个事务里写入改动的行
+    \n第一次使用时（数据库为空），会自动从versions.json导入
+    '''
+    SCHEMA = '''
+        CREATE TABLE IF NOT EXISTS games (
+            folder_path TEXT PRIMARY KEY,
+            folder_name TEXT NOT NULL,
+            sort_order INTEGER NOT NULL,
+            extra TEXT NOT NULL DEFAULT '{}'
+        );
+        CREATE TABLE IF NOT EXISTS versions (
+            folder_path TEXT NOT NULL REFERENCES games(folder_path) ON DELETE CASCADE,
+            game_jar TEXT NOT NULL,
+            game_path TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            name TEXT NOT NULL,
+            version TEXT NOT NULL,
+            mod_loader TEXT NOT NULL,
+            is_indie INTEGER NOT NULL,
+            launcher TEXT,
+            extra TEXT NOT NULL DEFAULT '{}',
+            PRIMARY KEY (folder_path, game_jar, game_path)
+        );
+        CREATE INDEX IF NOT EXISTS idx_games_order ON games(sort_order);
+        CREATE INDEX IF NOT EXISTS idx_versions_jar ON versions(game_jar);
+        CREATE INDEX IF NOT EXISTS idx_versions_position ON versions(folder_path, position);
+    '''
+
+    def __init__(self, library: GameLibrary, path: Path = LIBRARY_DB, legacy_json: Path = VERSIONS_JSON):
+        super().__init__(library)
+        self.path = path
+        self.legacy_json = legacy_json
+        self._lock = threading.Lock() # 连接允许跨线程使用，语句和事务需要串行执行
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        try:
+            self.conn.execute('PRAGMA journal_mode=WAL') # 写一半崩溃时，数据库仍保持在上一个完整事务的状态
+            self.conn.execute('PRAGMA synchronous=NORMAL')
+            self.conn.execute('PRAGMA foreign_keys=ON')
+            self.conn.executescript(self.SCHEMA)
+        except sqlite3.DatabaseError: # 文件损坏或被锁住，调用方会换用json后端
+            self.conn.close()
+            raise
+
+    def load(self):
+        with self._lock:
+            empty = self._is_empty()
+        if empty and self.legacy_json.exists():
+            self.import_json(self.legacy_json)
+            return
+
+        games: dict[str, dict] = {}
+        orders: list[int] = []
+        with self._lock:
+            for folder_path, folder_name, sort_order, extra in self.conn.execute(
+                'SELECT folder_path, folder_name, sort_order, extra FROM games ORDER BY sort_order'
+            ):
+                games[folder_path] = {'folder_name': folder_name, 'folder_path': folder_path, 'versions': [], **json.loads(extra)}
+                orders.append(sort_order)
+            for row in self.conn.execute(
+                'SELECT folder_path, game_jar, game_path, name, version, mod_loader, is_indie, launcher, extra FROM versions ORDER BY folder_path, position'
+            ):
+                folder_path, game_jar, game_path, name, ver, mod_loader, is_indie, launcher, extra = row
+                games[folder_path]['versions'].append({
+                    'game_jar': game_jar, 'name': name, 'game_path': game_path, 'version': ver,
+                    'mod_loader': mod_loader, 'is_indie': bool(is_indie), 'launcher': launcher, **json.loads(extra)
+                })
+        self.library.load(list(games.values()), orders)
+
+    def import_json(self, path: Path = VERSIONS_JSON):
+        '''
+        从旧格式的versions.json导入（会替换数据库里已有的内容）
+        Raises:
+            KeyError: versions.json是0.0.4之前的旧格式
+        '''
+        self.library.load(read_versions_json(path))
+        with self._lock, self.conn:
+            self.conn.execute('DELETE FROM games')
+            for game in self.library.records():
+                self._write_game(game)
+        logger.info(f'已从 {path} 导入 {len(self.library)} 个游戏文件夹')
+
+    def export_json(self, path: Path = VERSIONS_JSON):
+        '''导出为旧格式的versions.json'''
+        write_versions_json(self.library.games(), path)
+        logger.info(f'已导出至 {path}')
+
+    def games_changed(self, games: list[GameRecord]):
+        with self._lock, self.conn:
+            for game in games:
+                self._write_game(game)
+
+    def game_removed(self, game: GameRecord):
+        with self._lock, self.conn: # versions表的行会被级联删除
+            self.conn.execute('DELETE FROM games WHERE folder_path = ?', (game.folder_path,))
+
+    def version_added(self, game: GameRecord, version: VersionRecord):
+        with self._lock, self.conn:
+            position = self.conn.execute(
+                'SELECT COALESCE(MAX(position), -1) + 1 FROM versions WHERE folder_path = ?', (game.folder_path,)
+            ).fetchone()[0]
+            self.conn.execute(
+                'INSERT OR REPLACE INTO versions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                self._version_row(game, version, position)
+            )
+
+    def version_removed(self, game: GameRecord, version: VersionRecord):
+        with self._lock, self.conn:
+            self.conn.execute(
+                'DELETE FROM versions WHERE folder_path = ? AND game_jar = ? AND game_path = ?',
+                (game.folder_path, version.game_jar, version.game_path)
+            )
+
+    def cleared(self):
+        with self._lock, self.conn:
+            self.conn.execute('DELETE FROM games')
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+    def _is_empty(self) -> bool:
+        '''需要持有self._lock'''
+        return self.conn.execute('SELECT 1 FROM games LIMIT 1').fetchone() is None
+
+    def _write_game(self, game: GameRecord):
+        '''写入该游戏文件夹的行及其全部版本，需要持有self._lock并在事务内调用'''
+        self.conn.execute(
+            '''INSERT INTO games (folder_path, folder_name, sort_order, extra) VALUES (?, ?, ?, ?)
+               ON CONFLICT(folder_path) DO UPDATE SET folder_name = excluded.folder_name, sort_order = excluded.sort_order, extra = excluded.extra''',
+            (game.folder_path, game.folder_name, game.order, json.dumps(game.extra, ensure_ascii=False))
+        )
+        self.conn.execute('DELETE FROM versions WHERE folder_path = ?', (game.folder_path,))
+        self.conn.executemany(
+            'INSERT OR REPLACE INTO versions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            [self._version_row(game, v, i) for i, v in enumerate(game.versions.values())]
+        )
+
+    @staticmethod
+    def _version_row(game: GameRecord, version: VersionRecord, position: int) -> tuple:
+        return (
+            game.folder_path, version.game_jar, version.game_path, position, version.name, version.version,
+            version.mod_loader, int(version.is_indie), version.launcher, json.dumps(version.extra, ensure_ascii=False)
+        )
+
+def open_store(library: GameLibrary, backend: str = None) -> LibraryStore:
+    '''
+    根据config.yml中的library.backend创建持久化后端
+    Args:
+        backend(str): 'json'或'sqlite'，不传入则为json
+    '''
+    if backend == 'sqlite':
+        return SQLiteLibraryStore(library)
+    return JsonLibraryStore(library)
@@ -0,0 +1,162 @@
+'''
+迁移前的源文件清单
+\n整个源文件夹只用os.scandir遍历一次，之后的进度统计、增量判断、复制调度和复制后的校验都直接使用清单里的信息，不再重复访问源文件
+'''
+from array import array
+from pathlib import Path
+from typing import Callable, Iterator, NamedTuple
+import os, threading, logging
+
+# 设置日志
+logger = logging.getLogger(__name__)
+
+class FileMeta(NamedTuple):
+    '''源文件的元数据（和os.stat_result里对应字段同名）'''
+    st_size: int
+    st_mtime_ns: int
+    st_dev: int
+    st_ino: int
+
+class Manifest:
+    '''
+    文件清单，按列存储在array里（几十万个文件时也不会占太多内存）
+    \n每一项只保存自己的名字和父文件夹的下标，完整的相对路径按需拼接；文件夹一定排在它的内容之前
+    '''
+    DIR = 1
+    FILE = 0
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.names: list[str] = []
+        self.parents = array('l') # 父文件夹的下标，-1为根目录下的项
+        self.kinds = array('b')
+        self.sizes = array('q')
+        self.mtimes = array('q') # 纳秒
+        self.devs = array('Q')
+        self.inos = array('Q')
+        self.total_files = 0
+        self.total_bytes = 0
+        self._paths: dict[int, str] = {} # 文件夹相对路径的缓存
+
+    @classmethod
+    def build(cls, root: Path, accept: Callable[[str, os.DirEntry], bool] = None, abort_event: threading.Event = None) -> 'Manifest':
+        '''
+        遍历root生成清单
+        Args:
+            accept(Callable[[str, os.DirEntry], bool]): 参数为(相对路径, DirEntry)，返回False时跳过该项（文件夹则跳过整个子树）
+            abort_event(threading.Event): 终止信号，终止时返回已遍历的部分
+        '''
+        manifest = cls(root)
+        stack: list[tuple[str, int]] = [(str(root), -1)]
+        while stack:
+            if abort_event is not None and abort_event.is_set():
+                break
+            dir_path, parent = stack.pop()
+            prefix = manifest.relpath(parent) + '/' if parent >= 0 else ''
+            try:
+                with os.scandir(dir_path) as it:
+                    entries = list(it)
+            except OSError as e:
+                logger.warning(f"无法读取文件夹{dir_path}: {e}")
+                continue
+            subdirs = []
+            for entry in entries:
+                if accept is not None and not accept(prefix + entry.name, entry):
+                    continue
+                try:
+                    is_dir = entry.is_dir()
+                    st = entry.stat()
+                except OSError as e:
+                    logger.warning(f"无法读取{entry.path}: {e}")
+                    continue
+                index = manifest._append(entry.name, parent, is_dir, st)
+                if is_dir:
+                    subdirs.append((entry.path, index))
+            stack.extend(reversed(subdirs)) # 保持遍历顺序
+        return manifest
+
+    def _append(self, name: str, parent: int, is_dir: bool, st: os.stat_result) -> int:
+        self.names.append(name)
+        self.parents.append(parent)
+        self.kinds.append(self.DIR if is_dir else self.FILE)
+        size = 0 if is_dir else st.st_size
+        self.sizes.append(size)
+        self.mtimes.append(st.st_mtime_ns)
+        self.devs.append(st.st_dev)
+        self.inos.append(st.st_ino)
+        if not is_dir:
+            self.total_files += 1
+            self.total_bytes += size
+        return len(self.names) - 1
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def relpath(self, i: int) -> str:
+        '''以/分隔的相对路径'''
+        if i in self._paths:
+            return self._paths[i]
+        parent = self.parents[i]
+        path = self.names[i] if parent < 0 else self.relpath(parent) + '/' + self.names[i]
+        if self.kinds[i] == self.DIR:
+            self._paths[i] = path
+        return path
+
+    def top(self, i: int) -> str:
+        '''该项所属的顶层文件/文件夹名'''
+        while self.parents[i] >= 0:
+            i = self.parents[i]
+        return self.names[i]
+
+    def is_dir(self, i: int) -> bool:
+        return self.kinds[i] == self.DIR
+
+    def meta(self, i: int) -> FileMeta:
+        return FileMeta(self.sizes[i], self.mtimes[i], self.devs[i], self.inos[i])
+
+    def dirs(self, non_empty_only: bool = False) -> Iterator[int]:
+        '''
+        按遍历顺序（父文件夹在前）
+        Args:
+            non_empty_only(bool): 只返回下面有文件的文件夹（只迁移部分文件时，不在目标创建一堆空文件夹）
+        '''
+        if not non_empty_only:
+            return (i for i in range(len(self)) if self.kinds[i] == self.DIR)
+        used: set[int] = set()
+        for i in range(len(self)):
+            if self.kinds[i] == self.DIR: continue
+            parent = self.parents[i]
+            while parent >= 0 and parent not in used:
+                used.add(parent)
+                parent = self.parents[parent]
+        return (i for i in range(len(self)) if i in used)
+
+    def files(self, largest_first: bool = False) -> list[int]:
+        '''
+        Args:
+            largest_first(bool): 大文件排在前面，让耗时最长的文件最先开始复制，最后不会只剩一个大文件拖着
+        '''
+        files = [i for i in range(len(self)) if self.kinds[i] == self.FILE]
+        if largest_first:
+            files.sort(key=self.sizes.__getitem__, reverse=True)
+        return files
+
+    def verify(self, dst_root: Path, indices: Iterator[int]) -> list[list[str]]:
+        '''
+        复制后校验目标文件的大小
+        Args:
+            indices: 需要校验的文件下标（比如只校验实际复制过的文件）
+        Returns:
+            list[list[str]]: 校验失败的文件，格式与failed_files_copy相同
+        '''
+        failed = []
+        for i in indices:
+            path = Path(dst_root) / self.relpath(i)
+            try:
+                size = os.stat(path).st_size
+            except OSError as e:
+                failed.append([str(path), f"校验失败：{e}"])
+                continue
+            if size != self.sizes[i]:
+                failed.append([str(path), f"校验失败：大小不一致（{size}/{self.sizes[i]}）"])
+        return failed
@@ -0,0 +1,393 @@
+'''
+迁移任务的核心流程（扫描清单 → 同时下载模组和复制游戏文件 → 校验），不依赖Qt
+\n界面中由Terminal.TaskMigrateAbortable在QThread里运行，命令行（cli.py）中则在单独的线程里运行，主线程负责响应Ctrl+C
+'''
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable
+import os, threading, logging
+
+from utils import func
+from terminal.func import mod, config, filecopy, progress, manifest, pathfilter, journal, jobqueue
+
+# 设置日志
+logger = logging.getLogger(__name__)
+
+NOT_MOD_LOADER = ('optifine', 'release', 'snapshot', 'unknown')
+
+@dataclass(slots=True)
+class MigrateReport:
+    '''迁移结束后需要提醒用户的内容，level为'warning'或'error'（有文件迁移失败时）'''
+    title: str
+    level: str
+    content: str
+
+class Migration:
+    '''
+    单次迁移：把源版本的游戏文件和模组迁移到一个或多个目标版本
+    \n所有结果都记录在实例上（failed_*、bytes_*），run()结束后可以用report()或summary()取出
+    '''
+    MOD_WORKERS = 4 # 同时查询/下载的模组数，太多容易被Modrinth限流
+    def __init__(
+            self, source_dir: Path, target_dirs: list[Path], source_json: dict, target_jsons: list[dict],
+            on_progress: Callable[[progress.MigrateProgress], None] = None, on_notice: Callable[[str], None] = None,
+            disk_slots: jobqueue.DiskSlots = None, abort_event: threading.Event = None
+        ):
+        '''
+        Args:
+            source_json(dict): 原版本在versions.json里的dict表现
+            target_jsons(list[dict]): 目标版本在versions.json里的dict表现（与target_dirs一一对应），源文件只读取一次，同时写入所有目标
+            on_progress(Callable): 进度更新时调用，参数为progress.MigrateProgress，会在下载/复制线程中调用
+            on_notice(Callable): 需要告诉用户的提示（如从上次中断处继续）
+            disk_slots(jobqueue.DiskSlots): 多个任务共用，限制同时复制文件的任务数
+            abort_event(threading.Event): 下载与复制共用的终止信号，不传入则新建一个
+        '''
+        self.source_dir = Path(source_dir)
+        self.target_dirs = [Path(target_dir) for target_dir in target_dirs]
+        self.source_json = source_json
+        self.target_jsons = list(target_jsons)
+        self.on_notice = on_notice
+        self.disk_slots = disk_slots
+        self.abort_event = abort_event or threading.Event()
+
+        # 状态
+        self.is_calculating = True
+
+        # 进度（按字节统计）
+        self.progress = progress.ProgressMeter(on_progress)
+        self.manifest: manifest.Manifest = None
+
+        # 复制统计（配置在任务开始时取一次，迁移途中修改config.yml不影响这次任务）
+        self.settings = config.get_settings().migrate
+        self.copy_option = filecopy.CopyOption.parse(self.settings.file.copy_option)
+        self.compare_hash = self.settings.file.compare_hash
+        self.copy_method = filecopy.CopyMethod.parse(self.settings.file.method)
+        self.hardlink_dirs = set(self.settings.file.hardlink)
+        self.bytes_copied = 0
+        self.bytes_skipped = 0
+
+        # 错误实例
+        self.failed_files_copy = []
+        self.failed_mods_dl = []
+        self.failed_mods_not_adapt = []
+
+        # 迁移时会跳过的文件，无论过滤规则怎么写都不会迁移
+        self.exclude_files = [
+            source_json['name']+".json",
+            source_json['name']+".jar",
+            "launcher_profiles.json",
+            "PCL.ini",
+            "mods"
+        ]
+        # 根据config.yml中的过滤规则编译过滤器
+        self.path_filter = pathfilter.PathFilter.from_config(
+            self.settings.filter_rule, self.settings.excludes, self.settings.includes, self.settings.rules,
+            always_exclude=self.exclude_files
+        )
+
+    @property
+    def has_failures(self) -> bool:
+        return bool(self.failed_files_copy or self.failed_mods_dl or self.failed_mods_not_adapt)
+
+    def abort(self):
+        '''终止迁移'''
+        self.abort_event.set()
+
+    def scan(self) -> manifest.Manifest:
+        '''生成源文件清单（只遍历一次，之后的复制和校验都直接用它）'''
+        self.manifest = manifest.Manifest.build(self.source_dir, self.accept_path, self.abort_event)
+        return self.manifest
+
+    def mod_groups(self) -> dict[tuple[str, str], list[Path]]:
+        '''需要下载模组的目标，以(加载器, 游戏版本)分组，同组的目标只需要查询下载一次'''
+        groups: dict[tuple[str, str], list[Path]] = {}
+        if self.source_json['mod_loader'] in NOT_MOD_LOADER:
+            return groups
+        for target_dir, target_json in zip(self.target_dirs, self.target_jsons):
+            if target_json['mod_loader'] not in NOT_MOD_LOADER:
+                groups.setdefault((target_json['mod_loader'], target_json['version']), []).append(target_dir)
+        return groups
+
+    def run(self) -> bool:
+        '''
+        执行迁移
+        Returns:
+            bool: 是否完成，被终止时为False
+        Raises:
+            Exception: 下载或复制时出现的意外错误（单个文件/模组的失败记录在failed_*中，不会抛出）
+        '''
+        # 计算待处理任务数量（复制文件）
+        if self.abort_event.is_set():
+            logger.info('任务被终止（计算任务数阶段）')
+            return False
+        self.scan()
+        files_total, bytes_total = self.manifest.total_files, self.manifest.total_bytes
+
+        # 计算待处理任务数量（mod下载）
+        mod_list: list[str] = None
+        mod_groups = self.mod_groups()
+        if mod_groups:
+            mod_list = os.listdir(self.source_dir / "mods")
+        self.progress.set_totals(len(mod_list or []) * len(mod_groups), files_total, bytes_total)
+        logger.info(f"共需迁移 {files_total} 个文件（{progress.format_bytes(bytes_total)}）")
+        if self.abort_event.is_set():
+            logger.info('任务被终止（计算任务数阶段）')
+            return False
+        # 算完任务数量了，接下来就来干正事吧（
+        self.is_calculating = False
+        self.progress.set_phase(progress.Phase.RUNNING)
+
+        # 下载mod（网络）和迁移文件（磁盘）用的是不同的资源，所以两边同时进行，共用同一个终止信号
+        mod_thread, mod_error = None, []
+        if mod_list:
+            logger.info("下载mod中")
+            if not self.settings.keep_original_mods:
+                for target_dirs in mod_groups.values():
+                    # 继续上次中断的迁移时不能清空，不然dl.txt里记为已下载的模组就再也不会下载了
+                    if self.is_resuming(target_dirs):
+                        logger.info(f"继续上次未完成的模组下载，保留{'、'.join(str(target_dir / 'mods') for target_dir in target_dirs)}中已有的模组")
+                        continue
+                    for target_dir in target_dirs: func.clear_folder(target_dir / 'mods')
+            def run_download():
+                try:
+                    for (mod_loader, target_ver), target_dirs in mod_groups.items():
+                        label = f"{mod_loader}-{target_ver}" if len(mod_groups) > 1 else None
+                        self.download_mods_shared(self.source_dir / "mods", [target_dir / "mods" for target_dir in target_dirs], target_ver, mod_loader, mod_list, label)
+                        if self.abort_event.is_set(): return
+                    logger.info("mod下载完成")
+                except Exception as e:
+                    mod_error.append(e)
+            mod_thread = threading.Thread(target=run_download, name='MCMigrate-mods', daemon=True)
+            mod_thread.start()
+
+        # 迁移文件（等其他任务复制完再开始，期间模组照常下载）
+        acquired = self._acquire_disk_slot()
+        try:
+            if acquired:
+                logger.info("迁移游戏文件")
+                self.migrate_file(self.source_dir, self.target_dirs)
+        except BaseException:
+            self.abort_event.set() # 复制出错时让下载线程也尽快停下
+            raise
+        finally:
+            if acquired and self.disk_slots is not None:
+                self.disk_slots.release()
+            if mod_thread is not None:
+                mod_thread.join()
+        if mod_error:
+            raise mod_error[0]
+        if self.abort_event.is_set():
+            logger.info('任务被终止（迁移阶段）')
+            return False
+        logger.info("游戏文件迁移完成")
+        self.progress.set_phase(progress.Phase.DONE)
+        return True
+
+    def is_resuming(self, target_dirs: list[Path]) -> bool:
+        '''这些目标中有上次没完成的迁移（留有模组下载缓存或迁移日志）'''
+        return any(
+            mod.dl_cache_path(target_dir / 'mods').exists() or (target_dir / journal.JOURNAL_NAME).exists()
+            for target_dir in target_dirs
+        )
+
+    def _acquire_disk_slot(self) -> bool:
+        '''等待复制文件的名额，任务被终止时返回False'''
+        if self.disk_slots is None:
+            return True
+        while not self.disk_slots.acquire(timeout=0.2):
+            if self.abort_event.is_set():
+                return False
+        return True
+
+    def migrate_file(self, source_dir: Path, target_dirs: list[Path]):
+        '''
+        按run()中生成的清单复制游戏文件，文件在filecopy.CopyEngine的线程池里并行复制，每个文件复制完都会更新进度
+        \n有多个目标时，每个源文件只读取一次，同时写入所有目标
+        \n复制完成后，按清单校验实际复制过的文件和上次中断时没复制完的文件
+        \n复制进度记录在各目标文件夹的迁移日志中，中途终止或崩溃后再次迁移会跳过已完成的文件，全部成功后删除日志
+        '''
+        logger.info(f"复制{source_dir}至{'、'.join(map(str, target_dirs))}")
+        # 只有用户指定的文件夹才用硬链接
+        method_of = lambda top: filecopy.CopyMethod.HARDLINK if top in self.hardlink_dirs else None
+        with ExitStack() as stack:
+            journals = [stack.enter_context(journal.MigrateJournal(target_dir, self.manifest)) for target_dir in target_dirs]
+            if any(migrate_journal.resumed for migrate_journal in journals) and self.on_notice:
+                self.on_notice('检测到上次未完成的迁移，将从中断处继续')
+            with self.new_copy_engine() as engine:
+                # 只迁移部分文件（includes）时，遍历过程中经过的文件夹不一定有要迁移的文件，不创建空文件夹
+                engine.copy_manifest(self.manifest, target_dirs, method_of, skip_empty_dirs=not self.path_filter.default_include, journal=journals)
+        self.collect_copy_result(engine)
+        if engine.aborted:
+            return
+        for target_dir, migrate_journal in zip(target_dirs, journals):
+            # 上次中断时没复制完的文件也要校验，确保它们确实被重新复制了
+            indices = set(engine.copied_indices.get(target_dir, [])) | migrate_journal.redo_files
+            self.failed_files_copy.extend(self.manifest.verify(target_dir, sorted(indices)))
+        if not self.failed_files_copy: # 有失败的文件时保留日志，重试时只需处理失败的部分
+            for migrate_journal in journals: migrate_journal.discard()
+
+    def accept_path(self, rel_path: str, entry: os.DirEntry) -> bool:
+        '''生成清单时的过滤规则，被排除的文件夹会整个跳过'''
+        if '/' not in rel_path and (entry.name.startswith('.') or entry.name.startswith('$')): # 跳过顶层的隐藏文件
+            return False
+        return self.path_filter.accept(rel_path, entry)
+
+    def download_mods_shared(self, source_dir: Path, target_dirs: list[Path], target_ver: str, mod_loader: str, file_name_list: list[str], label: str = None):
+        '''
+        为加载器和游戏版本都相同的多个目标下载模组：只查询下载到第一个目标，再把下载到的模组复制给其他目标
+        '''
+        first_dir, other_dirs = target_dirs[0], target_dirs[1:]
+        first_dir.mkdir(parents=True, exist_ok=True)
+        # 保留的原有模组不复制给其他目标；没有保留时mods里只有这次迁移下载的模组（包括上次中断前下载的），全部复制
+        existing = set(os.listdir(first_dir)) if self.settings.keep_original_mods else set()
+        self.download_mods(source_dir, first_dir, target_ver, mod_loader, file_name_list, label)
+        if not other_dirs or self.abort_event.is_set():
+            return
+        downloaded = [name for name in os.listdir(first_dir) if name not in existing and (first_dir / name).is_file()]
+        with self.new_copy_engine(track_progress=False) as engine:
+            for target_dir in other_dirs:
+                target_dir.mkdir(parents=True, exist_ok=True)
+                for name in downloaded:
+                    engine.copy(first_dir / name, target_dir / name)
+        self.failed_files_copy.extend(engine.failed)
+
+    def download_mods(self, source_dir: Path, target_dir: Path, target_ver: str, mod_loader: str, file_name_list: list[str], label: str = None):
+        '''
+        Args:
+            label(str): 同时迁移到多个加载器/游戏版本时，写在失败记录前面用于区分
+        '''
+        # 缓存，记录已经下载完成的mod
+        dl_cache = mod.dl_cache_path(target_dir)
+        if not dl_cache.exists():
+            with open(dl_cache, 'w') as f:
+                logger.info("已创建缓存文件dl.txt")
+        with open(dl_cache, 'r') as f:
+            logger.info("读取缓存文件dl.txt")
+            file_name_list_done: list[str] = [line.strip() for line in f.readlines()]
+        failed_lock = threading.Lock()
+        prefix = f"[{label}] " if label else ''
+        not_adapted: list[str] = [] # 只记录这一组的，决定是否删除这一组的dl.txt
+
+        def download(old_file_name: str):
+            if self.abort_event.is_set():
+                return
+            logger.info(f"\n{old_file_name}")
+
+            # 检测是否已下载，有则跳过
+            if old_file_name in file_name_list_done:
+                logger.info(f"{old_file_name} 已下载")
+                self.progress.add_mod()
+                return
+
+            modrinth_result = mod.modrinth(target_ver, mod_loader, source_dir, old_file_name, target_dir)
+            # 尝试查找并下载
+            if not modrinth_result == mod.Result.SUCCESS: # 有下载失败的，具体分析
+                with failed_lock:
+                    if isinstance(modrinth_result, list): # 依赖下载失败的
+                        self.failed_mods_dl.append(f"{prefix}{old_file_name}的依赖：\n{"\n".join(modrinth_result)}")
+
+                    elif modrinth_result == mod.Result.NOT_ADAPTED: not_adapted.append(prefix + old_file_name) # 模组本体未适配版本的
+                    else: self.failed_mods_dl.append(prefix + old_file_name)
+
+            self.progress.add_mod()
+
+        # 请求大部分时间都在等网络，开几个线程同时查询和下载
+        with ThreadPoolExecutor(self.MOD_WORKERS, thread_name_prefix='MCMigrate-mod') as executor:
+            for _ in executor.map(download, file_name_list): pass
+        self.failed_mods_not_adapt.extend(not_adapted) # 汇总到整个任务的结果里
+        if self.abort_event.is_set():
+            return
+
+        # 结果统计
+        if len(not_adapted) != 0:
+            logger.info("\n以下模组暂未找到适配：")
+            for not_adapt_mod in not_adapted: logger.info(not_adapt_mod)
+        else:
+            logger.info("\n无不适配情况，全部模组已完成版本迁移！")
+            os.remove(dl_cache)
+
+    def copy_tree_with_abort(self, src: Path, dst: Path, exist_ok=True):
+        """多线程复制目录，支持中途终止"""
+        if self.abort_event.is_set():
+            return
+
+        dst.mkdir(parents=True, exist_ok=exist_ok)
+        with self.new_copy_engine() as engine:
+            engine.copy(src, dst)
+        self.collect_copy_result(engine)
+
+    def new_copy_engine(self, track_progress: bool = True) -> filecopy.CopyEngine:
+        '''
+        按照config.yml中migrate.file的设置创建复制引擎
+        Args:
+            track_progress(bool): 复制的文件是否计入迁移进度（清单以外的文件不计入）
+        '''
+        return filecopy.CopyEngine(
+            abort_event=self.abort_event, option=self.copy_option, compare_hash=self.compare_hash,
+            method=self.copy_method, on_file=self.progress.add_file if track_progress else None
+        )
+
+    def collect_copy_result(self, engine: filecopy.CopyEngine):
+        self.failed_files_copy.extend(engine.failed)
+        self.bytes_copied += engine.bytes_copied
+        self.bytes_skipped += engine.bytes_skipped
+        logger.info(
+            f"[{self.copy_option.value}] 复制 {engine.files_copied} 个文件（{engine.bytes_copied} 字节），"
+            f"跳过 {engine.files_skipped} 个文件（{engine.bytes_skipped} 字节），其中 {engine.bytes_linked} 字节通过reflink/硬链接完成"
+        )
+
+    # == 结果 ==
+
+    def report(self) -> MigrateReport | None:
+        '''整理需要提醒用户的内容，全部顺利完成时返回None'''
+        if not self.has_failures:
+            return None
+        report_content = ""
+        level = 'warning'
+        title = "还有些需要留意..."
+
+        # 模组未适配
+        if self.failed_mods_not_adapt != []:
+            if len(self.target_jsons) > 1: report_content += "以下模组在目标版本中没有适配：\n"
+            else: report_content += f"以下模组在 {self.target_jsons[0].get('mod_loader')}-{self.target_jsons[0].get('version')} 版本中没有适配：\n"
+            for file in self.failed_mods_not_adapt:
+                report_content += file + '\n'
+            report_content += '\n'
+
+        # 模组下载失败
+        if self.failed_mods_dl != []:
+            report_content += "以下模组下载失败：\n"
+            for file in self.failed_mods_dl:
+                report_content += file + '\n'
+            report_content += '\n'
+
+        # 文件迁移失败（这个部分问题就比较多了，就由说明具体错误
+        if self.failed_files_copy != []:
+            title = "遇到问题了..."
+            level = 'error'
+            report_content += "以下文件在迁移时出错：\n"
+            for file in self.failed_files_copy:
+                report_content += f"{file[0]}：{file[1]}\n"
+            report_content += '\n'
+        return MigrateReport(title, level, report_content)
+
+    def summary(self) -> dict:
+        '''可以直接写成json的迁移结果'''
+        p = self.progress.snapshot()
+        return {
+            'source': str(self.source_dir),
+            'targets': [str(target_dir) for target_dir in self.target_dirs],
+            'phase': p.phase,
+            'files_done': p.files_done,
+            'files_total': p.files_total,
+            'bytes_total': p.bytes_total,
+            'bytes_copied': self.bytes_copied,
+            'bytes_skipped': self.bytes_skipped,
+            'mods_done': p.mods_done,
+            'mods_total': p.mods_total,
+            'failed_files': [[str(path), str(reason)] for path, reason in self.failed_files_copy],
+            'failed_mods': list(self.failed_mods_dl),
+            'not_adapted_mods': list(self.failed_mods_not_adapt)
+        }
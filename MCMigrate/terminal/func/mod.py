@@ -1,7 +1,7 @@
 from typing import List
 from pathlib import Path
 from enum import Enum
-import requests, hashlib, logging, zipfile, json, re
+import requests, hashlib, logging, zipfile, json, re, os, threading
 
 # 设置日志
 logger = logging.getLogger(__name__)
@@ -16,6 +16,12 @@ if not logger.hasHandlers():
 HEADERS = {
     "Content-Type": "application/json"
 }
+# 模组会在多个线程中同时下载，dl.txt的追加写入需要加锁
+_dl_cache_lock = threading.Lock()
+
+def dl_cache_path(mods_dir: Path) -> Path:
+    '''记录已下载完成模组的缓存文件，放在mods文件夹旁边（清空mods时不会被一起删掉）'''
+    return Path(mods_dir).parent / 'dl.txt'
 
 class Result(Enum):
     SUCCESS = 1
@@ -54,14 +60,27 @@ def modrinth(target_version: str, mod_loader: str, source_dir: str, old_file_nam
             return Result.FAILED
 
 
-def modrinth_update(target_version: str, mod_loader: str, source_dir: str, old_file_name: str, target_dir: str) -> Result | list:
-    '''通过向modrinth api post模组jar文件的sha1值获取最新的适配模组'''
-
+def modrinth_resolve(target_version: str, mod_loader: str, mod_file_path: Path) -> dict | Result:
+    '''
+    只查询模组在目标版本中的适配版本，不下载（先按文件hash查询，查不到再按模组作者搜索）
+    Returns:
+        dict: modrinth api返回的版本信息
+        Result: 查询不到时的状态（不适配NOT_ADAPTED|失败FAILED）
+    '''
+    latest_version_json = modrinth_get_update(target_version, mod_loader, mod_file_path)
+    if isinstance(latest_version_json, dict):
+        return latest_version_json
+    logger.warning("[modrinth]无法通过原模组文件hash值获取适配版本, 尝试通过模组作者进行搜索")
+    return modrinth_search(Path(mod_file_path), mod_loader, target_version)
+
+def modrinth_get_update(target_version: str, mod_loader: str, mod_file_path: Path) -> dict | Result:
+    '''通过向modrinth api post模组jar文件的sha1值获取最新的适配模组版本信息'''
     request_body = {
         "loaders": [mod_loader],
         "game_versions": [target_version]
     }
-    old_version_file_hash = get_file_hash(f"{source_dir / old_file_name}")
+    old_file_name = Path(mod_file_path).name
+    old_version_file_hash = get_file_hash(f"{mod_file_path}")
     logger.info(f"{old_file_name}: {old_version_file_hash}")
     
     try:
@@ -73,7 +92,7 @@ def modrinth_update(target_version: str, mod_loader: str, source_dir: str, old_f
                 return Result.NOT_ADAPTED
             logger.warning("[modrinth]链接炸了或无适配版本")
             return Result.FAILED
-        latest_version_json = response.json()
+        return response.json()
 
     except TimeoutError:
         logger.warning("[modrinth]加载时间过长")
@@ -83,6 +102,12 @@ def modrinth_update(target_version: str, mod_loader: str, source_dir: str, old_f
         logger.warning(f"[modrinth]{old_file_name} 没有适配 {target_version}")
         return Result.FAILED
 
+def modrinth_update(target_version: str, mod_loader: str, source_dir: str, old_file_name: str, target_dir: str) -> Result | list:
+    '''通过向modrinth api post模组jar文件的sha1值获取最新的适配模组并下载'''
+    latest_version_json = modrinth_get_update(target_version, mod_loader, source_dir / old_file_name)
+    if not isinstance(latest_version_json, dict):
+        return latest_version_json
+
     # 下载模组依赖
     failed_dps = modrinth_dl_dependencies(latest_version_json, mod_loader, target_version, target_dir)
 
@@ -317,17 +342,23 @@ def download_mod(old_file_name, target_dir, download_url, file_name):
     Args:
         old_file_name: 用于写入已下载模组的缓存
     """
-    # 下载模组
+    # 下载模组（先写到临时文件，两个模组同时下载同一个依赖时也不会写坏）
     response = requests.get(download_url, stream=True, timeout=(30, 30))
     response.raise_for_status() # 检查请求是否成功
-    with open(f"{target_dir / file_name}", 'wb') as file:
-        for chunk in response.iter_content(chunk_size=8192):
-            if chunk: # 过滤掉 keep-alive 结束块
-                file.write(chunk)
+    part_path = f"{target_dir / file_name}.{threading.get_ident()}.part"
+    try:
+        with open(part_path, 'wb') as file:
+            for chunk in response.iter_content(chunk_size=8192):
+                if chunk: # 过滤掉 keep-alive 结束块
+                    file.write(chunk)
+        os.replace(part_path, target_dir / file_name)
+    except BaseException:
+        if os.path.exists(part_path): os.remove(part_path)
+        raise
     logger.info(f"{file_name} 下载完成!")
 
     # 写入缓存
-    with open(f"{target_dir}dl.txt", "a") as f: f.write(f"{old_file_name}\n")
+    with _dl_cache_lock, open(dl_cache_path(target_dir), "a") as f: f.write(f"{old_file_name}\n")
 
 def get_file_hash(file_path, algorithm='sha1'):
     hash_func = getattr(hashlib, algorithm)()
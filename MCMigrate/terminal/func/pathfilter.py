@@ -0,0 +1,228 @@
+'''
+迁移文件的过滤规则
+\n规则写法与.gitignore基本相同，编译一次后在遍历源文件夹时逐项判断，被排除的文件夹会连同整个子树一起跳过
+\n- 空行和#开头的行会被忽略
+\n- 以!开头为包含规则，否则为排除规则；后面的规则优先
+\n- 以/开头，或中间带/的规则只匹配相对于游戏文件夹的路径（如 /config/xaero/cache），否则匹配任意层级的名字
+\n- 以/结尾的规则只匹配文件夹
+\n- 支持 * ? [abc] 和 **（匹配任意层文件夹）
+\n- 规则后面可以接条件（空格分隔，只对文件生效）：size>500M, size<1K, age>30d, age<12h（修改时间距今）
+'''
+from dataclasses import dataclass
+from typing import Callable
+import os, re, time, logging
+
+# 设置日志
+logger = logging.getLogger(__name__)
+
+_SIZE_UNITS = {'': 1, 'B': 1, 'K': 1 << 10, 'KB': 1 << 10, 'M': 1 << 20, 'MB': 1 << 20, 'G': 1 << 30, 'GB': 1 << 30}
+_AGE_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+_PREDICATE_RE = re.compile(r'^(size|age)([<>])(\d+(?:\.\d+)?)([a-zA-Z]*)$')
+
+@dataclass(slots=True)
+class Rule:
+    '''编译后的单条规则'''
+    text: str
+    regex: re.Pattern
+    include: bool
+    dir_only: bool
+    anchored: bool
+    segments: list[str] | None # 锚定规则按/拆分后的各段，用于判断文件夹下面是否可能有匹配项
+    predicates: list[Callable[[os.stat_result, float], bool]]
+
+    def matches(self, rel_path: str, is_dir: bool, st: os.stat_result | None, now: float) -> bool:
+        if self.dir_only and not is_dir:
+            return False
+        if self.predicates:
+            if is_dir or st is None: # 条件只对文件生效
+                return False
+            if not all(p(st, now) for p in self.predicates):
+                return False
+        return self.regex.match(rel_path) is not None
+
+    def may_match_under(self, rel_dir: str) -> bool:
+        '''该文件夹下面是否可能有项匹配这条规则（锚定规则才能判断，其他规则一律视为可能）'''
+        if not self.anchored or self.segments is None:
+            return True
+        for dir_seg, seg in zip(rel_dir.split('/'), self.segments):
+            if seg == '**':
+                return True
+            if not re.fullmatch(glob_to_regex(seg), dir_seg):
+                return False
+        return len(rel_dir.split('/')) < len(self.segments) or '**' in self.segments
+
+def glob_to_regex(pattern: str) -> str:
+    '''把gitignore风格的通配符转成正则（不含首尾锚定）'''
+    i, n = 0, len(pattern)
+    out = []
+    while i < n:
+        c = pattern[i]
+        if c == '*':
+            if pattern.startswith('**', i):
+                if pattern.startswith('**/', i): # **/ 匹配零或多层文件夹
+                    out.append('(?:.*/)?')
+                    i += 3
+                else:
+                    out.append('.*')
+                    i += 2
+                continue
+            out.append('[^/]*')
+        elif c == '?':
+            out.append('[^/]')
+        elif c == '[':
+            j = pattern.find(']', i + 1)
+            if j == -1:
+                out.append(re.escape(c))
+            else:
+                body = pattern[i + 1:j]
+                if body.startswith('!'): body = '^' + body[1:]
+                out.append('[' + body.replace('\\', '\\\\') + ']')
+                i = j
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return ''.join(out)
+
+def _parse_predicate(text: str) -> Callable[[os.stat_result, float], bool]:
+    m = _PREDICATE_RE.match(text)
+    if not m:
+        raise ValueError(f'无法识别的条件: {text}')
+    kind, op, num, unit = m.groups()
+    if kind == 'size':
+        if unit.upper() not in _SIZE_UNITS: raise ValueError(f'无法识别的大小单位: {unit}')
+        limit = float(num) * _SIZE_UNITS[unit.upper()]
+        if op == '>': return lambda st, now: st.st_size > limit
+        return lambda st, now: st.st_size < limit
+    if (unit or 'd') not in _AGE_UNITS: raise ValueError(f'无法识别的时间单位: {unit}')
+    limit = float(num) * _AGE_UNITS[unit or 'd']
+    if op == '>': return lambda st, now: now - st.st_mtime > limit
+    return lambda st, now: now - st.st_mtime < limit
+
+def compile_rule(text: str, include: bool = None) -> Rule | None:
+    '''
+    编译单条规则，空行和注释返回None
+    Args:
+        include(bool): 强制指定为包含/排除规则（用于includes列表），不传入则按有没有!判断
+    Raises:
+        ValueError: 规则写法有误
+    '''
+    text = text.strip()
+    if not text or text.startswith('#'):
+        return None
+    pattern, *predicate_texts = text.split()
+    is_include = False
+    if pattern.startswith('!'):
+        is_include, pattern = True, pattern[1:]
+    if include is not None:
+        is_include = include
+    dir_only = pattern.endswith('/')
+    pattern = pattern.rstrip('/')
+    anchored = '/' in pattern
+    pattern = pattern.lstrip('/')
+    if not pattern:
+        raise ValueError(f'空的规则: {text}')
+
+    body = glob_to_regex(pattern)
+    if anchored:
+        regex = re.compile(f'^{body}$')
+        segments = pattern.split('/')
+    else: # 任意层级
+        regex = re.compile(f'^(?:.*/)?{body}$')
+        segments = None
+    return Rule(text, regex, is_include, dir_only, anchored, segments, [_parse_predicate(p) for p in predicate_texts])
+
+def literal_rule(rel_path: str, include: bool = False) -> Rule:
+    '''按原样匹配游戏文件夹下的某个路径（名字里可以有空格和通配符字符）'''
+    rel_path = rel_path.strip('/')
+    return Rule('/' + rel_path, re.compile(f'^{re.escape(rel_path)}$'), include, False, True, rel_path.split('/'), [])
+
+class PathFilter:
+    '''
+    编译后的过滤器
+    \n遍历时文件夹一定先于其内容被判断，被包含的文件夹下的内容默认也会被包含（除非有规则另外排除）
+    '''
+    def __init__(self, rules: list[Rule], default_include: bool = True):
+        self.rules = rules
+        self.default_include = default_include
+        self._reversed = rules[::-1] # 后面的规则优先，倒序找第一条匹配的
+        self._has_include = any(r.include for r in rules)
+        self._needs_stat = any(r.predicates for r in rules)
+        self._dir_state: dict[str, bool] = {} # 已判断过的文件夹是否被明确包含
+        self._now = time.time()
+
+    @classmethod
+    def compile(cls, lines: list[str], default_include: bool = True, include: bool = None) -> 'PathFilter':
+        '''编译规则列表，写法有误的规则会被跳过并记录日志'''
+        return cls(cls._compile_lines(lines, include), default_include)
+
+    @staticmethod
+    def _compile_lines(lines: list[str], include: bool = None) -> list[Rule]:
+        rules = []
+        for line in lines or []:
+            try:
+                rule = compile_rule(str(line), include)
+            except (ValueError, re.error) as e:
+                logger.warning(f'已忽略过滤规则 "{line}": {e}')
+                continue
+            if rule: rules.append(rule)
+        return rules
+
+    @classmethod
+    def from_config(cls, filter_rule: str, excludes: list[str], includes: list[str], rules: list[str], always_exclude: list[str] = ()) -> 'PathFilter':
+        '''
+        由config.yml的migrate部分生成过滤器
+        Args:
+            filter_rule(str): excludes（默认全部迁移，排除excludes中的项）或includes（只迁移includes中的项）
+            excludes(list[str]): 不带通配符和/的旧写法（如 logs）只匹配游戏文件夹下的顶层项，与之前的行为一致
+            rules(list[str]): 额外的gitignore风格规则，在前两者之后生效
+            always_exclude(list[str]): 无论怎么配置都要排除的顶层项（如版本自己的jar和json），优先级最高
+        '''
+        if filter_rule == 'includes':
+            result = cls._compile_lines(includes, include=True)
+            default_include = False
+        else:
+            result = []
+            for name in excludes or []:
+                name = str(name)
+                if re.search(r'[/*?\[!#]', name): # 新写法
+                    result += cls._compile_lines([name])
+                else: # 旧写法只匹配顶层
+                    result.append(literal_rule(name))
+            default_include = True
+        result += cls._compile_lines(rules)
+        result += [literal_rule(name) for name in always_exclude]
+        return cls(result, default_include)
+
+    def match(self, rel_path: str, is_dir: bool, st: os.stat_result = None) -> bool | None:
+        '''返回最后一条匹配规则的结果，没有规则匹配时返回None'''
+        for rule in self._reversed:
+            if rule.matches(rel_path, is_dir, st, self._now):
+                return rule.include
+        return None
+
+    def accept(self, rel_path: str, entry: os.DirEntry) -> bool:
+        '''
+        遍历时的判断函数（可直接作为manifest.Manifest.build()的accept参数）
+        \n文件夹返回False时，整个子树都不会再遍历
+        '''
+        is_dir = entry.is_dir()
+        st = None
+        if not is_dir and self._needs_stat:
+            try:
+                st = entry.stat()
+            except OSError:
+                pass
+        parent = rel_path.rpartition('/')[0]
+        inherited = self._dir_state.get(parent, self.default_include) if parent else self.default_include
+        result = self.match(rel_path, is_dir, st)
+        included = inherited if result is None else result
+
+        if not is_dir:
+            return included
+        self._dir_state[rel_path] = included
+        if included:
+            return True
+        # 没被包含的文件夹：如果下面还可能有被包含的项，就继续往下找，否则整个跳过
+        if result is False: # 被明确排除的文件夹，和gitignore一样，不会再去找里面的包含规则
+            return False
+        return self._has_include and any(r.include and r.may_match_under(rel_path) for r in self.rules)
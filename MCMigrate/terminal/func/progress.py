@@ -0,0 +1,140 @@
+'''
+迁移进度的统计
+\n迁移前先扫描出各阶段的文件数和字节数，之后按字节计算进度、速度和剩余时间，不依赖Qt
+'''
+from dataclasses import dataclass
+from typing import Callable
+import threading, time
+
+class Phase:
+    '''迁移阶段'''
+    SCANNING = 'scanning' # 计算任务量
+    RUNNING = 'running' # 下载模组和复制游戏文件同时进行，各自的进度看mod_finished和file_finished
+    DONE = 'done'
+
+@dataclass(slots=True)
+class MigrateProgress:
+    '''迁移进度的快照，由TaskMigrateAbortable.progress_updated发出'''
+    phase: str
+    mods_done: int
+    mods_total: int
+    files_done: int
+    files_total: int
+    bytes_done: int
+    bytes_total: int
+    speed: float # 最近的复制速度，字节/秒
+    eta: float | None # 剩余秒数，还算不出来时为None
+
+    @property
+    def mod_percent(self) -> float:
+        return self.mods_done / self.mods_total if self.mods_total > 0 else 1.0
+
+    @property
+    def mod_finished(self) -> bool:
+        return self.phase == Phase.DONE or self.mods_done >= self.mods_total
+
+    @property
+    def file_finished(self) -> bool:
+        return self.phase == Phase.DONE or self.files_done >= self.files_total
+
+    @property
+    def file_percent(self) -> float:
+        if self.bytes_total > 0:
+            return min(self.bytes_done / self.bytes_total, 1.0)
+        return self.files_done / self.files_total if self.files_total > 0 else 1.0
+
+    @property
+    def overall(self) -> float:
+        '''整体进度，模组和文件按各自的数量分配权重'''
+        if self.phase == Phase.SCANNING: return 0.0
+        if self.phase == Phase.DONE: return 1.0
+        total = self.mods_total + self.files_total
+        if total <= 0: return 1.0
+        weight = self.mods_total / total
+        return self.mod_percent * weight + self.file_percent * (1 - weight)
+
+class ProgressMeter:
+    '''
+    线程安全的进度计数，可以在复制线程中直接调用
+    \n速度取最近几次采样的指数滑动平均，emit最多每INTERVAL秒调用一次（阶段切换时会立即调用）
+    '''
+    INTERVAL = 0.2
+    SMOOTHING = 0.3 # 新采样的权重
+
+    def __init__(self, emit: Callable[[MigrateProgress], None] = None):
+        self.emit = emit
+        self.phase = Phase.SCANNING
+        self.mods_done = self.mods_total = 0
+        self.files_done = self.files_total = 0
+        self.bytes_done = self.bytes_total = 0
+        self.speed = 0.0
+        self._bytes_copied = 0 # 实际复制的字节数，跳过的文件不算进速度里
+        self._sample_time = time.monotonic()
+        self._sample_bytes = 0
+        self._last_emit = 0.0
+        self._lock = threading.Lock()
+
+    def set_totals(self, mods_total: int, files_total: int, bytes_total: int):
+        with self._lock:
+            self.mods_total, self.files_total, self.bytes_total = mods_total, files_total, bytes_total
+
+    def set_phase(self, phase: str):
+        with self._lock:
+            self.phase = phase
+            self._sample_time = time.monotonic()
+            self._sample_bytes = self._bytes_copied
+        self._emit(force=True)
+
+    def add_mod(self):
+        with self._lock:
+            self.mods_done += 1
+        self._emit()
+
+    def add_file(self, size: int, copied: bool = True):
+        '''
+        Args:
+            size(int): 文件大小
+            copied(bool): 是否真的复制了数据（被跳过的文件只算进度，不算速度）
+        '''
+        with self._lock:
+            self.files_done += 1
+            self.bytes_done += size
+            if copied: self._bytes_copied += size
+        self._emit()
+
+    def snapshot(self) -> MigrateProgress:
+        with self._lock:
+            eta = None
+            if self.speed > 0:
+                eta = max(self.bytes_total - self.bytes_done, 0) / self.speed
+            return MigrateProgress(
+                self.phase, self.mods_done, self.mods_total, self.files_done, self.files_total,
+                self.bytes_done, self.bytes_total, self.speed, eta
+            )
+
+    def _emit(self, force: bool = False):
+        now = time.monotonic()
+        with self._lock:
+            if not force and now - self._last_emit < self.INTERVAL:
+                return
+            self._last_emit = now
+            elapsed = now - self._sample_time
+            if elapsed > 0 and self.phase == Phase.RUNNING:
+                instant = (self._bytes_copied - self._sample_bytes) / elapsed
+                self.speed = instant if self.speed == 0 else self.SMOOTHING * instant + (1 - self.SMOOTHING) * self.speed
+                self._sample_time, self._sample_bytes = now, self._bytes_copied
+        if self.emit:
+            self.emit(self.snapshot())
+
+def format_bytes(n: float) -> str:
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if abs(n) < 1024:
+            return f'{n:.1f} {unit}' if unit != 'B' else f'{int(n)} B'
+        n /= 1024
+    return f'{n:.1f} TB'
+
+def format_eta(seconds: float | None) -> str:
+    if seconds is None: return '--:--'
+    seconds = int(seconds)
+    h, m, s = seconds // 3600, seconds // 60 % 60, seconds % 60
+    return f'{h}:{m:02d}:{s:02d}' if h else f'{m:02d}:{s:02d}'
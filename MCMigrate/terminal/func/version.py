@@ -1,8 +1,10 @@
 from pathlib import Path
-from typing import List
+from typing import Any, Callable, List
 from dataclasses import dataclass, asdict
-import json, re, zipfile, os, winreg
+from contextlib import contextmanager
+import json, re, zipfile, os, threading
 import logging, MCException
+from terminal.func import library_store
 
 # 设置日志
 logging.basicConfig(level=logging.INFO)
@@ -50,8 +52,166 @@ class VersionParseResult:
     def to_dict(self):
         return asdict(self)
 
+class ManifestCache:
+    '''
+    版本json和jar包内version.json的解析缓存，以(路径, mtime, 文件大小)作为有效性判断
+    \n很多模组版本都inheritsFrom同一个原版版本，有了缓存，父版本的json或jar只需要读取一次就能给所有继承它的版本使用
+    \n注意！返回的内容是共用的，不要修改！
+    '''
+    def __init__(self, persist_path: Path = None):
+        '''
+        Args:
+            persist_path(Path): 持久化缓存文件的路径，不传入则只在内存中缓存。
+                只有jar包内的version.json会被持久化（解压jar才是最慢的部分，版本json本体又太大了）
+        '''
+        self.persist_path = persist_path
+        self._entries: dict[tuple[str, str], tuple[int, int, Any]] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.hits = 0
+        self.misses = 0
+        if persist_path:
+            self._load_persisted()
+
+    def load_json(self, path: Path, st: os.stat_result = None) -> Any:
+        '''
+        读取并解析json文件
+        Args:
+            st(os.stat_result): 已经拿到的stat信息（如FolderSnapshot.stat()），不传入则重新stat
+        Raises:
+            OSError: 文件无法读取
+            json.JSONDecodeError: 文件内容无法解析
+        '''
+        def load():
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        return self._get('json', path, load, st)
+
+    def load_jar_version(self, jar_path: Path, st: os.stat_result = None) -> dict:
+        '''
+        读取jar包内的version.json
+        Raises:
+            OSError | zipfile.BadZipFile: jar包无法读取
+            KeyError: jar包内没有version.json
+        '''
+        def load():
+            with zipfile.ZipFile(jar_path, 'r') as jar_file:
+                logger.info(f"解析版本jar包 {Path(jar_path).name}")
+                with jar_file.open('version.json', 'r') as json_file:
+                    return json.load(json_file)
+        return self._get('jar', jar_path, load, st)
+
+    def _get(self, kind: str, path: Path, load: Callable[[], Any], st: os.stat_result = None) -> Any:
+        key = (kind, Path(path).as_posix())
+        st = st or os.stat(path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] == st.st_mtime_ns and entry[1] == st.st_size:
+                self.hits += 1
+                return entry[2]
+        value = load() # 读取失败会直接抛出，不会缓存失败结果
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = (st.st_mtime_ns, st.st_size, value)
+            if kind == 'jar': self._dirty = True
+        return value
+
+    def _load_persisted(self):
+        try:
+            with open(self.persist_path, 'r', encoding='utf-8') as f:
+                for path, (mtime, size, value) in json.load(f).get('jar', {}).items():
+                    self._entries[('jar', path)] = (mtime, size, value)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, TypeError, AttributeError) as e: # 缓存文件坏了就当作没有
+            logger.warning(f"读取版本缓存失败，已忽略: {e}")
+
+    def save(self):
+        '''写入持久化缓存文件（只在有新的jar缓存时写入）'''
+        if not self.persist_path or not self._dirty:
+            return
+        with self._lock:
+            jars = {path: list(entry) for (kind, path), entry in self._entries.items() if kind == 'jar'}
+            self._dirty = False
+        tmp_path = self.persist_path.with_name(self.persist_path.name + '.tmp')
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'jar': jars}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.persist_path)
+        except OSError as e:
+            logger.warning(f"保存版本缓存失败: {e}")
+
+@dataclass
+class FolderSnapshot:
+    '''
+    单个文件夹的os.scandir快照，一次目录枚举得到的DirEntry会被所有检测共用
+    \nDirEntry自带的类型信息（以及Windows上的stat信息）都是缓存的，不会再单独访问文件系统
+    '''
+    path: Path
+    entries: dict[str, os.DirEntry]
+
+    @classmethod
+    def scan(cls, path: Path) -> 'FolderSnapshot | None':
+        '''枚举文件夹，文件夹不存在或无法读取时返回None'''
+        try:
+            with os.scandir(path) as it:
+                return cls(Path(path), {entry.name: entry for entry in it})
+        except (FileNotFoundError, NotADirectoryError, PermissionError):
+            return None
+
+    def files(self, suffix: str) -> list[Path]:
+        '''按枚举顺序返回该后缀的文件（相当于glob('*' + suffix)）'''
+        return [self.path / name for name, entry in self.entries.items() if name.endswith(suffix) and entry.is_file()]
+
+    def dirs(self) -> list[Path]:
+        return [self.path / name for name, entry in self.entries.items() if entry.is_dir()]
+
+    def is_file(self, name: str) -> bool:
+        entry = self.entries.get(name)
+        return entry is not None and entry.is_file()
+
+    def is_dir(self, name: str) -> bool:
+        entry = self.entries.get(name)
+        return entry is not None and entry.is_dir()
+
+    def stat(self, name: str) -> os.stat_result:
+        return self.entries[name].stat()
+
+_persistent_cache: ManifestCache | None = None
+_scan_cache: ManifestCache | None = None
+_scan_depth = 0
+_scan_lock = threading.Lock()
+
+def enable_persistent_cache(path: Path = Path('manifest_cache.json')):
+    '''启用跨次扫描（以及跨运行）的版本清单缓存'''
+    global _persistent_cache
+    _persistent_cache = ManifestCache(Path(path))
+
+@contextmanager
+def manifest_scope():
+    '''
+    一次扫描内共用的版本清单缓存，嵌套使用时沿用最外层的缓存
+    \n如果启用了持久化缓存，则直接使用持久化缓存，并在最外层结束时写入文件
+    '''
+    global _scan_cache, _scan_depth
+    with _scan_lock:
+        if _scan_depth == 0:
+            _scan_cache = _persistent_cache or ManifestCache()
+        _scan_depth += 1
+        cache = _scan_cache
+    try:
+        yield cache
+    finally:
+        with _scan_lock:
+            _scan_depth -= 1
+            if _scan_depth == 0:
+                logger.debug(f"版本清单缓存命中 {cache.hits} 次，读取 {cache.misses} 次")
+                _scan_cache = None
+                cache.save()
+
 def get_versions_from_pcl() -> list[PathParseResult]:
     '''从pcl导入mc版本, Returns与add_version()方法相同'''
+    import winreg # 只有Windows上有，命令行在其他系统上也要能导入这个模块
     # 获取PCL在注册表存储的.minecraft文件夹路径数据
     try:
         key = winreg.OpenKey(winreg.HKEY_CURRENT_USER, r'Software\PCL')
@@ -68,13 +228,14 @@ def get_versions_from_pcl() -> list[PathParseResult]:
     finally: winreg.CloseKey(winreg.HKEY_CURRENT_USER)
 
     parse_results: list[PathParseResult] = []
-    for p_info in value.split("|"):
-        # 拆分解析数据
-        p_name, p_path = p_info.split(">") # p_name是在PCL里，用户给.minecraft游戏文件夹取的自定义名称
-        folder_path = Path(p_path)
-        result = add_game(folder_path)
-        result.folder_name = p_name
-        parse_results.append(result)
+    with manifest_scope(): # 多个游戏文件夹之间共用版本清单缓存
+        for p_info in value.split("|"):
+            # 拆分解析数据
+            p_name, p_path = p_info.split(">") # p_name是在PCL里，用户给.minecraft游戏文件夹取的自定义名称
+            folder_path = Path(p_path)
+            result = add_game(folder_path)
+            result.folder_name = p_name
+            parse_results.append(result)
 
     return parse_results
 
@@ -96,7 +257,8 @@ def add_game(path: Path) -> PathParseResult:
 
         # 获取并打包解析结果
         game_name = path.parent.name
-        versions = parse_path(path)
+        with manifest_scope():
+            versions = parse_path(path)
         if isinstance(versions, tuple):
             return PathParseResult(True, game_name, path.as_posix(),  versions, [], [])
         return PathParseResult(False, game_name, path.as_posix(), *versions)
@@ -158,13 +320,11 @@ def parse_path(path: Path) -> tuple[dict] | list[list[dict], list[dict], list[di
     query_versions = []
     failed_versions = []
 
-    path_versions = Path(path / 'versions')
-    if path_versions.exists():
+    path_versions = FolderSnapshot.scan(path / 'versions')
+    if path_versions is not None:
         logger.info("找到versions文件夹，开始逐个解析版本")
-        version_items = list(path_versions.iterdir())
-        for p in version_items:
+        for p in path_versions.dirs():
             logger.info(p.name)
-            if not p.is_dir(): continue
             p_result = parse_single_ver_path(p)
             if isinstance(p_result, list): # 解析成功
                 done_versions.extend(p_result)
@@ -189,6 +349,7 @@ def parse_path(path: Path) -> tuple[dict] | list[list[dict], list[dict], list[di
 def parse_single_ver_path(p: Path) -> list[dict] | tuple[dict, dict] | None:
     '''
     解析单个版本的信息
+    \n整个版本文件夹只枚举一次（FolderSnapshot），后续的检测和parse_version_info()都用这份快照
     Returns:
         list[dict]: 解析得到的版本信息（？你问为什么是列表单个dict？因为不同启动器有不同的配置文件，版本隔离信息这一块会有不同，所以都加
         
@@ -196,26 +357,32 @@ def parse_single_ver_path(p: Path) -> list[dict] | tuple[dict, dict] | None:
 
         None: 解析失败炸了;w;
     '''
-    if p.is_dir() and list(p.glob('*.json')) != []: # 好耶！找到版本了耶！
+    snapshot = FolderSnapshot.scan(p)
+    if snapshot is not None and snapshot.files('.json') != []: # 好耶！找到版本了耶！
         # 但是在这之前，还要先判断有没有版本隔离
         # 很不幸，版本隔离是靠每次启动时，通过预填启动参数--gameDir，来确定游戏文件夹来确定的
         # 而预填启动参数，是交给启动器来进行的
         # 可是不同的启动器有不一样的版本隔离配置方法啊啊啊，这又得一个一个排除了
         results = []
         is_confirmed = False
-        for item in list(p.iterdir()):
+        for name, entry in snapshot.entries.items():
+            item = p / name
             logger.debug(item)
-            if item.is_dir() and item.name == "PCL" and Path.exists(item / "Setup.ini"): # PCL
+            if name == "PCL" and entry.is_dir(): # PCL
+                try:
+                    is_indie = is_indie_pcl(item)
+                except FileNotFoundError: # 没有Setup.ini，不算PCL的版本配置
+                    continue
                 logger.debug('PCL')
-                result = parse_version_info(p, "PCL2", is_indie_pcl(item))
+                result = parse_version_info(p, "PCL2", is_indie, snapshot)
                 if not result: return None # 检测到解析失败直接返回None
                 results.append(result)
                 is_confirmed = True
                                 
-            elif item.is_file() and item.name == "hmclversion.cfg": # HMCL
+            elif name == "hmclversion.cfg" and entry.is_file(): # HMCL
                 logger.debug('HMCL')
                 # 开了
-                result = parse_version_info(p, 'HMCL', is_indie_hmcl(item))
+                result = parse_version_info(p, 'HMCL', is_indie_hmcl(item), snapshot)
                 if not result: return None
                 results.append(result)
                 is_confirmed = True
@@ -225,12 +392,19 @@ def parse_single_ver_path(p: Path) -> list[dict] | tuple[dict, dict] | None:
         if is_confirmed: # 解析成功，直接返回结果
             return results
 
-        return (parse_version_info(p, None, True), parse_version_info(p, None, False)) # 无法判断版本隔离，返回tuple
+        return (parse_version_info(p, None, True, snapshot), parse_version_info(p, None, False, snapshot)) # 无法判断版本隔离，返回tuple
 
 def is_indie_pcl(pcl_folder) -> bool:
-    pcl_ini_file_name = 'Setup.ini'
-    if not Path(pcl_folder / pcl_ini_file_name).exists: pcl_ini_file_name = pcl_ini_file_name.lower() # Linux的大小写敏感可能报错，就加了这个（但是linux能跑pcl吗（？
-    with open(pcl_folder / pcl_ini_file_name, 'r', encoding='utf-8') as ini_file:
+    '''
+    读取PCL文件夹下的Setup.ini判断是否版本隔离
+    Raises:
+        FileNotFoundError: 没有Setup.ini
+    '''
+    try: # 直接尝试打开，不单独检测文件是否存在
+        ini_file = open(pcl_folder / 'Setup.ini', 'r', encoding='utf-8')
+    except FileNotFoundError: # Linux的大小写敏感可能报错，就加了这个（但是linux能跑pcl吗（？
+        ini_file = open(pcl_folder / 'setup.ini', 'r', encoding='utf-8')
+    with ini_file:
         is_indie = False
         for line in reversed(ini_file.readlines()):
             def to_bool(s: str): # 什么嘛，还是得手动枚举转bool
@@ -252,16 +426,28 @@ def is_indie_hmcl(hmcl_cfg_file) -> bool:
     if int(json_file.get("gameDirType")) == 1: return True
     return False
 
-def parse_version_info(path: Path, launcher, is_indie=True) -> dict | None:
+def parse_version_info(path: Path, launcher, is_indie=True, snapshot: FolderSnapshot = None) -> dict | None:
     '''
     解析获取版本的版本号、模组加载器、和版本名等信息
+    \n版本json和jar包都通过manifest_scope()的缓存读取，同一次扫描里，继承同一个父版本（inheritsFrom）的版本只会读取一次父版本
+    Args:
+        snapshot(FolderSnapshot): 该版本文件夹的快照，不传入则重新枚举
     '''
+    snapshot = snapshot or FolderSnapshot.scan(path)
+    if snapshot is None: return None
+    with manifest_scope() as cache:
+        return _parse_version_info(cache, snapshot, launcher, is_indie)
+
+def _parse_version_info(cache: ManifestCache, snapshot: FolderSnapshot, launcher, is_indie=True) -> dict | None:
+    path = snapshot.path
     game_path = ''
     version = ''
     secondary_mod_loader = ''
+    ver_type = None
+    parent = None # inheritsFrom的父版本名
 
     # 获取游戏核心jar文件名字作为唯一版本标识
-    game_jar = next(path.glob('*.jar'), None)
+    game_jar = next(iter(snapshot.files('.jar')), None)
     if not game_jar: return None # 找不到jar就不是版本了
     game_jar = game_jar.as_posix()
 
@@ -276,44 +462,43 @@ def parse_version_info(path: Path, launcher, is_indie=True) -> dict | None:
     # 因此，如果检测到了像fabric, forge那样的强模组加载器，就会直接返回dict
     # 但如果检测到了optifine，那么会暂时先储存版本号和加载器信息，如果后面真的找不到其他的模组加载器的话，就在libraries列表遍历完成后，判断为optifine端，返回之前获取到的版本号和加载器信息dict
     # 其实有这个原理，也可以做liteloader的检测适配，但...现在真的会有人单独用liteloader吗（
-    for f in list(path.glob('*.json')):
+    for f in snapshot.files('.json'):
         # 先看看是不是版本json文件
         try:
-            with open(f, 'r', encoding='utf-8') as file:
-                content: dict = json.load(file)
-                libraries: List[dict] = content.get("libraries")
-                logger.debug(f"解析{f.name}")
-
-                for item in libraries: # 有libraries，是版本json文件！进行解析获取版本号和加载器
-                    # Fabric
-                    fabric = re.search(r'(?<=(net\.fabricmc:intermediary:)).*', item.get("name"))
-                    quilt = 'org.quiltmc:' in item.get('name')
-                    if fabric != None:
-                        # Quilt
-                        if quilt:
-                            return VersionParseResult(game_jar, path.name, game_path, fabric.group(), 'quilt', is_indie, launcher).to_dict()
-                        return VersionParseResult(game_jar, path.name, game_path, fabric.group(), 'fabric', is_indie, launcher).to_dict()
-                    
-                    # Forge
-                    forge = re.search(r'(?<=net\.minecraftforge:forge:)[^-]*', item.get("name"))
-                    if forge != None:
-                        return VersionParseResult(game_jar, path.name, game_path, forge.group(), 'forge', is_indie, launcher).to_dict()
-
-                    # Optifine
-                    optifine = re.search(r'(?<=(optifine:OptiFine:))[^_]*', item.get("name"))
-                    if optifine != None:
-                        version = optifine.group()
-                        secondary_mod_loader = 'optifine'
-
-                # NeoForge
-                game: List[str] = content.get('arguments').get('game')
-                for i in range(len(game)):
-                    if game[i] == "--fml.mcVersion":
-                        return VersionParseResult(game_jar, path.name, game_path, game[i+1], 'neoforge', is_indie, launcher).to_dict()
+            content: dict = cache.load_json(f, snapshot.stat(f.name))
+            libraries: List[dict] = content.get("libraries")
+            logger.debug(f"解析{f.name}")
+
+            for item in libraries: # 有libraries，是版本json文件！进行解析获取版本号和加载器
+                # Fabric
+                fabric = re.search(r'(?<=(net\.fabricmc:intermediary:)).*', item.get("name"))
+                quilt = 'org.quiltmc:' in item.get('name')
+                if fabric != None:
+                    # Quilt
+                    if quilt:
+                        return VersionParseResult(game_jar, path.name, game_path, fabric.group(), 'quilt', is_indie, launcher).to_dict()
+                    return VersionParseResult(game_jar, path.name, game_path, fabric.group(), 'fabric', is_indie, launcher).to_dict()
                 
-                # 因为有可能forge和fabric在启动器时一起安装，会导致两个特征词条都会出现，因此需要后置区别
-                if secondary_mod_loader != '':
-                    return VersionParseResult(game_jar, path.name, game_path, version, secondary_mod_loader, is_indie, launcher).to_dict()
+                # Forge
+                forge = re.search(r'(?<=net\.minecraftforge:forge:)[^-]*', item.get("name"))
+                if forge != None:
+                    return VersionParseResult(game_jar, path.name, game_path, forge.group(), 'forge', is_indie, launcher).to_dict()
+
+                # Optifine
+                optifine = re.search(r'(?<=(optifine:OptiFine:))[^_]*', item.get("name"))
+                if optifine != None:
+                    version = optifine.group()
+                    secondary_mod_loader = 'optifine'
+
+            # NeoForge
+            game: List[str] = content.get('arguments').get('game')
+            for i in range(len(game)):
+                if game[i] == "--fml.mcVersion":
+                    return VersionParseResult(game_jar, path.name, game_path, game[i+1], 'neoforge', is_indie, launcher).to_dict()
+            
+            # 因为有可能forge和fabric在启动器时一起安装，会导致两个特征词条都会出现，因此需要后置区别
+            if secondary_mod_loader != '':
+                return VersionParseResult(game_jar, path.name, game_path, version, secondary_mod_loader, is_indie, launcher).to_dict()
                 
         except (KeyError, AttributeError, TypeError):
             # 找不到libraries，换个方式打开...?
@@ -325,6 +510,7 @@ def parse_version_info(path: Path, launcher, is_indie=True) -> dict | None:
             hmcl = content.get('patches', False)
             pcl = content.get('clientVersion', False)
             ver_type = content.get('type', None)
+            parent = parent or content.get('inheritsFrom')
             if hmcl: # HMCL
                 return VersionParseResult(game_jar, path.name, game_path, hmcl[0]['version'], ver_type, is_indie, launcher).to_dict()
             elif pcl: # PCL
@@ -335,15 +521,26 @@ def parse_version_info(path: Path, launcher, is_indie=True) -> dict | None:
             
     # 怎么都没有版本json...看来只能拆jar包了
     try:
-        with zipfile.ZipFile(path / f'{path.name}.jar', 'r') as jar_file:
-            logger.info("解析版本jar包")
-            with jar_file.open('version.json', 'r') as json_file:
-                logger.info("读取完成")
-                return VersionParseResult(game_jar, path.name, game_path, json.load(json_file)['id'], ver_type, is_indie, launcher).to_dict()
-    except Exception as e: # 万策尽QAQ————
-        logger.error("无法解析版本号: %s", e)
-        return None
-        
+        jar_name = f'{path.name}.jar'
+        return VersionParseResult(game_jar, path.name, game_path, cache.load_jar_version(path / jar_name, snapshot.stat(jar_name))['id'], ver_type, is_indie, launcher).to_dict()
+    except Exception as e:
+        if not parent: # 万策尽QAQ————
+            logger.error("无法解析版本号: %s", e)
+            return None
+
+    # 还有继承的父版本，去看看父版本（同一个父版本的读取结果会被缓存共用）
+    parent_path = path.parent / parent
+    try:
+        return VersionParseResult(game_jar, path.name, game_path, cache.load_jar_version(parent_path / f'{parent}.jar')['id'], ver_type, is_indie, launcher).to_dict()
+    except Exception:
+        pass
+    try:
+        parent_content: dict = cache.load_json(parent_path / f'{parent}.json')
+        return VersionParseResult(game_jar, path.name, game_path, parent_content['id'], ver_type or parent_content.get('type'), is_indie, launcher).to_dict()
+    except Exception as e: # 父版本也没了，那就直接用父版本名吧
+        logger.warning(f"无法读取父版本{parent}: {e}")
+        return VersionParseResult(game_jar, path.name, game_path, parent, ver_type, is_indie, launcher).to_dict()
+
 def refresh_version_info(version: dict) -> list[dict] | tuple[dict, dict] | None:
     '''
     同步启动器更改，更新该版本的信息
@@ -389,34 +586,4 @@ def clear_all_vers():
 
 def upgrade_versions_json():
     '''兼容升级旧的versions.json文件'''
-    old_versions = get_versions()
-    game_names = [] # 用于快速判断和索引游戏文件夹在games里的位置
-    games: list[dict] = []
-
-    for ver in old_versions:
-        try:
-            i = game_names.index(Path(ver['game_jar']).parents[3].name) # 判断是否已添加该游戏文件夹
-
-        except ValueError: # 
-            path = Path(ver['game_jar'])
-            game_name = path.parents[3].name # 自动取.mincraft文件夹的上一层文件夹名
-            game_path = path.parents[2].as_posix()
-            game_versions = []
-
-            # 添加游戏文件夹
-            game_names.append(game_name)
-            i = len(game_names) - 1
-            game_dict = {'folder_name': game_name, 'folder_path': game_path, 'versions': game_versions}
-            games.append(game_dict)
-
-        games[i]['versions'].append(ver)
-
-    try:
-        with open('versions.json', 'w', encoding='utf-8') as f:
-            json.dump(games, f)
-            logger.info('已将versions.json升级为新版本格式')
-            return games
-            
-    except Exception as e:
-        logger.error("升级versions.json文件失败")
-        raise e
\ No newline at end of file
+    return library_store.upgrade_versions_json()
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# 程序以MCMigrate为工作目录运行，导入写法都是from terminal.func import ...
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
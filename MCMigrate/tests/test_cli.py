@@ -0,0 +1,53 @@
+from pathlib import Path
+import cli
+import json, logging
+import pytest
+
+def make_version(versions: Path, name: str, libraries: list[dict], indie: bool):
+    folder = versions / name
+    folder.mkdir(parents=True)
+    (folder / f'{name}.jar').write_bytes(b'PK')
+    (folder / f'{name}.json').write_text(json.dumps({'id': name, 'libraries': libraries, 'arguments': {'game': []}}))
+    (folder / 'hmclversion.cfg').write_text(json.dumps({'gameDirType': 1 if indie else 0})) # HMCL的配置，可以判断是否版本隔离
+
+@pytest.fixture
+def workdir(tmp_path: Path, monkeypatch) -> Path:
+    '''和图形界面一样，config.yml、versions.json都放在工作目录下'''
+    monkeypatch.chdir(tmp_path)
+    yield tmp_path
+    logging.disable(logging.NOTSET) # main()会屏蔽INFO日志
+
+@pytest.fixture
+def minecraft(tmp_path: Path) -> Path:
+    root = tmp_path / 'Game' / '.minecraft'
+    make_version(root / 'versions', '1.20.1-Fabric', [{'name': 'net.fabricmc:intermediary:1.20.1'}], indie=True)
+    make_version(root / 'versions', '1.19.2-Forge', [{'name': 'net.minecraftforge:forge:1.19.2-43.2.0'}], indie=False)
+    return root
+
+def test_import_all_parseable(workdir: Path, minecraft: Path, capsys):
+    assert cli.main(['import', str(minecraft), '--json']) == cli.EXIT_OK
+    output = json.loads(capsys.readouterr().out)
+    assert sorted(output['imported']) == ['1.19.2-Forge', '1.20.1-Fabric']
+    assert output['skipped'] == [] and output['failed'] == []
+
+    assert cli.main(['list', '--json']) == cli.EXIT_OK
+    games = json.loads(capsys.readouterr().out)
+    assert [g['folder_path'] for g in games] == [minecraft.as_posix()]
+    loaders = {v['name']: (v['mod_loader'], v['version'], v['is_indie']) for v in games[0]['versions']}
+    assert loaders == {'1.20.1-Fabric': ('fabric', '1.20.1', True), '1.19.2-Forge': ('forge', '1.19.2', False)}
+
+def test_import_twice_replaces_versions(workdir: Path, minecraft: Path, capsys):
+    assert cli.main(['import', str(minecraft)]) == cli.EXIT_OK
+    assert cli.main(['import', str(minecraft)]) == cli.EXIT_OK
+    capsys.readouterr()
+    cli.main(['list', '--json'])
+    games = json.loads(capsys.readouterr().out)
+    assert len(games) == 1 and len(games[0]['versions']) == 2
+
+def test_import_not_a_game_folder(workdir: Path, tmp_path: Path, capsys):
+    (tmp_path / 'empty').mkdir()
+    assert cli.main(['import', str(tmp_path / 'empty')]) == cli.EXIT_USAGE
+    assert '错误' in capsys.readouterr().err
+
+def test_unknown_version(workdir: Path, capsys):
+    assert cli.main(['scan', 'nope']) == cli.EXIT_USAGE
@@ -0,0 +1,37 @@
+from pathlib import Path
+from terminal.func import config
+import yaml
+
+def write(path: Path, data: dict):
+    path.write_text(yaml.safe_dump(data, allow_unicode=True), encoding='utf-8')
+
+def test_new_config_overwrites_by_default(tmp_path: Path):
+    path = tmp_path / 'config.yml'
+    settings = config.ConfigCache(path).settings()
+    assert settings.migrate.file.copy_option == 'overwrite'
+    assert yaml.safe_load(path.read_text(encoding='utf-8'))['config_version'] == config.CONFIG_VERSION
+
+def test_old_config_keep_is_upgraded_to_overwrite(tmp_path: Path):
+    '''以前的版本忽略copy_option，一直都是覆盖，升级后不能悄悄变成保留旧文件'''
+    path = tmp_path / 'config.yml'
+    write(path, {'migrate': {'file': {'copy_option': 'keep'}, 'filter_rule': 'excludes', 'excludes': ['logs']}})
+    settings = config.ConfigCache(path).settings()
+    assert settings.migrate.file.copy_option == 'overwrite'
+    saved = yaml.safe_load(path.read_text(encoding='utf-8'))
+    assert saved['config_version'] == config.CONFIG_VERSION
+    assert saved['migrate']['file']['copy_option'] == 'overwrite'
+    assert saved['migrate']['excludes'] == ['logs']
+
+def test_keep_chosen_after_upgrade_is_respected(tmp_path: Path):
+    path = tmp_path / 'config.yml'
+    write(path, {'config_version': config.CONFIG_VERSION, 'migrate': {'file': {'copy_option': 'keep'}}})
+    assert config.ConfigCache(path).settings().migrate.file.copy_option == 'keep'
+
+def test_invalid_values_fall_back_to_defaults(tmp_path: Path):
+    path = tmp_path / 'config.yml'
+    write(path, {'config_version': config.CONFIG_VERSION, 'migrate': {'file': {'copy_option': 'nope', 'method': 'teleport'}, 'jobs': {'max_running': 0, 'max_disk': 'x'}}})
+    settings = config.ConfigCache(path).settings()
+    assert settings.migrate.file.copy_option == 'overwrite'
+    assert settings.migrate.file.method == 'copy'
+    assert settings.migrate.jobs.max_running == 1
+    assert settings.migrate.jobs.max_disk == 1
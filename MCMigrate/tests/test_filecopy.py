@@ -0,0 +1,135 @@
+from pathlib import Path
+from terminal.func import filecopy
+from terminal.func.manifest import Manifest
+import errno, os
+import pytest
+
+needs_copy_file_range = pytest.mark.skipif(not hasattr(os, 'copy_file_range'), reason='copy_file_range only exists on Linux')
+
+@needs_copy_file_range
+def test_copy_range_falls_back_when_kernel_stops_early(tmp_path: Path, monkeypatch):
+    src, dst = tmp_path / 'src.bin', tmp_path / 'dst.bin'
+    data = os.urandom(300_000)
+    src.write_bytes(data)
+    real = os.copy_file_range
+    calls = []
+    def short(fd_in, fd_out, count, *args):
+        calls.append(count)
+        return real(fd_in, fd_out, min(count, 1000)) if len(calls) == 1 else 0 # 复制了一点就返回0
+    monkeypatch.setattr(os, 'copy_file_range', short)
+    filecopy.copy_range(src, dst, len(data))
+    assert dst.read_bytes() == data
+
+@needs_copy_file_range
+def test_copy_range_raises_when_source_shrank(tmp_path: Path):
+    src, dst = tmp_path / 'src.bin', tmp_path / 'dst.bin'
+    src.write_bytes(b'x' * 100)
+    with pytest.raises(OSError) as info:
+        filecopy.copy_range(src, dst, 200)
+    assert info.value.errno not in filecopy._UNSUPPORTED_ERRNOS # 不能让一个文件把copy_file_range整个禁用
+
+def test_permission_error_does_not_disable_method(tmp_path: Path):
+    engine = filecopy.CopyEngine(workers=1)
+    def denied(*args):
+        raise PermissionError(errno.EPERM, 'Operation not permitted')
+    with pytest.raises(PermissionError):
+        engine._try('reflink', (1, 1), denied)
+    assert ('reflink', 1, 1) not in engine._caps
+
+def test_hardlink_eperm_means_unsupported():
+    engine = filecopy.CopyEngine(workers=1)
+    def denied(*args):
+        raise PermissionError(errno.EPERM, 'Operation not permitted')
+    assert not engine._try('hardlink', (1, 2), denied, unsupported=filecopy._HARDLINK_UNSUPPORTED_ERRNOS)
+    assert engine._caps[('hardlink', 1, 2)] is False
+
+def write(path: Path, data: bytes, mtime: float = None):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+
+@pytest.fixture
+def trees(tmp_path: Path) -> tuple[Path, Path]:
+    '''
+    源和目标各有三种情况的文件：
+    \n- same.txt 目标和源一致
+    \n- stale.txt 目标是旧的（大小不同）
+    \n- new.txt 目标没有
+    '''
+    src, dst = tmp_path / 'src', tmp_path / 'dst'
+    write(src / 'same.txt', b'same', mtime=1_600_000_000)
+    write(src / 'stale.txt', b'new content', mtime=1_600_000_000)
+    write(src / 'sub' / 'new.txt', b'new')
+    write(dst / 'same.txt', b'same', mtime=1_600_000_000)
+    write(dst / 'stale.txt', b'old', mtime=1_500_000_000)
+    return src, dst
+
+def copy_all(src: Path, dst: Path, option: filecopy.CopyOption, compare_hash: bool = False) -> filecopy.CopyEngine:
+    manifest = Manifest.build(src)
+    with filecopy.CopyEngine(workers=2, option=option, compare_hash=compare_hash) as engine:
+        engine.copy_manifest(manifest, dst)
+    assert not engine.failed
+    return engine
+
+def test_overwrite_copies_everything(trees):
+    src, dst = trees
+    engine = copy_all(src, dst, filecopy.CopyOption.OVERWRITE)
+    assert engine.files_copied == 3 and engine.files_skipped == 0
+    assert (dst / 'stale.txt').read_bytes() == b'new content'
+    assert (dst / 'sub' / 'new.txt').read_bytes() == b'new'
+
+def test_keep_leaves_existing_files(trees):
+    src, dst = trees
+    engine = copy_all(src, dst, filecopy.CopyOption.KEEP)
+    assert engine.files_copied == 1 and engine.files_skipped == 2
+    assert (dst / 'stale.txt').read_bytes() == b'old'
+    assert (dst / 'sub' / 'new.txt').read_bytes() == b'new'
+
+def test_sync_copies_only_changed_files(trees):
+    src, dst = trees
+    engine = copy_all(src, dst, filecopy.CopyOption.SYNC)
+    assert engine.files_copied == 2 and engine.files_skipped == 1
+    assert (dst / 'stale.txt').read_bytes() == b'new content'
+    assert (dst / 'stale.txt').stat().st_mtime_ns == (src / 'stale.txt').stat().st_mtime_ns # 保留修改时间，下次SYNC能跳过
+
+def test_sync_compare_hash_ignores_mtime(trees):
+    src, dst = trees
+    write(dst / 'same.txt', b'same', mtime=1_000_000_000) # 内容相同，修改时间不同
+    write(dst / 'stale.txt', b'old content', mtime=1_600_000_000) # 大小和修改时间相同，内容不同
+    copy_all(src, dst, filecopy.CopyOption.SYNC)
+    assert (dst / 'stale.txt').read_bytes() == b'old content' # 不比较hash时只看大小和修改时间
+    write(dst / 'same.txt', b'same', mtime=1_000_000_000)
+    write(dst / 'stale.txt', b'old content', mtime=1_600_000_000)
+    engine = copy_all(src, dst, filecopy.CopyOption.SYNC, compare_hash=True)
+    assert engine.files_copied == 1 # 只有内容不同的stale.txt
+    assert (dst / 'stale.txt').read_bytes() == b'new content'
+
+def test_copy_option_parse():
+    assert filecopy.CopyOption.parse('sync') is filecopy.CopyOption.SYNC
+    assert filecopy.CopyOption.parse('nonsense') is filecopy.CopyOption.OVERWRITE
+    assert filecopy.CopyMethod.parse(None) is filecopy.CopyMethod.COPY
+
+def test_copy_manifest_to_many_targets(trees, tmp_path: Path):
+    src, _ = trees
+    targets = [tmp_path / 'a', tmp_path / 'b']
+    manifest = Manifest.build(src)
+    with filecopy.CopyEngine(workers=2) as engine:
+        engine.copy_manifest(manifest, targets)
+    assert not engine.failed
+    for target in targets:
+        assert sorted(engine.copied_indices[target]) == manifest.files()
+        assert manifest.verify(target, manifest.files()) == []
+        assert (target / 'sub' / 'new.txt').read_bytes() == b'new'
+
+def test_hardlink_is_not_recopied(trees):
+    src, dst = trees
+    manifest = Manifest.build(src)
+    with filecopy.CopyEngine(workers=2, method=filecopy.CopyMethod.HARDLINK) as engine:
+        engine.copy_manifest(manifest, dst)
+    assert not engine.failed
+    linked = (dst / 'sub' / 'new.txt').stat().st_ino == (src / 'sub' / 'new.txt').stat().st_ino
+    with filecopy.CopyEngine(workers=2, method=filecopy.CopyMethod.HARDLINK) as engine:
+        engine.copy_manifest(manifest, dst)
+    if linked: # 硬链接过去的文件本来就是同一个，第二次直接跳过
+        assert engine.files_skipped == 3
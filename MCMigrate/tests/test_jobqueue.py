@@ -0,0 +1,31 @@
+from terminal.func import jobqueue
+import threading
+
+def test_disk_slots_follow_current_limit():
+    limit = [1]
+    slots = jobqueue.DiskSlots(lambda: limit[0])
+    assert slots.acquire(timeout=0)
+    assert not slots.acquire(timeout=0)
+
+    limit[0] = 2 # 修改config.yml中的max_disk后不用重启
+    assert slots.acquire(timeout=0)
+    assert slots.in_use == 2
+
+    limit[0] = 1 # 改小后已经拿到的名额不受影响，都释放到上限以下才能再拿
+    slots.release()
+    assert not slots.acquire(timeout=0)
+    slots.release()
+    assert slots.acquire(timeout=0)
+
+def test_disk_slots_wake_waiter_after_limit_raised():
+    limit = [1]
+    slots = jobqueue.DiskSlots(lambda: limit[0])
+    slots.acquire()
+    acquired = threading.Event()
+    waiter = threading.Thread(target=lambda: slots.acquire() and acquired.set())
+    waiter.start()
+    assert not acquired.wait(0.1)
+    limit[0] = 2
+    slots.wake()
+    assert acquired.wait(2)
+    waiter.join()
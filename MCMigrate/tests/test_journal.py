@@ -0,0 +1,106 @@
+from pathlib import Path
+from terminal.func import journal
+from terminal.func.filecopy import CopyEngine, CopyOption
+from terminal.func.manifest import Manifest
+import os
+import pytest
+
+SIZE = 1_000_000
+
+def write(path: Path, data: bytes):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+
+@pytest.fixture
+def dirs(tmp_path: Path) -> tuple[Path, Path]:
+    src, dst = tmp_path / 'src', tmp_path / 'dst'
+    write(src / 'saves' / 'r.mca', os.urandom(SIZE))
+    write(src / 'options.txt', b'fov:70\n')
+    dst.mkdir()
+    return src, dst
+
+def index_of(manifest: Manifest, rel: str) -> int:
+    return next(i for i in range(len(manifest)) if manifest.relpath(i) == rel)
+
+def interrupted(src: Path, dst: Path, manifest: Manifest, rel: str):
+    '''模拟复制rel到一半时崩溃：日志里只有B，目标只写了开头一部分'''
+    i = index_of(manifest, rel)
+    write(dst / rel, (src / rel).read_bytes()[:1000])
+    with open(dst / journal.JOURNAL_NAME, 'w', encoding='utf-8') as f:
+        f.write(f"H\t{journal.VERSION}\t{manifest.root}\n")
+        f.write(f"B\t{manifest.sizes[i]}\t{manifest.mtimes[i]}\t{rel}\n")
+    return i
+
+@pytest.mark.parametrize('option', list(CopyOption))
+def test_resume_recopies_partial_file(dirs, option: CopyOption):
+    src, dst = dirs
+    manifest = Manifest.build(src)
+    i = interrupted(src, dst, manifest, 'saves/r.mca')
+
+    with journal.MigrateJournal(dst, manifest) as j:
+        assert j.resumed
+        assert j.redo_files == {i}
+        assert i not in j.done_files
+        with CopyEngine(workers=2, option=option) as engine:
+            engine.copy_manifest(manifest, dst, journal=j)
+
+    assert (dst / 'saves' / 'r.mca').read_bytes() == (src / 'saves' / 'r.mca').read_bytes()
+    assert i in engine.copied_indices[dst]
+    assert not engine.failed
+    assert manifest.verify(dst, sorted(set(engine.copied_indices[dst]) | j.redo_files)) == []
+
+def test_redo_survives_second_interrupt(dirs):
+    '''重新复制之前又中断了，下次打开仍然要重新复制'''
+    src, dst = dirs
+    manifest = Manifest.build(src)
+    i = interrupted(src, dst, manifest, 'saves/r.mca')
+    with journal.MigrateJournal(dst, manifest):
+        pass
+    with journal.MigrateJournal(dst, manifest) as j:
+        assert j.redo_files == {i}
+
+def test_finished_and_verified_files_are_skipped(dirs):
+    src, dst = dirs
+    manifest = Manifest.build(src)
+    with journal.MigrateJournal(dst, manifest) as j:
+        with CopyEngine(workers=2) as engine:
+            engine.copy_manifest(manifest, dst, journal=j)
+    assert not engine.failed
+
+    with journal.MigrateJournal(dst, manifest) as j:
+        assert j.resumed
+        assert not j.redo_files
+        assert j.done_files == {i for i in range(len(manifest)) if not manifest.is_dir(i)}
+        with CopyEngine(workers=2) as engine:
+            engine.copy_manifest(manifest, dst, journal=j)
+    assert engine.files_copied == 0
+    assert engine.files_skipped == manifest.total_files
+
+def test_changed_source_invalidates_journal(dirs):
+    src, dst = dirs
+    manifest = Manifest.build(src)
+    with journal.MigrateJournal(dst, manifest) as j:
+        with CopyEngine(workers=2) as engine:
+            engine.copy_manifest(manifest, dst, journal=j)
+
+    write(src / 'options.txt', b'fov:90\nrenderDistance:12\n')
+    manifest = Manifest.build(src)
+    with journal.MigrateJournal(dst, manifest) as j:
+        assert index_of(manifest, 'options.txt') not in j.done_files
+        assert index_of(manifest, 'saves/r.mca') in j.done_files
+
+def test_header_mismatch_starts_over(dirs, tmp_path: Path):
+    src, dst = dirs
+    manifest = Manifest.build(src)
+    interrupted(src, dst, manifest, 'saves/r.mca')
+    other = Manifest.build(tmp_path / 'src' / 'saves')
+    with journal.MigrateJournal(dst, other) as j:
+        assert not j.resumed
+
+def test_discard_removes_journal(dirs):
+    src, dst = dirs
+    manifest = Manifest.build(src)
+    with journal.MigrateJournal(dst, manifest) as j:
+        assert j.path.exists()
+        j.discard()
+    assert not (dst / journal.JOURNAL_NAME).exists()
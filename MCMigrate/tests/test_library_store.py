@@ -0,0 +1,140 @@
+from pathlib import Path
+from terminal.func import library_store
+from terminal.func.library import GameLibrary
+import json, sqlite3, threading
+import pytest
+
+def version(game: str, name: str, **extra) -> dict:
+    return {
+        'game_jar': f'{game}/.minecraft/versions/{name}/{name}.jar', 'name': name,
+        'game_path': f'{game}/.minecraft/versions/{name}', 'version': name,
+        'mod_loader': 'fabric', 'is_indie': True, 'launcher': None, **extra
+    }
+
+def game(path: str, *names: str) -> dict:
+    return {'folder_name': Path(path).name, 'folder_path': f'{path}/.minecraft', 'versions': [version(path, n) for n in names]}
+
+def test_read_versions_json(tmp_path: Path):
+    path = tmp_path / 'versions.json'
+    assert library_store.read_versions_json(path) == [] # 不存在
+    path.write_text('[]')
+    assert library_store.read_versions_json(path) == [] # 空文件
+    path.write_text('{"folder_path": "x", "versions": []}')
+    with pytest.raises(TypeError):
+        library_store.read_versions_json(path)
+    path.write_text('[{"broken"')
+    with pytest.raises(json.JSONDecodeError):
+        library_store.read_versions_json(path)
+
+def test_write_versions_json_is_atomic(tmp_path: Path):
+    path = tmp_path / 'versions.json'
+    games = [game('D:/A', '1.20.1')]
+    library_store.write_versions_json(games, path)
+    assert library_store.read_versions_json(path) == games
+    assert not path.with_name('versions.json.tmp').exists()
+
+def test_upgrade_legacy_versions_json(tmp_path: Path):
+    path = tmp_path / 'versions.json'
+    legacy = [version('D:/A', '1.20.1'), version('D:/B', '1.16.5'), version('D:/A', '1.21')]
+    path.write_text(json.dumps(legacy))
+    assert library_store.is_legacy_versions_json(library_store.read_versions_json(path))
+
+    upgraded = library_store.upgrade_versions_json(path)
+    assert [(g['folder_name'], g['folder_path'], len(g['versions'])) for g in upgraded] == [('A', 'D:/A/.minecraft', 2), ('B', 'D:/B/.minecraft', 1)]
+    assert not library_store.is_legacy_versions_json(library_store.read_versions_json(path))
+    library = GameLibrary()
+    library_store.JsonLibraryStore(library, path).load() # 升级后可以正常加载
+    assert len(library) == 2
+
+def test_legacy_detection_on_current_format():
+    assert not library_store.is_legacy_versions_json([])
+    assert not library_store.is_legacy_versions_json([game('D:/A', '1.20.1')])
+
+def test_json_store_flushes_changes(tmp_path: Path):
+    path = tmp_path / 'versions.json'
+    library = GameLibrary()
+    store = library_store.JsonLibraryStore(library, path)
+    store.load()
+    library.add_game(game('D:/A', '1.20.1'))
+    store.games_changed(library.records())
+    store.flush()
+    assert [g['folder_path'] for g in library_store.read_versions_json(path)] == ['D:/A/.minecraft']
+
+    library.add_version('D:/A/.minecraft', version('D:/A', '1.21'))
+    store.version_added(library.get_game('D:/A/.minecraft'), None)
+    store.close()
+    assert len(library_store.read_versions_json(path)[0]['versions']) == 2
+
+    store.cleared()
+    assert not path.exists()
+
+def test_sqlite_store_imports_json_and_round_trips(tmp_path: Path):
+    legacy_json, db = tmp_path / 'versions.json', tmp_path / 'library.db'
+    games = [game('D:/A', '1.20.1', '1.21'), game('D:/B', '1.16.5')]
+    games[0]['versions'][0]['custom'] = 'kept' # 未知字段原样保留
+    library_store.write_versions_json(games, legacy_json)
+
+    library = GameLibrary()
+    store = library_store.SQLiteLibraryStore(library, db, legacy_json)
+    store.load() # 数据库是空的，从versions.json导入
+    assert library.games() == games
+
+    record = library.get_game('D:/B/.minecraft')
+    added = library.add_version(record.folder_path, version('D:/B', '1.12.2'))
+    store.version_added(record, added)
+    removed = library.remove_version('D:/A/.minecraft', (games[0]['versions'][1]['game_jar'], games[0]['versions'][1]['game_path']))
+    store.version_removed(library.get_game('D:/A/.minecraft'), removed)
+    store.close()
+
+    reloaded = GameLibrary()
+    store = library_store.SQLiteLibraryStore(reloaded, db, legacy_json)
+    store.load()
+    assert reloaded.games() == library.games()
+    assert reloaded.games()[0]['versions'][0]['custom'] == 'kept'
+
+    store.game_removed(reloaded.get_game('D:/A/.minecraft'))
+    store.close()
+    again = GameLibrary()
+    store = library_store.SQLiteLibraryStore(again, db, legacy_json)
+    store.load()
+    store.close()
+    assert [g['folder_path'] for g in again.games()] == ['D:/B/.minecraft']
+
+def test_open_store_backend(tmp_path: Path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    library = GameLibrary()
+    assert isinstance(library_store.open_store(library), library_store.JsonLibraryStore)
+    store = library_store.open_store(library, 'sqlite')
+    assert isinstance(store, library_store.SQLiteLibraryStore)
+    store.close()
+
+def test_sqlite_store_rejects_corrupt_db(tmp_path: Path):
+    db = tmp_path / 'library.db'
+    db.write_bytes(b'not a sqlite database' * 64)
+    with pytest.raises(sqlite3.DatabaseError): # Terminal捕获后改用json后端
+        library_store.SQLiteLibraryStore(GameLibrary(), db, tmp_path / 'versions.json')
+    db.unlink() # 连接已经关闭，Windows上也能删除
+
+def test_sqlite_store_serializes_writes_across_threads(tmp_path: Path):
+    library = GameLibrary()
+    store = library_store.SQLiteLibraryStore(library, tmp_path / 'library.db', tmp_path / 'versions.json')
+    store.load()
+    touched, _ = library.merge_games([game(f'D:/{i}', '1.20.1', '1.21') for i in range(8)])
+    errors = []
+    def write(record):
+        try:
+            for _ in range(20):
+                store.games_changed([record])
+        except Exception as e:
+            errors.append(e)
+    threads = [threading.Thread(target=write, args=(record,)) for record in touched]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    store.close()
+    assert errors == []
+
+    reloaded = GameLibrary()
+    store = library_store.SQLiteLibraryStore(reloaded, tmp_path / 'library.db', tmp_path / 'versions.json')
+    store.load()
+    store.close()
+    assert reloaded.games() == library.games()
@@ -0,0 +1,65 @@
+from pathlib import Path
+from terminal.func.manifest import Manifest
+import threading
+
+def touch(root: Path, rel: str, size: int):
+    path = root / rel
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b'x' * size)
+
+def test_build_records_paths_sizes_and_parents_first(tmp_path: Path):
+    touch(tmp_path, 'a.txt', 3)
+    touch(tmp_path, 'saves/w/level.dat', 10)
+    touch(tmp_path, 'saves/w/region/r.mca', 100)
+    (tmp_path / 'empty').mkdir()
+    manifest = Manifest.build(tmp_path)
+
+    paths = [manifest.relpath(i) for i in range(len(manifest))]
+    assert set(paths) == {'a.txt', 'saves', 'saves/w', 'saves/w/level.dat', 'saves/w/region', 'saves/w/region/r.mca', 'empty'}
+    for i in range(len(manifest)): # 文件夹一定排在它的内容之前
+        if manifest.parents[i] >= 0:
+            assert manifest.parents[i] < i
+    assert manifest.total_files == 3
+    assert manifest.total_bytes == 113
+    index = {manifest.relpath(i): i for i in range(len(manifest))}
+    assert manifest.top(index['saves/w/region/r.mca']) == 'saves'
+    assert manifest.is_dir(index['saves/w']) and not manifest.is_dir(index['a.txt'])
+    assert manifest.meta(index['a.txt']).st_size == 3
+
+def test_accept_skips_whole_subtree(tmp_path: Path):
+    touch(tmp_path, 'logs/latest.log', 1)
+    touch(tmp_path, 'options.txt', 1)
+    seen = []
+    def accept(rel: str, entry) -> bool:
+        seen.append(rel)
+        return rel != 'logs'
+    manifest = Manifest.build(tmp_path, accept)
+    assert [manifest.relpath(i) for i in range(len(manifest))] == ['options.txt']
+    assert 'logs/latest.log' not in seen
+
+def test_dirs_and_files_ordering(tmp_path: Path):
+    touch(tmp_path, 'small', 1)
+    touch(tmp_path, 'big/file', 50)
+    (tmp_path / 'empty' / 'nested').mkdir(parents=True)
+    manifest = Manifest.build(tmp_path)
+    assert {manifest.relpath(i) for i in manifest.dirs()} == {'big', 'empty', 'empty/nested'}
+    assert {manifest.relpath(i) for i in manifest.dirs(non_empty_only=True)} == {'big'}
+    assert [manifest.relpath(i) for i in manifest.files(largest_first=True)] == ['big/file', 'small']
+
+def test_verify_reports_missing_and_wrong_size(tmp_path: Path):
+    src, dst = tmp_path / 'src', tmp_path / 'dst'
+    for rel in ('ok', 'short', 'missing'):
+        touch(src, rel, 10)
+    touch(dst, 'ok', 10)
+    touch(dst, 'short', 4)
+    manifest = Manifest.build(src)
+    failed = dict(manifest.verify(dst, manifest.files()))
+    assert set(failed) == {str(dst / 'short'), str(dst / 'missing')}
+    assert '4/10' in failed[str(dst / 'short')]
+    assert manifest.verify(dst, []) == []
+
+def test_abort_returns_partial_manifest(tmp_path: Path):
+    touch(tmp_path, 'a', 1)
+    abort = threading.Event()
+    abort.set()
+    assert len(Manifest.build(tmp_path, abort_event=abort)) == 0
@@ -0,0 +1,130 @@
+from pathlib import Path
+from terminal.func.manifest import Manifest
+from terminal.func.pathfilter import PathFilter, compile_rule, glob_to_regex
+import os, re
+import pytest
+
+def touch(root: Path, *paths: str, size: int = 0):
+    for rel in paths:
+        path = root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b'x' * size)
+
+def scanned(root: Path, path_filter: PathFilter) -> set[str]:
+    '''按过滤器遍历后留下的文件'''
+    manifest = Manifest.build(root, path_filter.accept)
+    return {manifest.relpath(i) for i in manifest.files()}
+
+@pytest.fixture
+def game(tmp_path: Path) -> Path:
+    touch(
+        tmp_path,
+        'options.txt', 'logs/latest.log', 'config/logs/x.cfg',
+        'config/xaero/cache/a.dat', 'config/xaero/settings.txt', 'xaero/cache/b.dat',
+        'saves/w/region/r.0.0.mca', 'saves/w/level.dat', 'saves/w/DIM-1/region/r.mca'
+    )
+    return tmp_path
+
+@pytest.mark.parametrize('pattern, path, expected', [
+    ('*.log', 'latest.log', True),
+    ('*.log', 'logs/latest.log', True), # 不带/的规则匹配任意层级
+    ('*.log', 'logs/sub/latest.log', True),
+    ('*', 'a/b', True),
+    ('a*', 'x/ab', True),
+    ('a?c', 'abc', True),
+    ('a?c', 'a/c', False), # ?不匹配/
+    ('[ab].txt', 'b.txt', True),
+    ('[!ab].txt', 'a.txt', False),
+])
+def test_unanchored_patterns(pattern: str, path: str, expected: bool):
+    assert bool(compile_rule(pattern).regex.match(path)) is expected
+
+@pytest.mark.parametrize('pattern, path, expected', [
+    ('/logs', 'logs', True),
+    ('/logs', 'config/logs', False), # 以/开头只匹配顶层
+    ('config/xaero', 'config/xaero', True), # 中间带/也是锚定的
+    ('config/xaero', 'a/config/xaero', False),
+    ('config/*', 'config/xaero', True),
+    ('config/*', 'config/xaero/cache', False), # *不跨越/
+    ('**/cache', 'cache', True), # **/匹配零层
+    ('**/cache', 'config/xaero/cache', True),
+    ('config/**/cache', 'config/cache', True),
+    ('config/**/cache', 'config/xaero/cache', True),
+    ('config/**/cache', 'xaero/cache', False),
+    ('saves/**', 'saves/w/region/r.0.0.mca', True),
+    ('saves/**', 'saves', False),
+])
+def test_anchored_and_double_star_patterns(pattern: str, path: str, expected: bool):
+    rule = compile_rule(pattern)
+    assert rule.anchored
+    assert bool(rule.regex.match(path)) is expected
+
+def test_comments_blank_lines_and_bad_rules_are_skipped():
+    assert compile_rule('') is None
+    assert compile_rule('  # comment') is None
+    with pytest.raises(ValueError):
+        compile_rule('*.mca size>5X')
+    assert [r.text for r in PathFilter.compile(['', '# c', '*.log', '/ size>1']).rules] == ['*.log']
+
+def test_glob_to_regex_escapes_literals():
+    assert re.fullmatch(glob_to_regex('a+b (1).txt'), 'a+b (1).txt')
+
+def test_later_rules_win(game: Path):
+    path_filter = PathFilter.compile(['*.log', '!latest.log'])
+    assert 'logs/latest.log' in scanned(game, path_filter)
+    path_filter = PathFilter.compile(['!latest.log', '*.log'])
+    assert 'logs/latest.log' not in scanned(game, path_filter)
+
+def test_anchored_exclude_only_hits_that_path(game: Path):
+    files = scanned(game, PathFilter.compile(['/config/xaero/cache']))
+    assert 'config/xaero/cache/a.dat' not in files
+    assert 'xaero/cache/b.dat' in files
+    assert 'config/xaero/settings.txt' in files
+
+def test_unanchored_exclude_hits_every_level(game: Path):
+    files = scanned(game, PathFilter.compile(['logs/'])) # 尾部/只匹配文件夹，且仍然是任意层级
+    assert 'logs/latest.log' not in files
+    assert 'config/logs/x.cfg' not in files
+
+def test_dir_only_rule_ignores_files(tmp_path: Path):
+    touch(tmp_path, 'cache', 'sub/cache/a.dat')
+    assert scanned(tmp_path, PathFilter.compile(['cache/'])) == {'cache'}
+
+def test_double_star_exclude(game: Path):
+    files = scanned(game, PathFilter.compile(['saves/**/region']))
+    assert 'saves/w/region/r.0.0.mca' not in files
+    assert 'saves/w/DIM-1/region/r.mca' not in files
+    assert 'saves/w/level.dat' in files
+
+def test_includes_mode_descends_only_where_needed(game: Path):
+    path_filter = PathFilter.compile(['config/xaero/', 'saves/**/level.dat'], default_include=False, include=True)
+    assert scanned(game, path_filter) == {'config/xaero/cache/a.dat', 'config/xaero/settings.txt', 'saves/w/level.dat'}
+    assert not path_filter.default_include
+
+def test_excluded_dir_is_not_reopened_by_include(game: Path):
+    '''和gitignore一样，被排除的文件夹里的内容不能再被包含回来'''
+    files = scanned(game, PathFilter.compile(['/saves/', '!saves/w/level.dat']))
+    assert not any(f.startswith('saves/') for f in files)
+
+def test_size_and_age_conditions(tmp_path: Path):
+    touch(tmp_path, 'big.bin', size=2048)
+    touch(tmp_path, 'small.bin', size=10)
+    touch(tmp_path, 'old.txt')
+    os.utime(tmp_path / 'old.txt', (0, 0))
+    assert scanned(tmp_path, PathFilter.compile(['*.bin size>1K'])) == {'small.bin', 'old.txt'}
+    assert scanned(tmp_path, PathFilter.compile(['* age>30d'])) == {'big.bin', 'small.bin'}
+
+def test_from_config_legacy_excludes_are_top_level_literals(game: Path):
+    path_filter = PathFilter.from_config('excludes', ['logs'], [], [], always_exclude=['options.txt'])
+    files = scanned(game, path_filter)
+    assert 'logs/latest.log' not in files
+    assert 'config/logs/x.cfg' in files # 旧写法只匹配顶层
+    assert 'options.txt' not in files
+
+def test_from_config_always_exclude_beats_rules(game: Path):
+    path_filter = PathFilter.from_config('excludes', [], [], ['!options.txt'], always_exclude=['options.txt'])
+    assert 'options.txt' not in scanned(game, path_filter)
+
+def test_from_config_includes(game: Path):
+    path_filter = PathFilter.from_config('includes', ['saves'], ['saves', 'options.txt'], ['*.mca']) # includes模式下忽略excludes
+    assert scanned(game, path_filter) == {'options.txt', 'saves/w/level.dat'}
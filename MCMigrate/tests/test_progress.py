@@ -0,0 +1,45 @@
+from terminal.func import progress
+from terminal.func.progress import MigrateProgress, Phase, ProgressMeter
+
+def snapshot(**fields) -> MigrateProgress:
+    values = dict(phase=Phase.RUNNING, mods_done=0, mods_total=0, files_done=0, files_total=0, bytes_done=0, bytes_total=0, speed=0.0, eta=None)
+    values.update(fields)
+    return MigrateProgress(**values)
+
+def test_file_percent_counts_bytes_not_files():
+    p = snapshot(files_done=1, files_total=2, bytes_done=900, bytes_total=1000)
+    assert p.file_percent == 0.9
+    assert snapshot(files_done=1, files_total=4).file_percent == 0.25 # 全是空文件时按文件数
+    assert snapshot().file_percent == 1.0
+
+def test_overall_weights_mods_and_files_by_count():
+    p = snapshot(mods_done=1, mods_total=2, files_done=6, files_total=6, bytes_done=10, bytes_total=10)
+    assert p.overall == 0.5 * 0.25 + 1.0 * 0.75
+    assert snapshot(phase=Phase.SCANNING, files_total=1).overall == 0.0
+    assert snapshot(phase=Phase.DONE, files_total=1).overall == 1.0
+
+def test_meter_counts_and_emits(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr(progress.time, 'monotonic', lambda: clock[0])
+    emitted: list[MigrateProgress] = []
+    meter = ProgressMeter(emitted.append)
+    meter.set_totals(0, 3, 3000)
+    meter.set_phase(Phase.RUNNING) # 切换阶段时立即发出
+    assert len(emitted) == 1
+
+    clock[0] += 1
+    meter.add_file(1000)
+    clock[0] += 0.05
+    meter.add_file(1000, copied=False) # 距上次不到INTERVAL，不发出
+    assert len(emitted) == 2
+    p = meter.snapshot()
+    assert (p.files_done, p.bytes_done) == (2, 2000)
+    assert p.speed == 1000 # 跳过的文件不算进速度
+    assert p.eta == 1.0
+
+def test_format_helpers():
+    assert progress.format_bytes(512) == '512 B'
+    assert progress.format_bytes(1536) == '1.5 KB'
+    assert progress.format_eta(None) == '--:--'
+    assert progress.format_eta(75) == '01:15'
+    assert progress.format_eta(3725) == '1:02:05'
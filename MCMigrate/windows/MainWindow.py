@@ -18,13 +18,20 @@ class GlobalClickWatcher(QtCore.QObject):
         self.funcs.remove(func)
 
 class MainWindow(DisplayMessageable, QtWidgets.QMainWindow):
-    '''主窗口，所有界面都要通过该容器展示'''
+    '''
+    主窗口，所有界面都要通过该容器展示
+    \n界面放在一个QStackedWidget里，带cache_key的界面切走之后不会被删除，再次切换回来时直接显示（见cached_page()）
+    '''
     change_central_widget = QtCore.Signal()
     def __init__(self, app: QtWidgets.QApplication):
         super().__init__()
         # 添加全局鼠标点击监听器
         self.global_click_watcher = GlobalClickWatcher(self)
         app.installEventFilter(self.global_click_watcher)
+        # 界面容器
+        self.pages = QtWidgets.QStackedWidget(self)
+        self.cached_pages: dict[str, QtWidgets.QWidget] = {}
+        super().setCentralWidget(self.pages)
 
     def add_global_click_event(self, func: Callable[[QtGui.QMouseEvent], None]):
         '''
@@ -37,8 +44,40 @@ class MainWindow(DisplayMessageable, QtWidgets.QMainWindow):
         '''移除全局点击事件监听函数'''
         self.global_click_watcher.remove_runnable(func)
 
-    # 防止窗口在切换的时候悬浮组件被遮盖
-    def setCentralWidget(self, widget: QtWidgets.QWidget):
-        super().setCentralWidget(widget)
+    def setCentralWidget(self, widget: QtWidgets.QWidget, cache_key: str = None):
+        '''
+        切换显示的界面
+        Args:
+            widget: 要显示的界面
+            cache_key: 不为None时，界面切走之后保留在缓存里，之后可以通过cached_page(cache_key)取回；否则切走时删除
+        '''
+        previous = self.pages.currentWidget()
+        if cache_key is not None:
+            self.cached_pages[cache_key] = widget
+        if self.pages.indexOf(widget) == -1:
+            self.pages.addWidget(widget)
+        self.pages.setCurrentWidget(widget)
+        if previous is not None and previous is not widget and previous not in self.cached_pages.values():
+            self._remove_page(previous)
+        # 防止窗口在切换的时候悬浮组件被遮盖
         if self.message.current_message: self.message.current_message.raise_()
-        if self.dialog.current_dialog: self.dialog.current_dialog.raise_()
\ No newline at end of file
+        if self.dialog.current_dialog: self.dialog.current_dialog.raise_()
+        self.change_central_widget.emit()
+
+    def centralWidget(self) -> QtWidgets.QWidget | None:
+        '''当前显示的界面'''
+        return self.pages.currentWidget()
+
+    def cached_page(self, cache_key: str) -> QtWidgets.QWidget | None:
+        return self.cached_pages.get(cache_key)
+
+    def drop_cached_page(self, cache_key: str):
+        '''不再缓存该界面，正在显示的话等切走时再删除'''
+        page = self.cached_pages.pop(cache_key, None)
+        if page is not None and page is not self.pages.currentWidget():
+            self._remove_page(page)
+
+    def _remove_page(self, page: QtWidgets.QWidget):
+        self.pages.removeWidget(page)
+        page.hide()
+        page.deleteLater() # 切换窗口可能是由该界面自己的槽函数触发的，不能立即删除
\ No newline at end of file
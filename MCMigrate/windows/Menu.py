@@ -8,8 +8,8 @@ from pathlib import Path
 from terminal.Terminal import Terminal
 from terminal.func import config
 from windows.SendMessageable import SendMessageable
-from core.func import load_stylesheet, resource_path
 from message import Message, Dialog
+from core import StyleSheets
 
 class Menu(SendMessageable):
     def __init__(self, terminal: Terminal):
@@ -33,12 +33,10 @@ class OptionBar(QtWidgets.QTreeWidget):
         super().__init__(parent)
         self.setLayout(QtWidgets.QVBoxLayout())
         self.setObjectName('optionBar')
-        self.setStyleSheet((load_stylesheet('qss/menu.qss')))
 
         # 标题
         self.title = QtWidgets.QLabel('菜单')
         self.title.setObjectName('optionBarTitle')
-        self.title.setStyleSheet((load_stylesheet('qss/menu.qss')))
         self.layout().addWidget(self.title)
 
     def set_menu_xml(xml_path: Path):
@@ -59,6 +57,7 @@ class ContentArea(QtWidgets.QFrame):
 
 if __name__ == '__main__':
     app = QtWidgets.QApplication([])
+    StyleSheets.apply_app(app)
     window = MainWindow()
     terminal = Terminal(window)
     menu = Menu(terminal)
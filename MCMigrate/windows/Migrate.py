@@ -8,7 +8,7 @@ from windows.MainWindow import MainWindow
 from message import Message, Dialog
 from core.func import *
 from core.ClientLibs import ColorIconGenerator
-from core import WidgetLibs
+from core import WidgetLibs, StyleSheets, Icons
 import Geometry, MCException, Animation
 
 class Migrate(SendMessageable):
@@ -17,8 +17,9 @@ class Migrate(SendMessageable):
         super().__init__(terminal.main_window)
         self.terminal = terminal
         self.migrate_task = migrate_task
+        StyleSheets.apply(self, 'migrate') # 在创建子控件之前设置，子控件创建时只需按objectName匹配一次
         self.setWindowTitle("MCMigrator")
-        self.setWindowIcon(QtGui.QIcon(resource_path("assets/icon_64x64.png")))
+        self.setWindowIcon(Icons.icon("assets/icon_64x64.png"))
         self.layout = QtWidgets.QVBoxLayout()
 
         # 顶部栏
@@ -76,8 +77,8 @@ class Migrate(SendMessageable):
 
         # 版本列表
         self.list_box = QtWidgets.QHBoxLayout()
-        self.game_view_source = GameView(self.terminal.get_games(), self, self)
-        self.game_view_target = GameView(self.terminal.get_games(), self, self)
+        self.game_view_source = GameView(self, self)
+        self.game_view_target = GameView(self, self)
         logging.info(f"{self.game_view_source.game_selector.get_items_text()}")
         self.list_box.addWidget(self.game_view_source)
         self.arrow = Geometry.Arrow(self.game_view_source, self.game_view_target, "#aaaaaa")
@@ -90,11 +91,9 @@ class Migrate(SendMessageable):
         self.button_box = QtWidgets.QHBoxLayout()
         self.button_import = QtWidgets.QPushButton("导入版本路径")
         self.button_import.setObjectName("button_import")
-        self.button_import.setStyleSheet(load_stylesheet(resource_path("qss/migrate.qss")))
         self.button_import.clicked.connect(self.button_import_clicked)
         self.button_migrate = QtWidgets.QPushButton("开始迁移")
         self.button_migrate.setObjectName("button_migrate")
-        self.button_migrate.setStyleSheet(load_stylesheet(resource_path("qss/migrate.qss")))
         self.button_migrate.clicked.connect(self.button_migrate_clicked)
         self.button_box.addWidget(self.button_import)
         self.button_box.addWidget(self.button_migrate)
@@ -103,15 +102,16 @@ class Migrate(SendMessageable):
         # 布局调整
         self.setLayout(self.layout)
 
-        # 如果已经有迁移任务在进行，把任务详情的悬浮窗添加进来
-        if self.migrate_task:
-            self.button_migrate_detail = ButtonMigrateDetail(self.terminal, self)
-            self.button_migrate_detail.set_migrate_task(self.migrate_task)
-            self.migrate_task.update_migrate_general.connect(self.button_migrate_detail.update_percent)
+        # 游戏库发生改变时，同步更新两边的游戏目录与版本列表
+        self.terminal.library_changed.connect(self.on_library_changed)
+
+        # 如果队列里还有没完成的迁移任务（包括暂停的），把任务详情的悬浮窗添加进来
+        self.button_migrate_detail: ButtonMigrateDetail = None
+        self.terminal.scheduler.all_finished.connect(self.on_all_jobs_finished)
+        if self.terminal.scheduler.queue.has_unfinished():
+            self.add_button_migrate_detail()
             self.button_migrate_detail.show_directly()
-            self.terminal.thread_migrate.finished.connect(self.button_migrate_detail.close_with_animation)
-            if not self.migrate_task.is_calculating:
-                self.button_migrate_detail.update_percent()
+            self.button_migrate_detail.update_percent()
 
         # 用户操作记录部分
         self.load_app_state()
@@ -121,7 +121,7 @@ class Migrate(SendMessageable):
         # 游戏文件夹的选择
         ## 读取选择记录
         try:
-            if latest_game_folder_path:= get_app_state()['migrate']['latest_game_folder_path']:
+            if latest_game_folder_path:= app_state.get('migrate', 'latest_game_folder_path'):
                 if source:= self.terminal.get_game_by_path(latest_game_folder_path['source']):
                     self.game_view_source.switch_game_by_dict(source)
                 if target:= self.terminal.get_game_by_path(latest_game_folder_path['target']):
@@ -130,10 +130,7 @@ class Migrate(SendMessageable):
             logging.warning('加载app_state.json读取历史操作状态失败，使用默认设置')
         ## 关联切换游戏目录信号以记录操作
         def save_latest_game_folder_path(game_item: GameSelector.GameItem, is_source: bool):
-            state = get_app_state()
-            latest_game_folder_path = state['migrate'].get('latest_game_folder_path', None)
-            if latest_game_folder_path is None:
-                latest_game_folder_path = {'source': None, 'target': None}
+            latest_game_folder_path = app_state.get('migrate', 'latest_game_folder_path') or {'source': None, 'target': None}
             logging.debug(f"latest_game_folder_path: {latest_game_folder_path}")
             if is_source:
                 latest_game_folder_path['source'] = game_item.data['folder_path']
@@ -143,26 +140,49 @@ class Migrate(SendMessageable):
         self.game_view_source.switched.connect(lambda game_item: save_latest_game_folder_path(game_item, True))
         self.game_view_target.switched.connect(lambda game_item: save_latest_game_folder_path(game_item, False))
 
+    def activate(self, migrate_task: TaskMigrateAbortable=None):
+        '''
+        从缓存中重新显示时由Terminal.switch_window()调用
+        \n游戏库的变化已经由on_library_changed()实时更新了，这里只同步任务详情悬浮按钮
+        '''
+        self.migrate_task = migrate_task
+        if self.button_migrate_detail is None:
+            if self.terminal.scheduler.queue.has_unfinished():
+                self.add_button_migrate_detail()
+                self.button_migrate_detail.show_directly()
+                self.button_migrate_detail.update_percent()
+        else:
+            self.button_migrate_detail.update_percent()
+
+    @QtCore.Slot(str)
+    def on_library_changed(self, event: str):
+        '''游戏库改变后更新界面（数据直接来自内存里的游戏库，不会重新读取文件）'''
+        if not self.terminal.get_games(): # 已经没有游戏目录了，交给触发操作的地方去切换至欢迎界面
+            return
+        self.update_game()
+
     def button_refresh_all_vers_clicked(self):
-        if versions:= self.terminal.refresh_all_games():
-            # 刷新版本列表，如果遇到需要询问版本隔离的情况的话，下面代码不会执行，而是terminal手动执行switch_window()方法来刷新界面
-            self.game_view_source.update_games(versions)
-            self.game_view_target.update_games(versions)
-            self.window().update()
+        # 版本列表会在游戏库改变后通过on_library_changed()自动刷新
+        self.terminal.refresh_all_games()
 
     def button_import_clicked(self):
-        if versions:= self.terminal.import_version():
-            # 刷新版本列表，如果遇到需要询问版本隔离的情况的话，下面代码不会执行，而是terminal手动执行switch_window()方法来刷新界面
-            self.game_view_source.update_games(versions)
-            self.game_view_target.update_games(versions)
-            self.window().update()
+        # 版本列表会在游戏库改变后通过on_library_changed()自动刷新
+        if self.terminal.import_version():
             self.message.done("版本导入成功！")
 
+    def add_button_migrate_detail(self):
+        '''添加任务详情悬浮按钮，队列里的任务全部结束后通过on_all_jobs_finished()关闭'''
+        self.button_migrate_detail = ButtonMigrateDetail(self.terminal, self)
+        self.terminal.scheduler.progress_updated.connect(self.button_migrate_detail.update_percent)
+
+    @QtCore.Slot()
+    def on_all_jobs_finished(self):
+        if self.button_migrate_detail is not None:
+            self.button_migrate_detail.close_with_animation()
+            self.button_migrate_detail = None
+
     def button_migrate_clicked(self):
         # 条件检测
-        if self.terminal.thread_migrate.isRunning():
-            self.message.info("请先等待迁移完成")
-            return
         ver_source: dict = self.game_view_source.current_version()
         ver_target: dict = self.game_view_target.current_version()
         if ver_source == None or ver_target == None:
@@ -170,25 +190,25 @@ class Migrate(SendMessageable):
             self.message.info("请先选择迁移版本和目标版本")
             return
 
-        # 添加任务详情悬浮按钮
-        self.button_migrate_detail = ButtonMigrateDetail(self.terminal, self)
-        self.terminal.thread_migrate.finished.connect(self.button_migrate_detail.close_with_animation)
-        self.message.info(f"正在迁移 {ver_source.get('name')} 至 {ver_target.get('name')}")
-        
-        # 开始线程任务
+        # 加入迁移队列
         try:
-            self.terminal.migrate(source_json=ver_source, target_json=ver_target)
+            job = self.terminal.migrate(source_json=ver_source, target_json=ver_target)
         except MCException.VersionVerifyFailed as e:
             self.message.show_message(str(e), e.level)
-            self.button_migrate_detail.close()
             return
-        self.button_migrate_detail.set_migrate_task(self.terminal.task_migrate)
-        self.terminal.task_migrate.update_migrate_general.connect(self.button_migrate_detail.update_percent)
-        self.button_migrate_detail.show_with_animation()
+        if self.terminal.scheduler.task_of(job.id):
+            self.message.info(f"正在迁移 {ver_source.get('name')} 至 {ver_target.get('name')}")
+        else:
+            self.message.info(f"已加入迁移队列：{ver_source.get('name')} 至 {ver_target.get('name')}")
+
+        # 添加任务详情悬浮按钮
+        if self.button_migrate_detail is None:
+            self.add_button_migrate_detail()
+            self.button_migrate_detail.show_with_animation()
     
     def update_game(self):
-        self.game_view_target.update_games(self.terminal.get_games())
-        self.game_view_source.update_games(self.terminal.get_games())
+        self.game_view_target.update_games()
+        self.game_view_source.update_games()
 
     def btn_clear_all_vers_clicked(self):
         self.terminal.clear_all_games()
@@ -197,58 +217,257 @@ class Migrate(SendMessageable):
         
     def resizeEvent(self, event):
         super().resizeEvent(event)
-        if hasattr(self, 'button_migrate_detail'):
+        if getattr(self, 'button_migrate_detail', None) is not None:
             self.button_migrate_detail.move(self.width() - 100, self.height() - 135)
 
-class VersionList(QtWidgets.QListWidget):
+class VersionListModel(QtCore.QAbstractListModel):
+    '''版本列表的数据，每一行是一个版本json，直接引用游戏库给出的dict，不复制'''
+    VersionRole = QtCore.Qt.UserRole + 1
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.game_json: dict | None = None
+        self.versions: list[dict] = []
+
+    def rowCount(self, parent=QtCore.QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.versions)
+
+    def data(self, index: QtCore.QModelIndex, role: int = QtCore.Qt.DisplayRole):
+        if not index.isValid() or not 0 <= index.row() < len(self.versions):
+            return None
+        version = self.versions[index.row()]
+        if role == QtCore.Qt.DisplayRole:
+            return version.get('name', '未知版本名')
+        if role == QtCore.Qt.ToolTipRole:
+            return version.get('game_path')
+        if role == VersionListModel.VersionRole:
+            return version
+        return None
+
+    def set_game(self, game_json: dict | list[dict]):
+        '''
+        Args:
+            game_json(dict | list[dict]): 游戏目录json，或是直接给出版本列表
+        '''
+        self.beginResetModel()
+        if isinstance(game_json, dict):
+            self.game_json, self.versions = game_json, list(game_json['versions'])
+        else:
+            self.versions = list(game_json or [])
+        self.endResetModel()
+
+class VersionItemDelegate(QtWidgets.QStyledItemDelegate):
     '''
+    绘制版本卡片（加载器图标、启动器/加载器/隔离标签、版本名、版本号和路径），只有显示在屏幕上的行才会绘制
+    \n鼠标悬停的卡片右侧会浮现打开文件夹和移除两个按钮，点击通过folder_clicked/delete_clicked发出
+    '''
+    folder_clicked = QtCore.Signal(QtCore.QModelIndex)
+    delete_clicked = QtCore.Signal(QtCore.QModelIndex)
+
+    ROW_HEIGHT = 64
+    ICON_SIZE = 36
+    BAR_WIDTH = 50
+    BUTTON_ICON_SIZE = 16 # (ROW_HEIGHT - 16) // 2 - 8，悬浮按钮里图标的边长
+    MOD_LOADER_ICONS = ('fabric', 'neoforge', 'forge', 'quilt', 'release', 'optifine', 'snapshot', 'unknown')
+    BUTTONS = { # 按钮: (图标, 提示, 背景色, 悬停色, 按下色)
+        'folder': ('assets/folder.svg', '打开该版本文件夹', '#92e9ba2e', '#deffcf3e', '#dfc99b3e'),
+        'delete': ('assets/delete.svg', '从列表中移除该版本（不会删除本体文件）', '#88d52d0f', '#dbe33a3d', '#e4ce213e')
+    }
+
+    def __init__(self, view: 'VersionList'):
+        super().__init__(view)
+        self.view = view
+        self._button_icons = {name: Icons.icon(icon, (self.BUTTON_ICON_SIZE,)) for name, (icon, *_) in self.BUTTONS.items()}
+        self.tag_font = QtGui.QFont(view.font())
+        self.tag_font.setPixelSize(12)
+        self.tag_font.setBold(True)
+        self.name_font = QtGui.QFont(view.font())
+        self.name_font.setPixelSize(14)
+        self.name_font.setBold(True)
+        self.path_font = QtGui.QFont(view.font())
+        self.path_font.setPixelSize(10)
+
+    def sizeHint(self, option: QtWidgets.QStyleOptionViewItem, index: QtCore.QModelIndex) -> QtCore.QSize:
+        return QtCore.QSize(max(0, self.view.viewport().width() - 2 * self.view.spacing()), self.ROW_HEIGHT)
+
+    def mod_loader_icon(self, mod_loader: str) -> QtGui.QPixmap:
+        '''按加载器名称取图标（由Icons缓存，按屏幕的设备像素比栅格化）'''
+        key = next((key for key in self.MOD_LOADER_ICONS if key in (mod_loader or '').lower()), 'unknown')
+        return Icons.pixmap(f"assets/icon/{key}.png", self.ICON_SIZE, self.view.devicePixelRatioF())
+
+    def card_rect(self, option_rect: QtCore.QRect) -> QtCore.QRect:
+        return option_rect.adjusted(2, 2, -2, -2)
+
+    def button_rects(self, option_rect: QtCore.QRect) -> dict[str, QtCore.QRect]:
+        '''悬浮操作栏中各按钮的位置（上下排列）'''
+        card = self.card_rect(option_rect)
+        bar = QtCore.QRect(card.right() - self.BAR_WIDTH - 8, card.top() + 5, self.BAR_WIDTH, card.height() - 10)
+        half = (bar.height() - 2) // 2
+        return {
+            'folder': QtCore.QRect(bar.left(), bar.top(), bar.width(), half),
+            'delete': QtCore.QRect(bar.left(), bar.top() + half + 2, bar.width(), half)
+        }
+
+    def button_at(self, option_rect: QtCore.QRect, pos: QtCore.QPoint) -> str | None:
+        for name, rect in self.button_rects(option_rect).items():
+            if rect.contains(pos):
+                return name
+        return None
+
+    def paint(self, painter: QtGui.QPainter, option: QtWidgets.QStyleOptionViewItem, index: QtCore.QModelIndex):
+        version: dict = index.data(VersionListModel.VersionRole)
+        if version is None:
+            return
+        painter.save()
+        painter.setRenderHint(QtGui.QPainter.Antialiasing)
+        card = self.card_rect(option.rect)
+
+        # 卡片背景
+        painter.setPen(QtCore.Qt.NoPen)
+        painter.setBrush(QtGui.QColor('#bbdde7') if option.state & QtWidgets.QStyle.State_Selected else QtGui.QColor('#ffffff'))
+        painter.drawRoundedRect(card, 8, 8)
+
+        # 加载器图标
+        icon_bg = QtCore.QRect(card.left() + 5, card.center().y() - self.ICON_SIZE // 2 - 2, self.ICON_SIZE + 4, self.ICON_SIZE + 4)
+        painter.setBrush(QtGui.QColor('#CDF0F1'))
+        painter.drawRoundedRect(icon_bg, 10, 10)
+        painter.drawPixmap(icon_bg.left() + 2, icon_bg.top() + 2, self.mod_loader_icon(version.get('mod_loader', 'unknown')))
+
+        # 第一行：启动器、加载器、隔离标签和版本名
+        left = icon_bg.right() + 10
+        right = card.right() - 8
+        top = card.top() + 6
+        x = self._draw_tag(painter, left, top, version.get('launcher', '未知启动器') or '未知启动器', '#42abb5')
+        x = self._draw_tag(painter, x, top, version.get('mod_loader', '未知Mod加载器'), '#57b37a')
+        if not version.get('is_indie', False):
+            x = self._draw_tag(painter, x, top, '非隔离版本', '#e7af46')
+        painter.setFont(self.name_font)
+        painter.setPen(QtGui.QColor('#333333'))
+        name_rect = QtCore.QRect(x, top, max(0, right - x), self._tag_height())
+        painter.drawText(name_rect, QtCore.Qt.AlignLeft | QtCore.Qt.AlignVCenter, painter.fontMetrics().elidedText(version.get('name', '未知版本名'), QtCore.Qt.ElideRight, name_rect.width()))
+
+        # 第二行：版本号和路径
+        top = card.bottom() - 6 - self._tag_height()
+        x = self._draw_tag(painter, left, top, version.get('version', '未知版本'), '#46b7e7')
+        painter.setFont(self.path_font)
+        path_rect = QtCore.QRect(x, top + 2, max(0, right - x), self._tag_height() - 4)
+        text = painter.fontMetrics().elidedText(version.get('game_path', '未知路径'), QtCore.Qt.ElideMiddle, path_rect.width() - 6)
+        path_rect.setWidth(min(path_rect.width(), painter.fontMetrics().horizontalAdvance(text) + 6))
+        painter.setPen(QtCore.Qt.NoPen)
+        painter.setBrush(QtGui.QColor('#f3fbff'))
+        painter.drawRoundedRect(path_rect, 2, 2)
+        painter.setPen(QtGui.QColor('#212121'))
+        painter.drawText(path_rect, QtCore.Qt.AlignCenter, text)
+
+        # 悬浮操作栏
+        if index.row() == self.view.hover_row and self.view.hover_opacity > 0:
+            self._draw_buttons(painter, option.rect)
+        painter.restore()
+
+    def _tag_height(self) -> int:
+        return QtGui.QFontMetrics(self.tag_font).height() + 6
+
+    def _draw_tag(self, painter: QtGui.QPainter, x: int, top: int, text: str, color: str) -> int:
+        '''绘制圆角标签，返回下一个元素的起始x'''
+        painter.setFont(self.tag_font)
+        rect = QtCore.QRect(x, top, painter.fontMetrics().horizontalAdvance(text) + 8, self._tag_height())
+        painter.setPen(QtCore.Qt.NoPen)
+        painter.setBrush(QtGui.QColor(color))
+        painter.drawRoundedRect(rect, 4, 4)
+        painter.setPen(QtGui.QColor('#ffffff'))
+        painter.drawText(rect, QtCore.Qt.AlignCenter, text)
+        return rect.right() + 6
+
+    def _draw_buttons(self, painter: QtGui.QPainter, option_rect: QtCore.QRect):
+        painter.setOpacity(self.view.hover_opacity)
+        hovered = self.button_at(option_rect, self.view.mouse_pos)
+        for name, rect in self.button_rects(option_rect).items():
+            _, _, color, hover_color, pressed_color = self.BUTTONS[name]
+            if name == hovered:
+                color = pressed_color if self.view.pressed_button == name else hover_color
+            painter.setPen(QtCore.Qt.NoPen)
+            painter.setBrush(QtGui.QColor(color))
+            painter.drawRoundedRect(rect, 5, 5)
+            side = min(rect.width(), rect.height()) - 8
+            self._button_icons[name].paint(painter, QtCore.QRect(rect.center().x() - side // 2, rect.center().y() - side // 2, side, side))
+
+    def editorEvent(self, event: QtCore.QEvent, model, option: QtWidgets.QStyleOptionViewItem, index: QtCore.QModelIndex) -> bool:
+        # 点在悬浮按钮上的事件由按钮处理，不改变选中的版本
+        if event.type() in (QtCore.QEvent.MouseButtonPress, QtCore.QEvent.MouseButtonRelease, QtCore.QEvent.MouseButtonDblClick) \
+                and index.row() == self.view.hover_row and event.button() == QtCore.Qt.LeftButton:
+            button = self.button_at(option.rect, event.position().toPoint())
+            if button is not None:
+                if event.type() == QtCore.QEvent.MouseButtonPress:
+                    self.view.pressed_button = button
+                elif event.type() == QtCore.QEvent.MouseButtonRelease:
+                    if self.view.pressed_button == button:
+                        (self.folder_clicked if button == 'folder' else self.delete_clicked).emit(index)
+                    self.view.pressed_button = None
+                self.view.viewport().update(option.rect)
+                return True
+        if event.type() == QtCore.QEvent.MouseButtonRelease:
+            self.view.pressed_button = None
+        return super().editorEvent(event, model, option, index)
+
+    def helpEvent(self, event: QtGui.QHelpEvent, view, option: QtWidgets.QStyleOptionViewItem, index: QtCore.QModelIndex) -> bool:
+        if event.type() == QtCore.QEvent.ToolTip and index.row() == self.view.hover_row:
+            button = self.button_at(option.rect, event.pos())
+            if button is not None:
+                QtWidgets.QToolTip.showText(event.globalPos(), self.BUTTONS[button][1], view)
+                return True
+        return super().helpEvent(event, view, option, index)
+
+class VersionList(QtWidgets.QListView):
+    '''
+    版本列表，数据在VersionListModel中，卡片由VersionItemDelegate绘制，不为每个版本创建控件
+    \n所有行高度相同（setUniformItemSizes），版本再多，创建和切换列表的开销也只和显示出来的行数有关
     Args:
         game_json(dict): 游戏目录json
     '''
+    HOVER_DURATION = 60 # 悬浮操作栏淡入淡出的时长（毫秒）
     def __init__(self, game_json: dict, parent, migrate_window: Migrate):
         super().__init__(parent)
         self.migrate_window = migrate_window
-        self.game_json = game_json
-        # 样式设置
-        for ver in game_json['versions']:
-            self.add_item(VersionItem(ver, self))
-        self.setStyleSheet(resource_path(load_stylesheet(resource_path("qss/migrate.qss"))))
+        self.version_model = VersionListModel(self)
+        self.setModel(self.version_model)
+        self.delegate = VersionItemDelegate(self)
+        self.setItemDelegate(self.delegate)
+        self.delegate.folder_clicked.connect(self.open_folder)
+        self.delegate.delete_clicked.connect(self.delete_ver)
+
+        # 样式设置（规则在migrate.qss里，由Migrate统一设置）
+        self.setObjectName('versionList')
         self.setSpacing(5)
-
-        # 通过监听滑条移动来动态调整实现VersionItem的FloatBar工具栏与列表相对静止
-        self.hover_item: VersionItem = None
-        self.h_scroll_value = 0
-        self.scroll_max = self.horizontalScrollBar().maximum()
-        self.scroll_pagestep = self.horizontalScrollBar().pageStep()
-        
-        self.horizontalScrollBar().valueChanged.connect(self.on_scroll)
-    
-    # 保持水平移动列表时，悬浮工具栏仍可以相对固定列表靠右处
-    def on_scroll(self, value: int):
-        self.h_scroll_value = value
-        if self.hover_item:
-            self.hover_item.float_bar.move(self.viewport().width() - self.hover_item.float_bar.width() - 10 + value, 5)
-    
-    def add_item(self, version_item: 'VersionItem'):
-        item = QtWidgets.QListWidgetItem()
-        self.addItem(item)
-        item.setSizeHint(version_item.sizeHint())
-        self.setItemWidget(item, version_item)
-    
-    def apply_game(self, game_json: dict):
+        self.setUniformItemSizes(True)
+        self.setResizeMode(QtWidgets.QListView.Adjust) # 列表宽度改变时重新排列，卡片跟着变宽
+        self.setVerticalScrollMode(QtWidgets.QAbstractItemView.ScrollPerPixel)
+        self.setHorizontalScrollBarPolicy(QtCore.Qt.ScrollBarAlwaysOff) # 卡片跟随列表宽度，过长的名称和路径会被省略
+        self.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+
+        # 悬浮操作栏的状态，由delegate绘制时读取
+        self.setMouseTracking(True)
+        self.hover_row = -1
+        self.hover_opacity = 0.0
+        self.mouse_pos = QtCore.QPoint(-1, -1)
+        self.pressed_button: str | None = None
+        self.hover_anim = QtCore.QVariantAnimation(self)
+        self.hover_anim.setDuration(self.HOVER_DURATION)
+        self.hover_anim.valueChanged.connect(self._set_hover_opacity)
+        self.hover_anim.finished.connect(self._on_hover_anim_finished)
+
+        self.apply_game(game_json)
+
+    @property
+    def game_json(self) -> dict | None:
+        return self.version_model.game_json
+
+    def apply_game(self, game_json: dict | list[dict]):
         '''
         应用版本列表
         Args:
-            versions(dict): 游戏目录json
+            game_json(dict | list[dict]): 游戏目录json，或是版本列表
         '''
-        self.clear()
-        self.game_json = game_json
-        if isinstance(game_json, dict): # 游戏目录dict
-            for ver in game_json['versions']:
-                self.add_item(VersionItem(ver, self))
-        elif isinstance(game_json, list): # 游戏版本列表
-            for ver in game_json:
-                self.add_item(VersionItem(ver, self))
+        self.hover_row = -1
+        self.version_model.set_game(game_json)
         logging.debug("已更新版本列表")
 
     def refresh(self):
@@ -259,248 +478,105 @@ class VersionList(QtWidgets.QListWidget):
         else: # 该游戏目录不存在
             raise MCException.NoSuchGameFolder()
 
-
-class VersionItem(QtWidgets.QWidget):
-    def __init__(self, json: dict, parent_list: VersionList):
-        super().__init__(parent=parent_list)
-        self.setObjectName("VersionItem")
-        self.json = json
-        self.list = parent_list
-
-        # 总容器
-        self.setLayout(QtWidgets.QHBoxLayout())
-        self.layout().setSpacing(5)
-        self.layout().setContentsMargins(5, 5, 5, 5)
-
-        # 加载器图标
-        self.mod_loader_icon = self.get_icon(self.json.get('mod_loader', 'unknown'))
-        self.mod_loader_icon.setObjectName("mod_loader_icon")
-        self.setStyleSheet(load_stylesheet(resource_path("qss/migrate.qss")))
-        self.mod_loader_icon.setStyleSheet(load_stylesheet(resource_path("qss/migrate.qss")))
-        self.layout().addWidget(self.mod_loader_icon, 0)
-
-        # 版本信息容器
-        self.info = QtWidgets.QWidget()
-        self.info.setObjectName('info')
-        self.info.setStyleSheet(load_stylesheet(resource_path("qss/migrate.qss")))
-        self.info_layout = QtWidgets.QVBoxLayout()
-        self.info_layout.setSpacing(0)
-        self.info_layout.setContentsMargins(0, 0, 0, 0)
-        self.info.setLayout(self.info_layout)
-        self.layout().addWidget(self.info, 1)
-
-        # 游戏版本名及其加载器、版本隔离标签的容器
-        self.info_name = QtWidgets.QWidget()
-        self.info_name.setObjectName('info_name')
-        self.info_name.setStyleSheet(load_stylesheet(resource_path("qss/migrate.qss")))
-        self.info_name_layout = QtWidgets.QHBoxLayout()
-        self.info_name.setLayout(self.info_name_layout)
-        self.info_layout.addWidget(self.info_name)
-
-        # 启动器标签
-        self.launcher = QtWidgets.QLabel(json.get('launcher', '未知启动器') or '未知启动器')
-        self.launcher.setObjectName('launcher_label')
-        self.launcher.setStyleSheet(load_stylesheet(resource_path("qss/migrate.qss")))
-        self.info_name_layout.addWidget(self.launcher, 0)
-
-        # 加载器标签
-        self.mod_loader = QtWidgets.QLabel(json.get('mod_loader', '未知Mod加载器'))
-        self.mod_loader.setObjectName('mod_loader_label')
-        self.mod_loader.setStyleSheet(load_stylesheet(resource_path("qss/migrate.qss")))
-        self.info_name_layout.addWidget(self.mod_loader, 0)
-
-        # 版本隔离标签
-        if not json.get('is_indie', False):
-            self.is_indie = QtWidgets.QLabel('非隔离版本')
-            self.is_indie.setObjectName('indie_label')
-            self.is_indie.setStyleSheet(load_stylesheet(resource_path("qss/migrate.qss")))
-            self.info_name_layout.addWidget(self.is_indie, 0)
-
-        # 游戏版本名
-        self.name = QtWidgets.QLabel(json.get('name', "未知版本名"))
-        self.name.setObjectName('name_label')
-        self.name.setStyleSheet(load_stylesheet(resource_path("qss/migrate.qss")))
-        self.info_name_layout.addWidget(self.name, 1)
-
-        self.info_name_layout.addStretch()
-
-        # 版本号、启动器标签和版本文件路径的容器
-        self.info_detail = QtWidgets.QWidget()
-        self.info_detail.setObjectName('info_detail')
-        self.info_detail.setStyleSheet(load_stylesheet(resource_path("qss/migrate.qss")))
-        self.info_detail_layout = QtWidgets.QHBoxLayout()
-        self.info_detail.setLayout(self.info_detail_layout)
-        self.info_layout.addWidget(self.info_detail)
-
-        # 版本号
-        self.ver = QtWidgets.QLabel(json.get('version', '未知版本'))
-        self.ver.setObjectName("version_label")
-        self.ver.setStyleSheet(load_stylesheet(resource_path("qss/migrate.qss")))
-        self.info_detail_layout.addWidget(self.ver, 0)
-
-        # 版本文件路径
-        self.path = QtWidgets.QLabel(json.get('game_path', '未知路径'))
-        self.path.setObjectName("path_label")
-        self.path.setStyleSheet(load_stylesheet(resource_path("qss/migrate.qss")))
-        self.info_detail_layout.addWidget(self.path, 1)
-
-        self.info_detail_layout.addStretch()
-
-        # 悬浮操作栏
-        self.float_bar = VersionItem.FloatBar(self, self.list.migrate_window)
-
-    def resizeEvent(self, event): # 这里存放根据卡片大小来确定自身大小的widget
-        self.float_bar.setFixedSize(50, self.height()-10)
-        super().resizeEvent(event)
-    
-    # 悬浮工具栏的显示逻辑
-    def enterEvent(self, event):
-        self.float_bar.move(self.list.viewport().width() - self.float_bar.width() - 10 + self.list.h_scroll_value, 5)
-        self.float_bar.display_ui()
-        self.list.hover_item = self
-        super().enterEvent(event)
+    def current_version(self) -> dict | None:
+        index = self.currentIndex()
+        return index.data(VersionListModel.VersionRole) if index.isValid() else None
+
+    # 悬浮操作栏的显示逻辑
+    def mouseMoveEvent(self, event: QtGui.QMouseEvent):
+        self.mouse_pos = event.position().toPoint()
+        row = self.indexAt(self.mouse_pos).row()
+        if row != self.hover_row:
+            self._update_row(self.hover_row)
+            self.hover_row = row
+            self._fade_hover(0.0, 1.0 if row >= 0 else 0.0)
+        self._update_row(row) # 按钮的悬停颜色
+        super().mouseMoveEvent(event)
 
     def leaveEvent(self, event):
-        self.list.hover_item = None
-        self.float_bar.hide_ui()
+        self.mouse_pos = QtCore.QPoint(-1, -1)
+        self.pressed_button = None
+        self._fade_hover(self.hover_opacity, 0.0)
         super().leaveEvent(event)
 
-    def get_icon(self, mod_loader: str = None) -> QtWidgets.QLabel:
-        mod_loaders = {
-            "fabric": resource_path("assets/icon/fabric.png"),
-            "neoforge": resource_path("assets/icon/neoforge.png"),
-            "forge": resource_path("assets/icon/forge.png"),
-            "quilt": resource_path("assets/icon/quilt.png"),
-            "release": resource_path("assets/icon/release.png"),
-            "optifine": resource_path("assets/icon/optifine.png"),
-            "snapshot": resource_path("assets/icon/snapshot.png"),
-            "unknown": resource_path("assets/icon/unknown.png")
-        }
-        for key in mod_loaders.keys():
-            if key in (mod_loader or "").lower():
-                pixmap = QtGui.QPixmap(mod_loaders[key]).scaled(36, 36)
-                label = QtWidgets.QLabel()
-                label.setPixmap(pixmap)
-                return label
-                
-        pixmap = QtGui.QPixmap(resource_path("assets/icon/unknown.png")).scaled(36, 36)
-        label = QtWidgets.QLabel()
-        label.setPixmap(pixmap)
-        return label
-    
-    class FloatBar(QtWidgets.QFrame):
-        def __init__(self, parent_widget: 'VersionItem', migrate_window: Migrate):
-            super().__init__(parent_widget)
-            self.parent_item = parent_widget
-            self.migrate_window = migrate_window
-            # 总样式设置
-            self.setLayout(QtWidgets.QVBoxLayout())
-            self.layout().setSpacing(2)
-
-            self.setSizePolicy(QtWidgets.QSizePolicy.Fixed, QtWidgets.QSizePolicy.Expanding)
-            self.setObjectName('float_bar')
-            self.setStyleSheet(load_stylesheet(resource_path('qss/migrate.qss')))
-
-            # 打开文件夹
-            # 按钮
-            self.folder_btn = QtWidgets.QPushButton()
-            self.folder_btn.setObjectName('folder_btn')
-            self.folder_btn.setStyleSheet(load_stylesheet(resource_path('qss/migrate.qss')))
-            self.folder_btn.setContentsMargins(0,0,0,0)
-            self.folder_btn.setSizePolicy(QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Expanding)
-            self.folder_btn.setToolTip('打开该版本文件夹')
-            self.folder_btn.clicked.connect(self.open_folder)
-            self.folder_btn.setIcon(QtGui.QIcon(resource_path('assets/folder.svg')))
-            self.layout().addWidget(self.folder_btn)
-
-            # 删除键
-            # 按钮
-            self.del_btn = QtWidgets.QPushButton()
-            self.del_btn.setObjectName('del_btn')
-            self.del_btn.setStyleSheet(load_stylesheet(resource_path('qss/migrate.qss')))
-            self.del_btn.setContentsMargins(0,0,0,0)
-            self.del_btn.setSizePolicy(QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Expanding)
-            self.del_btn.setToolTip('从列表中移除该版本（不会删除本体文件）')
-            self.del_btn.clicked.connect(self.delete_ver)
-            self.layout().addWidget(self.del_btn)
-            # icon
-            self.del_btn.setIcon(QtGui.QIcon(resource_path('assets/delete.svg')))
-
-            self.opacity_effect = QtWidgets.QGraphicsOpacityEffect(self)
-            self.opacity_effect.setOpacity(0.0)
-            self.setGraphicsEffect(self.opacity_effect)
-            self.hide()
-
-        def open_folder(self):
-            if Path.exists(Path(self.parent_item.path.text())):
-                QtGui.QDesktopServices.openUrl(QtCore.QUrl.fromLocalFile(self.parent_item.path.text()))
-            else:
-                self.migrate_window.message.error('无法打开文件夹，可能版本文件夹本体已被删除！')
-        
-        def delete_ver(self):
-            def delete():
+    def _fade_hover(self, start: float, end: float):
+        self.hover_anim.stop()
+        self.hover_anim.setStartValue(start)
+        self.hover_anim.setEndValue(end)
+        self.hover_anim.start()
+
+    def _set_hover_opacity(self, value: float):
+        self.hover_opacity = value
+        self._update_row(self.hover_row)
+
+    def _on_hover_anim_finished(self):
+        if self.hover_opacity <= 0.0 and not self.underMouse():
+            self._update_row(self.hover_row)
+            self.hover_row = -1
+
+    def _update_row(self, row: int):
+        if row >= 0:
+            self.viewport().update(self.visualRect(self.version_model.index(row)))
+
+    # 悬浮操作栏的按钮
+    @QtCore.Slot(QtCore.QModelIndex)
+    def open_folder(self, index: QtCore.QModelIndex):
+        version: dict = index.data(VersionListModel.VersionRole)
+        if version is None:
+            return
+        path = version.get('game_path', '')
+        if path and Path(path).exists():
+            QtGui.QDesktopServices.openUrl(QtCore.QUrl.fromLocalFile(path))
+        else:
+            self.migrate_window.message.error('无法打开文件夹，可能版本文件夹本体已被删除！')
+
+    @QtCore.Slot(QtCore.QModelIndex)
+    def delete_ver(self, index: QtCore.QModelIndex):
+        version: dict = index.data(VersionListModel.VersionRole)
+        game_json = self.game_json
+        if version is None:
+            return
+        def delete():
+            try:
+                # 从列表中移除目标条目
                 try:
-                    # 从列表中移除目标条目
-                    try:
-                        self.migrate_window.terminal.remove_version(self.parent_item.list.game_json, self.parent_item.json)
-                    except MCException.NoSuchVersion:
-                        self.migrate_window.message.info("未在列表中找到该版本，已跳过移除。")
-                        return
-                    except MCException.NoSuchGameFolder:
-                        self.migrate_window.message.info("未在列表中找到该版本所属的游戏目录，已跳过移除。")
-                        ### 这里要补足去除该游戏目录或是重新刷新版本列表的逻辑
-                        return
-                        
-                    # 更新界面列表（同时更新源和目标列表）
-                    try:
-                        self.parent_item.list.migrate_window.game_view_source.refresh_list_view()
-                        self.parent_item.list.migrate_window.game_view_target.refresh_list_view()
-                    except Exception:
-                        logging.exception("更新版本列表 UI 时出错")
-
-                except (OSError, IOError) as e:
-                    logging.exception("文件操作失败")
-                    self.migrate_window.message.error(f"文件操作失败：{e}")
-                except json.JSONDecodeError as e:
-                    logging.exception("JSON 解析失败")
-                    self.migrate_window.message.error(f"读取版本列表失败：{e}")
-                except Exception as e:
-                    logging.exception("移除版本时发生未知错误")
-                    self.migrate_window.message.error(f"移除版本失败：{e}")
-                self.migrate_window.message.done("已成功移除 ！")
-
-            self.migrate_window.dialog.warning(
-                "确定要从列表中移除该版本吗？",
-                "在列表中移除该版本不会对游戏文件产生影响。",
-                ("确定", Dialog.Level.ERROR, delete),
-                close_when_clicked_any_btn=True
-            )
-
-        def display_ui(self):
-            self.show()
-            self.anim = QtCore.QPropertyAnimation(self.graphicsEffect(), b"opacity")
-            self.anim.setDuration(60)
-            self.anim.setStartValue(self.graphicsEffect().opacity())
-            self.anim.setEndValue(1.0)
-            self.anim.start()
-
-        def hide_ui(self):
-            self.anim = QtCore.QPropertyAnimation(self.graphicsEffect(), b"opacity")
-            self.anim.setDuration(60)
-            self.anim.setStartValue(self.graphicsEffect().opacity())
-            self.anim.setEndValue(0.0)
-            self.anim.finished.connect(self.hide)
-            self.anim.start()
-            self.show()  # 确保在动画期间可见
-            
+                    self.migrate_window.terminal.remove_version(game_json, version)
+                except MCException.NoSuchVersion:
+                    self.migrate_window.message.info("未在列表中找到该版本，已跳过移除。")
+                    return
+                except MCException.NoSuchGameFolder:
+                    self.migrate_window.message.info("未在列表中找到该版本所属的游戏目录，已跳过移除。")
+                    ### 这里要补足去除该游戏目录或是重新刷新版本列表的逻辑
+                    return
+                # 界面列表会在游戏库改变后自动更新（同时更新源和目标列表）
+
+            except (OSError, IOError) as e:
+                logging.exception("文件操作失败")
+                self.migrate_window.message.error(f"文件操作失败：{e}")
+            except json.JSONDecodeError as e:
+                logging.exception("JSON 解析失败")
+                self.migrate_window.message.error(f"读取版本列表失败：{e}")
+            except Exception as e:
+                logging.exception("移除版本时发生未知错误")
+                self.migrate_window.message.error(f"移除版本失败：{e}")
+            self.migrate_window.message.done("已成功移除 ！")
+
+        self.migrate_window.dialog.warning(
+            "确定要从列表中移除该版本吗？",
+            "在列表中移除该版本不会对游戏文件产生影响。",
+            ("确定", Dialog.Level.ERROR, delete),
+            close_when_clicked_any_btn=True
+        )
+
 class GameView(QtWidgets.QFrame):
+    '''游戏目录选择与版本列表，游戏目录数据直接取自terminal的游戏库，不保存副本'''
     switched = QtCore.Signal(object) # 切换游戏目录时发出的信号，参数为游戏目录json
-    def __init__(self, games_json: list[dict], parent, migrate_window: Migrate):
+    def __init__(self, parent, migrate_window: Migrate):
         super().__init__(parent)
         self.setLayout(QtWidgets.QVBoxLayout())
         self.layout().setContentsMargins(2,2,2,2)
         self.migrate_window = migrate_window # 用于弹窗消息的发送
-        self.games_json = games_json # 游戏文件夹json
+        games_json = migrate_window.terminal.get_games()
         self.current_game_item: GameSelector.GameItem = None
 
         # 顶部栏（游戏文件夹选项+打开文件夹按钮）
@@ -510,16 +586,16 @@ class GameView(QtWidgets.QFrame):
         self.top_bar.layout().setSpacing(1)
         self.layout().addWidget(self.top_bar)
         # 游戏文件夹选项
-        self.game_selector = GameSelector(self.games_json[0]['folder_name'], self, migrate_window)
+        self.game_selector = GameSelector(games_json[0]['folder_name'], self, migrate_window)
         self.top_bar.layout().addWidget(self.game_selector, 2)
-        self.game_selector.update(self.games_json) # 加载选项
+        self.game_selector.update(games_json) # 加载选项
         self.top_bar.setMaximumHeight(self.game_selector.height()) # 将游戏文件夹选项的高度设置为最大高度
         # 刷新按钮
         self.refresh_btn = WidgetLibs.TransparentColorButton(QtGui.QColor("#77D380"), QtGui.QColor("#4BBD68"), resource_path("assets/refresh.svg"), '刷新该游戏文件夹', self.top_bar)
         self.refresh_btn.setFixedWidth(32)
         def refresh_game():
             try:
-                if new_games:= migrate_window.terminal.refresh_game(self.version_view.game_json):
+                if migrate_window.terminal.refresh_game(self.version_view.game_json):
                     d_versions_num = len(migrate_window.terminal.get_game_by_path(self.current_game_item.data['folder_path'])['versions']) - len(self.current_game_item.data['versions'])
                     text = ''
                     if d_versions_num < 0:
@@ -527,10 +603,9 @@ class GameView(QtWidgets.QFrame):
                     else:
                         text += f'增加{d_versions_num}个版本'
                     self.migrate_window.message.done('已更新游戏版本列表,' + text)
-                    self.update_games(new_games)
             except MCException.NoSuchGameFolder:
                 self.migrate_window.message.info('该游戏目录不存在, 已自动清除')
-                self.update_games(self.migrate_window.terminal.get_games())
+                self.update_games()
             
         self.refresh_btn.clicked.connect(refresh_game)
         self.top_bar.layout().addWidget(self.refresh_btn)
@@ -541,7 +616,7 @@ class GameView(QtWidgets.QFrame):
         self.top_bar.layout().addWidget(self.folder_btn, 0)
 
         # 版本列表
-        self.version_view = VersionList(self.games_json[0], self, migrate_window)
+        self.version_view = VersionList(games_json[0], self, migrate_window)
         self.layout().addWidget(self.version_view)
 
         # 将选中的游戏版本信息的信号，绑定给版本列表
@@ -554,8 +629,8 @@ class GameView(QtWidgets.QFrame):
         else:
             self.migrate_window.message.error('无法打开文件夹，可能游戏文件夹本体已被删除！')
 
-    def current_version(self):
-        return self.version_view.itemWidget(self.version_view.currentItem()).json
+    def current_version(self) -> dict | None:
+        return self.version_view.current_version()
 
     def switch_game(self, game_item: 'GameSelector.GameItem'):
         '''切换游戏目录'''
@@ -581,12 +656,10 @@ class GameView(QtWidgets.QFrame):
         except MCException.NoSuchGameFolder:
             logging.warning("未找到该游戏文件夹")
 
-    def update_games(self, games_json: list[dict]):
-        '''更新游戏目录列表'''
-        self.games_json = games_json
-        
+    def update_games(self):
+        '''按照terminal当前的游戏库更新游戏目录列表'''
         # 更新选项卡列表
-        self.game_selector.update(games_json)
+        self.game_selector.update(self.migrate_window.terminal.get_games())
 
         # 更新版本列表
         try:
@@ -700,23 +773,22 @@ class GameSelector(WidgetLibs.CollapsibleBox):
                 self.setSizePolicy(QtWidgets.QSizePolicy.Fixed, QtWidgets.QSizePolicy.Expanding)
                 self.setFixedWidth(28) # 本来是想根据按钮的高度来调整宽度的，算了先这样硬编码吧
                 self.setObjectName('float_bar')
-                self.setStyleSheet(load_stylesheet(resource_path('qss/migrate.qss')))
                 self.setAttribute(QtCore.Qt.WA_AlwaysStackOnTop, True)
 
                 # 删除键
                 # 按钮
                 self.del_btn = QtWidgets.QPushButton(self)
                 self.del_btn.setObjectName('del_btn')
-                self.del_btn.setStyleSheet(load_stylesheet(resource_path('qss/migrate.qss')))
                 self.del_btn.setFixedSize(28, 28)
                 self.del_btn.setToolTip('从列表中移除该游戏文件夹（不会删除本体文件）')
                 self.del_btn.clicked.connect(self.delete_ver)
                 self.layout().addWidget(self.del_btn, 1)
                 # icon
-                self.del_btn.setIcon(QtGui.QIcon(resource_path('assets/delete.svg')))
+                self.del_btn.setIcon(Icons.icon('assets/delete.svg', (16,)))
 
                 # 初始化
                 self.hide()
+                self.fade = Animation.Fade(self, duration_in=60, duration_out=60)
             
             def delete_ver(self):
                 def delete():
@@ -734,13 +806,7 @@ class GameSelector(WidgetLibs.CollapsibleBox):
                         if self.migrate_window.terminal.get_games() == []:
                             self.migrate_window.terminal.switch_window(Terminal.WindowEnum.WELCOME)
                             return
-                            
-                        # 更新界面列表（同时更新源和目标列表）
-                        try:
-                            self.migrate_window.game_view_source.update_games(self.migrate_window.terminal.get_games())
-                            self.migrate_window.game_view_target.update_games(self.migrate_window.terminal.get_games())
-                        except Exception:
-                            logging.exception("更新版本列表 UI 时出错")
+                        # 界面列表会在游戏库改变后自动更新（同时更新源和目标列表）
 
                     except (OSError, IOError) as e:
                         logging.exception("文件操作失败")
@@ -761,29 +827,21 @@ class GameSelector(WidgetLibs.CollapsibleBox):
                 )
 
             def display_ui(self):
-                self.show()
-                self.anim = Animation.FadeIn(self, 60)
-                self.anim.start()
-                self.anim.finished.connect(lambda: self.setGraphicsEffect(None)) # 加上了这一行，悬浮窗的显示问题就修复了...该说不说是好神奇吗...
+                self.fade.fade_in() # 淡入结束后Fade会移除透明度效果，悬浮窗的显示问题也是靠这个修复的
 
             def hide_ui(self):
-                self.anim = Animation.FadeOut(self, 60)
-                self.anim.finished.connect(self.hide)
-                self.anim.start()
-                self.show()  # 确保在动画期间可见
+                self.fade.fade_out()
             
 class ButtonMigrateDetail(QtWidgets.QPushButton):
-    '''任务详情的按钮，在被调用之前必须先set_migrate_task()'''
+    '''任务详情的按钮，显示所有运行中任务的平均进度'''
     def __init__(self, terminal: Terminal, parent_widget):
         super().__init__(parent=parent_widget)
         self.terminal = terminal
         self._size = 70
-        self.total_pending_num: int = None
         self.setObjectName('button_migrate_detail')
         self.setFixedSize(self._size, self._size)
         layout_detail = QtWidgets.QVBoxLayout()
         self.setLayout(layout_detail)
-        self.setStyleSheet(load_stylesheet(resource_path("qss/migrate.qss")))
 
         self.ring = Geometry.LoadingRingText(QtGui.QColor("#EDEDFF"), QtGui.QColor("#EDEDFF"))
         self.ring.change_percent(0.0)
@@ -797,14 +855,13 @@ class ButtonMigrateDetail(QtWidgets.QPushButton):
         self.shadow.setFixedSize(self._size, self._size)
         self.shadow.setStyleSheet("background-color: '#5f9772'; border-radius: 35px")
         self.move(self.parentWidget().width() - self._size - 20, self.parentWidget().height() - self._size - 20)
-    
-    def set_migrate_task(self, migrate_task: TaskMigrateAbortable):
-        # 点击后转至MigrateDetail界面
-        self.clicked.connect(lambda: self.terminal.switch_window(Terminal.WindowEnum.MIGRATE_DETAIL, migrate_task, self.parent()))
+
+        # 点击后转至MigrateDetail界面，显示排在最前面的运行中任务
+        self.clicked.connect(lambda: self.terminal.switch_window(Terminal.WindowEnum.MIGRATE_DETAIL, self.terminal.scheduler.current_task(), self.parent()))
     
     @QtCore.Slot()
-    def update_percent(self):
-        self.ring.change_percent(1 - self.terminal.task_migrate.pending_num / self.terminal.task_migrate.pending_num_total)
+    def update_percent(self, *_):
+        self.ring.change_percent(self.terminal.scheduler.overall_percent())
     
     def show_with_animation(self):
         self.show()
@@ -1,18 +1,22 @@
 from enum import Enum
 from PySide6 import QtWidgets, QtGui, QtCore
 from terminal.Terminal import Terminal, TaskMigrateAbortable
+from terminal.func.progress import MigrateProgress, Phase, format_bytes, format_eta
+from terminal.func.jobqueue import JobState, MigrateJob
 
 from message import Dialog, Message
 from windows.SendMessageable import SendMessageable
-from core.func import resource_path, load_stylesheet
+from core import StyleSheets
 import Geometry, GeometryIcon
 
 class MigrateDetail(SendMessageable):
-    def __init__(self, terminal: Terminal, migrate_task: TaskMigrateAbortable, pre_window: QtWidgets.QFrame):
+    '''迁移任务详情，左侧和右上为当前查看的任务，右下为队列中的全部任务'''
+    def __init__(self, terminal: Terminal, migrate_task: TaskMigrateAbortable | None, pre_window: QtWidgets.QFrame):
         super().__init__(terminal.main_window)
         self.pre_window = pre_window
         self.terminal = terminal
         self.migrate_task = migrate_task
+        StyleSheets.apply(self, 'migrate_detail') # 在创建子控件之前设置，子控件创建时只需按objectName匹配一次
         self.setLayout(QtWidgets.QHBoxLayout())
         self.layout().setSpacing(30)
         self.layout().setContentsMargins(30,30,30,30)
@@ -32,12 +36,24 @@ class MigrateDetail(SendMessageable):
         # 左侧文字
         self.loading_ring_text = QtWidgets.QLabel("迁移中", self)
         self.loading_ring_text.setObjectName("loadingRingText")
-        self.loading_ring_text.setStyleSheet(load_stylesheet(resource_path('qss/migrate_detail.qss')))
         self.loading_ring_container.layout().addWidget(self.loading_ring_text, 0, QtCore.Qt.AlignCenter)
 
-        # 右侧进度详情
+        # 左侧已复制大小、速度与剩余时间
+        self.speed_text = QtWidgets.QLabel("正在计算任务量...", self)
+        self.speed_text.setObjectName("speedText")
+        self.speed_text.setAlignment(QtCore.Qt.AlignCenter)
+        self.loading_ring_container.layout().addWidget(self.speed_text, 0, QtCore.Qt.AlignCenter)
+
+        # 右侧进度详情与任务队列
+        self.right_container = QtWidgets.QWidget(self)
+        self.right_container.setLayout(QtWidgets.QVBoxLayout())
+        self.right_container.layout().setContentsMargins(0,0,0,0)
+        self.right_container.layout().setSpacing(10)
+        self.layout().addWidget(self.right_container)
         self.task_list = MigrateDetail.TaskList()
-        self.layout().addWidget(self.task_list)
+        self.right_container.layout().addWidget(self.task_list)
+        self.job_list = MigrateDetail.JobList(self)
+        self.right_container.layout().addWidget(self.job_list)
 
         # 退出按钮
         self.button_back = MigrateDetail.ButtonBack(self)
@@ -48,67 +64,86 @@ class MigrateDetail(SendMessageable):
         self.button_terminate.move(20, self.terminal.main_window.height()-self.button_terminate.height()-30)
         self.button_terminate.raise_()
 
+        # 任务结束（完成、暂停或取消）时，切换到下一个运行中的任务，没有的话回到上一窗口
+        self.terminal.scheduler.job_ended.connect(self.on_job_ended)
+
+        if self.migrate_task is None: # 没有运行中的任务，只显示任务队列
+            self.loading_ring_text.setText("队列")
+            self.speed_text.setText("没有运行中的任务")
+            self.task_list.hide()
+            self.button_terminate.hide()
+            return
+
         # 模组方面
         self.task_list.add_task('mod', '下载更新模组', MigrateDetail.TaskStatus.IN_PROGRESS)
         # 文件方面
-        self.task_list.add_task('file', '迁移游戏文件', MigrateDetail.TaskStatus.PENDING)
+        self.task_list.add_task('file', '迁移游戏文件', MigrateDetail.TaskStatus.IN_PROGRESS)
         self.task_list.layout().addStretch()
 
         # 初始化进度数据
         self.init_stats()
 
         # 进度数据同步更新
-        self.migrate_task.update_migrate_general.connect(self.update_loading_ring)
-        self.migrate_task.update_migrate_detail.connect(self.update_tasks)
-
-        # 任务完成时，自动回到上一窗口
-        self.migrate_task.finished.connect(self.back)
+        self.migrate_task.progress_updated.connect(self.update_progress)
 
     def init_stats(self):
         if not self.migrate_task.is_calculating:
-            self.loading_ring.change_percent(1-self.migrate_task.pending_num/self.migrate_task.pending_num_total)
-            if self.migrate_task.pending_num_mod > 0:
-                self.task_list.update_task('mod', percent=1-self.migrate_task.pending_num_mod/self.migrate_task.pending_num_mod_total, task_status=MigrateDetail.TaskStatus.IN_PROGRESS)
-                return
-            else:
-                self.task_list.update_task('mod', task_status=MigrateDetail.TaskStatus.COMPLETED)
-            if self.migrate_task.pending_num_file > 0:
-                self.task_list.update_task('file', percent=1-self.migrate_task.pending_num_file/self.migrate_task.pending_num_file_total, task_status=MigrateDetail.TaskStatus.IN_PROGRESS)
-            else: self.task_list.update_task('file', task_status=MigrateDetail.TaskStatus.COMPLETED)
+            self.update_progress(self.migrate_task.progress.snapshot())
 
-    @QtCore.Slot()
-    def terminate(self):
-        self.dialog.current_dialog.close_with_animation()
-        self.terminal.switch_window_with_msg(Terminal.WindowEnum.MIGRATE, ('已终止迁移任务', Message.Level.INFO))
+    @QtCore.Slot(str)
+    def on_job_ended(self, job_id: str):
+        if self.migrate_task is None or job_id != self.migrate_task.job_id:
+            return
+        job = self.terminal.scheduler.queue.get(job_id)
+        msg = None
+        if job and job.state == JobState.CANCELLED:
+            msg = ('已终止迁移任务', Message.Level.INFO)
+            if self.dialog.current_dialog:
+                self.dialog.current_dialog.close_with_animation()
+        elif job and job.state == JobState.PAUSED:
+            msg = ('已暂停迁移任务', Message.Level.INFO)
+        if next_task := self.terminal.scheduler.current_task():
+            self.terminal.switch_window_with_msg(Terminal.WindowEnum.MIGRATE_DETAIL, msg, next_task, self.pre_window)
+        else:
+            self.terminal.switch_window_with_msg(Terminal.WindowEnum.MIGRATE, msg)
 
     @QtCore.Slot()
     def back(self):
         self.terminal.switch_window(Terminal.WindowEnum.MIGRATE, self.terminal.task_migrate)
 
-    @QtCore.Slot(int, int)
-    def update_tasks(self, pending_num_mod, pending_num_file):
-        if not self.migrate_task.pending_num_mod <= 0:
-            self.task_list.update_task('mod', percent=1-pending_num_mod/self.migrate_task.pending_num_mod_total)
-            return
-        else: 
-            self.task_list.update_task('mod', task_status=MigrateDetail.TaskStatus.COMPLETED)
-            self.task_list.update_task('file', task_status=MigrateDetail.TaskStatus.IN_PROGRESS)
+    def show_job(self, job_id: str):
+        '''切换到队列中某个运行中任务的详情'''
+        task = self.terminal.scheduler.task_of(job_id)
+        if task is not None and task is not self.migrate_task:
+            self.terminal.switch_window(Terminal.WindowEnum.MIGRATE_DETAIL, task, self.pre_window)
 
-        if not self.migrate_task.pending_num_file <= 0:
-            self.task_list.update_task('file', percent=1-pending_num_file/self.migrate_task.pending_num_file_total)
-            return
-        else: self.task_list.update_task('file', task_status=MigrateDetail.TaskStatus.COMPLETED)
+    @QtCore.Slot(object)
+    def update_progress(self, p: MigrateProgress):
+        self.loading_ring.change_percent(p.overall)
 
-    @QtCore.Slot(int)
-    def update_loading_ring(self, pending_num):
-        self.loading_ring.change_percent(1-pending_num/self.migrate_task.pending_num_total)
+        if p.phase == Phase.SCANNING:
+            return
+        # 模组下载和文件复制同时进行，两边的进度分开显示
+        lines = []
+        if p.mod_finished:
+            self.task_list.update_task('mod', task_status=MigrateDetail.TaskStatus.COMPLETED)
+        else:
+            self.task_list.update_task('mod', percent=p.mod_percent, task_status=MigrateDetail.TaskStatus.IN_PROGRESS)
+            lines.append(f"模组 {p.mods_done} / {p.mods_total}")
+
+        lines.append(f"{format_bytes(p.bytes_done)} / {format_bytes(p.bytes_total)}")
+        if p.file_finished:
+            self.task_list.update_task('file', task_status=MigrateDetail.TaskStatus.COMPLETED)
+        else:
+            self.task_list.update_task('file', percent=p.file_percent, task_status=MigrateDetail.TaskStatus.IN_PROGRESS)
+            lines.append(f"{format_bytes(p.speed)}/s · 剩余 {format_eta(p.eta)}")
+        self.speed_text.setText("\n".join(lines))
 
     class TaskList(QtWidgets.QFrame):
         def __init__(self):
             super().__init__()
             self.setLayout(QtWidgets.QVBoxLayout())
             self.setObjectName('taskList')
-            self.setStyleSheet(load_stylesheet(resource_path("qss/migrate_detail.qss")))
             self.setFixedWidth(380)
             self.layout().setSpacing(5)
             self.setContentsMargins(10,5,10,5)
@@ -123,7 +158,7 @@ class MigrateDetail(SendMessageable):
         def update_task(self, task_id: str, percent: float=None, task_status: 'MigrateDetail.TaskStatus'=None):
             for task in self.tasks:
                 if task.task_id == task_id:
-                    if task_status: 
+                    if task_status and task_status != task.status: # 进度会频繁更新，状态没变就不用重新替换图标
                         task.switch_status(task_status)
                         if task_status == MigrateDetail.TaskStatus.COMPLETED: task.update_progress(1.0)
                     if percent: task.update_progress(percent)
@@ -169,10 +204,8 @@ class MigrateDetail(SendMessageable):
             # 状态图标和进度
             self.status_icon = self.status.instance
             self.status_icon.setObjectName("statusIcon")
-            self.status_icon.setStyleSheet(load_stylesheet(resource_path("qss/migrate_detail.qss")))
             self.status_percent = QtWidgets.QLabel()
             self.status_percent.setObjectName("statusPercent")
-            self.status_percent.setStyleSheet(load_stylesheet(resource_path('qss/migrate_detail.qss')))
             self.status_percent.setText(f"{int(self.process_percent * 100)}%")
             if self.status == MigrateDetail.TaskStatus.IN_PROGRESS:
                 self.info_container.layout().addWidget(self.status_percent)
@@ -182,14 +215,12 @@ class MigrateDetail(SendMessageable):
             # 任务名称
             self.label_task_name = QtWidgets.QLabel(self.task_name, self)
             self.label_task_name.setObjectName("taskName")
-            self.label_task_name.setStyleSheet(load_stylesheet(resource_path('qss/migrate_detail.qss')))
             self.info_container.layout().addWidget(self.label_task_name)
             self.info_container.layout().addStretch()
 
             # 进度条
             self.loading_line = Geometry.LoadingLine(color=QtGui.QColor("#79D2B1"), pen_width=3, length=length-40)
             self.loading_line.setObjectName('loadingLine')
-            self.loading_line.setStyleSheet(load_stylesheet(resource_path('qss/migrate_detail.qss')))
             self.loading_line.change_percent(self.process_percent)
             self.layout().addWidget(self.loading_line)
 
@@ -197,7 +228,6 @@ class MigrateDetail(SendMessageable):
             self.setSizePolicy(QtWidgets.QSizePolicy.MinimumExpanding, QtWidgets.QSizePolicy.Fixed)
             self.adjustSize()
             self.setObjectName("taskBar")
-            self.setStyleSheet(load_stylesheet(resource_path("qss/migrate_detail.qss")))
 
         def switch_status(self, status: 'MigrateDetail.TaskStatus'):
             if status == MigrateDetail.TaskStatus.IN_PROGRESS:
@@ -224,7 +254,6 @@ class MigrateDetail(SendMessageable):
             self.setFixedSize(45, 45)
             self.setToolTip("回到上一界面")
             self.setObjectName('buttonBack')
-            self.setStyleSheet(load_stylesheet(resource_path('qss/migrate_detail.qss')))
             self.setLayout(QtWidgets.QHBoxLayout())
             self.layout().addWidget(Geometry.Arrow(self, self, color="#79D2B1", angle=-180))
             self.clicked.connect(parent.back)
@@ -235,13 +264,12 @@ class MigrateDetail(SendMessageable):
             self.setFixedSize(50,50)
             self.setToolTip("终止任务")
             self.setObjectName('buttonTerminate')
-            self.setStyleSheet(load_stylesheet(resource_path('qss/migrate_detail.qss')))
             self.setLayout(QtWidgets.QHBoxLayout())
             self.layout().setContentsMargins(0,0,0,0)
             self.layout().addWidget(GeometryIcon.Terminate("#79D2B1", size=36), 0, QtCore.Qt.AlignmentFlag.AlignCenter)
 
             def wait_for_terminated():
-                parent.terminal.terminate_migrate_task()
+                parent.terminal.scheduler.cancel(parent.migrate_task.job_id)
                 current_dialog = parent.dialog.current_dialog
                 # 失效终止按钮，防止重复发送请求
                 current_dialog.dialog_buttons[0].clicked.disconnect()
@@ -252,4 +280,123 @@ class MigrateDetail(SendMessageable):
                 '已经迁移完成的文件将不会删除，若有需要请自行删除',
                 ('终止任务!', Dialog.Level.ERROR, wait_for_terminated)
             ))
-            parent.terminal.task_migrate.terminated.connect(parent.terminate)
\ No newline at end of file
+
+    class JobList(QtWidgets.QFrame):
+        '''队列中的全部迁移任务，每个任务都可以暂停、继续或取消'''
+        STATE_TEXT = {
+            JobState.QUEUED: '等待中',
+            JobState.RUNNING: '进行中',
+            JobState.PAUSED: '已暂停',
+            JobState.DONE: '已完成',
+            JobState.FAILED: '失败',
+            JobState.CANCELLED: '已取消'
+        }
+
+        def __init__(self, parent: 'MigrateDetail'):
+            super().__init__(parent)
+            self.detail = parent
+            self.scheduler = parent.terminal.scheduler
+            self.setObjectName('jobList')
+            self.setFixedWidth(380)
+            self.setLayout(QtWidgets.QVBoxLayout())
+            self.layout().setSpacing(5)
+            self.rows: dict[str, MigrateDetail.JobRow] = {}
+
+            # 标题栏
+            header = QtWidgets.QHBoxLayout()
+            title = QtWidgets.QLabel('迁移队列', self)
+            title.setObjectName('jobListTitle')
+            header.addWidget(title, 1)
+            self.button_clear = QtWidgets.QPushButton('清除已结束', self)
+            self.button_clear.setObjectName('jobButton')
+            self.button_clear.clicked.connect(self.scheduler.queue.clear_finished)
+            header.addWidget(self.button_clear)
+            self.layout().addLayout(header)
+
+            self.rows_container = QtWidgets.QVBoxLayout()
+            self.rows_container.setSpacing(2)
+            self.layout().addLayout(self.rows_container)
+            self.layout().addStretch()
+
+            self.rebuild()
+            self.scheduler.jobs_changed.connect(self.on_jobs_changed)
+            self.scheduler.progress_updated.connect(self.on_progress)
+
+        def rebuild(self):
+            for row in self.rows.values():
+                row.deleteLater()
+            self.rows.clear()
+            for job in self.scheduler.queue.jobs():
+                row = MigrateDetail.JobRow(job, self)
+                self.rows_container.addWidget(row)
+                self.rows[job.id] = row
+            self.button_clear.setVisible(any(job.finished for job in self.scheduler.queue.jobs()))
+
+        @QtCore.Slot(str)
+        def on_jobs_changed(self, job_id: str):
+            job = self.scheduler.queue.get(job_id)
+            if job is not None and job_id in self.rows and job.state != JobState.RUNNING:
+                self.rows[job_id].update_state(job) # 状态改变不会影响顺序（开始运行除外），只更新这一行
+                self.button_clear.setVisible(any(job.finished for job in self.scheduler.queue.jobs()))
+                return
+            self.rebuild()
+
+        @QtCore.Slot(str, object)
+        def on_progress(self, job_id: str, p: MigrateProgress):
+            if row := self.rows.get(job_id):
+                row.update_percent(p.overall)
+
+    class JobRow(QtWidgets.QFrame):
+        def __init__(self, job: MigrateJob, job_list: 'MigrateDetail.JobList'):
+            super().__init__(job_list)
+            self.job_id = job.id
+            self.job_list = job_list
+            self.setObjectName('jobRow')
+            self.setLayout(QtWidgets.QHBoxLayout())
+            self.layout().setContentsMargins(5,2,5,2)
+            self.layout().setSpacing(5)
+            if job_list.detail.migrate_task is not None and job_list.detail.migrate_task.job_id == job.id:
+                self.setProperty('current', True) # 当前正在查看的任务
+
+            self.label_title = QtWidgets.QLabel(job.title, self)
+            self.label_title.setObjectName('jobTitle')
+            self.label_title.setToolTip(job.error or job.title)
+            self.layout().addWidget(self.label_title, 1)
+            self.label_state = QtWidgets.QLabel(self)
+            self.label_state.setObjectName('jobState')
+            self.layout().addWidget(self.label_state)
+
+            self.button_toggle = QtWidgets.QPushButton(self)
+            self.button_toggle.setObjectName('jobButton')
+            self.button_toggle.clicked.connect(self.toggle)
+            self.layout().addWidget(self.button_toggle)
+            self.button_cancel = QtWidgets.QPushButton('取消', self)
+            self.button_cancel.setObjectName('jobButton')
+            self.button_cancel.clicked.connect(lambda: self.job_list.scheduler.cancel(self.job_id))
+            self.layout().addWidget(self.button_cancel)
+            self.update_state(job)
+
+        def update_state(self, job: MigrateJob):
+            self.state = job.state
+            self.label_state.setText(MigrateDetail.JobList.STATE_TEXT.get(job.state, job.state))
+            self.label_title.setToolTip(job.error or job.title)
+            self.button_toggle.setText('暂停' if job.state in (JobState.QUEUED, JobState.RUNNING) else '继续')
+            self.button_toggle.setVisible(job.state in (JobState.QUEUED, JobState.RUNNING, JobState.PAUSED, JobState.FAILED))
+            self.button_cancel.setVisible(not job.finished)
+            if job.state == JobState.RUNNING and (task := self.job_list.scheduler.task_of(job.id)):
+                self.update_percent(task.progress.snapshot().overall)
+
+        def update_percent(self, percent: float):
+            if self.state == JobState.RUNNING:
+                self.label_state.setText(f"{int(percent * 100)}%")
+
+        def toggle(self):
+            if self.state in (JobState.QUEUED, JobState.RUNNING):
+                self.job_list.scheduler.pause(self.job_id)
+            else:
+                self.job_list.scheduler.resume(self.job_id)
+
+        def mousePressEvent(self, event: QtGui.QMouseEvent):
+            # 点击运行中的任务查看详情
+            self.job_list.detail.show_job(self.job_id)
+            super().mousePressEvent(event)
@@ -6,7 +6,7 @@ from pathlib import Path
 
 from windows.SendMessageable import SendMessageable
 from message import Message
-from core.func import resource_path, load_stylesheet
+from core import StyleSheets
 import MCException
 
 # 欢迎界面
@@ -14,7 +14,7 @@ class Welcome(SendMessageable):
     def __init__(self, terminal: Terminal):
         super().__init__(terminal.main_window)
         self.terminal = terminal
-        self.setStyleSheet("background-color: lightblue;")
+        StyleSheets.apply(self, 'welcome')
         self.layout = QtWidgets.QVBoxLayout(self)
 
         self.empty_label = QtWidgets.QLabel("欢迎使用 MCMigrator", self)
@@ -35,7 +35,6 @@ class Welcome(SendMessageable):
         self.button_import.setObjectName('button_import')
         self.button_import.clicked.connect(self.button_import_clicked)
         self.button_import.resize(200, 60)
-        self.button_import.setStyleSheet(load_stylesheet(resource_path("qss/welcome.qss")))
         self.button_container.layout().addWidget(self.button_import, 0, QtCore.Qt.AlignCenter)
         
         # 查找是否有PCL，有则显示PCL导入按钮
@@ -53,7 +52,6 @@ class Welcome(SendMessageable):
                 self.button_import_pcl.setObjectName('button_import_pcl')
                 self.button_import_pcl.clicked.connect(self.button_import_pcl_clicked)
                 self.button_import_pcl.resize(200, 60)
-                self.button_import_pcl.setStyleSheet(load_stylesheet(resource_path("qss/welcome.qss")))
                 self.button_container.layout().addWidget(self.button_import_pcl, 0, QtCore.Qt.AlignCenter)
 
         self.button_container.adjustSize()